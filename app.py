@@ -1,12 +1,41 @@
-from flask import Flask, render_template, request, redirect, url_for, session, g, flash, jsonify
-import sqlite3
+from flask import Flask, render_template, request, redirect, url_for, session, g, flash, jsonify, Response, send_file
 import os
 import json
 from datetime import datetime, timedelta, date
-import requests
-from bs4 import BeautifulSoup
-import re
+import hashlib
+import mimetypes
+from urllib.parse import quote
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import socket
+import time
+
+import click
+
+from lpnu_client import UpstreamUnavailable, get_client as get_lpnu_client
+from singleflight import SingleFlight
+from schedule_refresher import ScheduleRefresher
+from schedule_parser import parse_html_schedule
+from schedule_classify import GROUP_NAME_RE
+from schedule_store import write_schedule
+from schedule_import import (create_run, failed_groups, fetch_schedule_page, finish_run, import_schedules,
+                             last_unfinished_run, remaining_groups, schedule_page_url)
+from db_pool import ConnectionPool
+from migrations import check_query_plans, migrate, schema_version
+from queries import (ASSIGNED_TASKS, CUSTOM_EVENTS_IN_WINDOW, DASHBOARD_DEADLINES, DASHBOARD_TEAM_ACTIVITY,
+                     GROUP_SCHEDULE, HOT_QUERIES, MARK_ALL_NOTIFICATIONS_READ, NOTIFICATIONS_SINCE, PERSONAL_TASKS,
+                     TEAM_CHAT_BEFORE, TEAM_CHAT_LATEST, TEAM_MEMBERSHIP, TEAM_TASKS, UNREAD_NOTIFICATIONS_COUNT,
+                     USER_TEAMS, task_assignees_query)
+from push_hub import PushHub, event_stream
+from notification_fanout import FanoutQueue
+from notification_retention import (DEFAULT_RETENTION_DAYS, RetentionJob, compact_notifications, database_size,
+                                    free_pages, table_rows)
+from ttl_cache import TTLCache
+from file_storage import ContentStore, FileTooLarge, content_disposition
+from avatar_thumbnails import store_thumbnails, thumbnails_available
+from search import SEARCHERS, query_terms
+from schedule_calendar import CalendarCache, compile_schedule, iter_semesters, json_fragment, parse_date_window
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'app.db')
@@ -14,120 +43,165 @@ DB_PATH = os.path.join(BASE_DIR, 'app.db')
 app = Flask(__name__)
 app.secret_key = 'secret_key'
 
+# Сторінка розкладу LPNU (можна підмінити на локальний стаб-сервер для тестів)
+app.config['LPNU_BASE_URL'] = os.environ.get('LPNU_BASE_URL', 'https://student.lpnu.ua/students_schedule')
+# Через скільки секунд розклад групи вважається застарілим
+app.config['SCHEDULE_TTL_SECONDS'] = 86400
+# Фонове оновлення: за скільки до застарівання оновлювати, скільки запитів до LPNU одночасно,
+# розкид затримки та як часто шукати групи, що скоро застаріють
+app.config['SCHEDULE_REFRESH_AHEAD_SECONDS'] = 7200
+app.config['SCHEDULE_REFRESH_WORKERS'] = 2
+app.config['SCHEDULE_REFRESH_JITTER_SECONDS'] = 60
+app.config['SCHEDULE_REFRESH_SCAN_SECONDS'] = 600
+# Пауза після невдалого оновлення: для групи з (застарілим) розкладом у базі - година; для групи
+# без розкладу - коротка, подвоюється з кожною невдачею поспіль (до години), бо їй нічого показати
+app.config['SCHEDULE_REFRESH_FAILURE_BACKOFF_SECONDS'] = 3600
+app.config['SCHEDULE_REFRESH_COLD_BACKOFF_SECONDS'] = 30
+# flask import-schedules: паралельних завантажень (не більше ліміту клієнта LPNU) і груп на транзакцію
+app.config['SCHEDULE_IMPORT_FETCH_WORKERS'] = 4
+app.config['SCHEDULE_IMPORT_BATCH_SIZE'] = 50
+
+# Скільки вільних з'єднань з базою тримати в пулі кожного процесу (окремо для запису й читання)
+app.config['DB_POOL_SIZE'] = 8
+# Історія чату: скільки повідомлень на сторінці за замовчуванням і максимум за один запит
+app.config['CHAT_PAGE_SIZE'] = 50
+app.config['CHAT_PAGE_SIZE_MAX'] = 200
+
+# Push-канал (SSE): пінг, щоб проксі не рвали тихе з'єднання, і скільки подій тримати для повільної вкладки.
+# /api/stream тримає обробника на кожну відкриту вкладку - запускати під gevent
+# (gunicorn -k gevent -w 1 --worker-connections 1000), див. push_hub.PushHub
+app.config['PUSH_HEARTBEAT_SECONDS'] = 25
+app.config['PUSH_QUEUE_SIZE'] = 100
+
+# Сповіщення: скільки віддавати за один запит за замовчуванням і максимум
+app.config['NOTIFICATIONS_PAGE_SIZE'] = 50
+app.config['NOTIFICATIONS_PAGE_SIZE_MAX'] = 200
+
+# Повідомлення в команду за це вікно об'єднуються в одне сповіщення на учасника (0 - писати одразу)
+app.config['NOTIFICATION_FANOUT_WINDOW_SECONDS'] = 5
+# Скільки днів зберігати прочитані сповіщення кожного типу (None - не чистити) і як часто чистити (0 - лише CLI)
+app.config['NOTIFICATION_RETENTION_DAYS'] = dict(DEFAULT_RETENTION_DAYS)
+app.config['NOTIFICATION_RETENTION_INTERVAL_SECONDS'] = 6 * 3600
+
+# Скільки задач можна змінити одним запитом /api/tasks/bulk
+app.config['TASKS_BULK_MAX'] = 500
+
+# /api/dashboard: скільки секунд тримати зібраний дашборд користувача, на скільки днів уперед
+# показувати дедлайни і скільки їх максимум
+app.config['DASHBOARD_CACHE_SECONDS'] = 15
+app.config['DASHBOARD_DEADLINE_DAYS'] = 7
+app.config['DASHBOARD_DEADLINES_LIMIT'] = 10
+
+# Скільки секунд g.user береться з кешу процесу без SELECT (зміни з інших процесів видно через стільки ж)
+app.config['USER_CACHE_SECONDS'] = 30
+
+# Завантажені файли - у сховищі за хешем вмісту (шлях від кореня застосунку, а не від поточної директорії)
+app.config['STORAGE_ROOT'] = os.path.join(app.root_path, 'storage')
+app.config['AVATAR_MAX_BYTES'] = 2 * 1024 * 1024
+app.config['CHAT_FILE_MAX_BYTES'] = 25 * 1024 * 1024
+# Запит, більший за це, Flask відхиляє з 413 ще до читання тіла
+app.config['MAX_CONTENT_LENGTH'] = app.config['CHAT_FILE_MAX_BYTES'] + 1024 * 1024
+# Віддача файлів веб-сервером: USE_X_SENDFILE (Apache/lighttpd) або internal-location nginx,
+# що дивиться на STORAGE_ROOT (напр. '/_storage/') для X-Accel-Redirect
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+app.config['STORAGE_ACCEL_REDIRECT_PREFIX'] = os.environ.get('STORAGE_ACCEL_REDIRECT_PREFIX')
+# Скільки потоків одночасно робить мініатюри аватарок (потрібен Pillow)
+app.config['AVATAR_THUMBNAIL_WORKERS'] = 2
+
+# /api/search: результатів кожного виду на сторінку за замовчуванням і максимум
+app.config['SEARCH_PAGE_SIZE'] = 20
+app.config['SEARCH_PAGE_SIZE_MAX'] = 50
+# Скільки найновіших збігів кожного виду ранжувати за релевантністю (bm25); старіші за вікном не показуються
+app.config['SEARCH_RANK_WINDOW'] = 1000
+
+# Готові JSON-календарі груп (спільні для всіх студентів групи й підгрупи)
+calendar_cache = CalendarCache(max_entries=512)
+# Один запит до LPNU на групу, навіть якщо календар відкриває вся група одночасно
+schedule_flight = SingleFlight()
+# Нові повідомлення чату та сповіщення розсилаються відкритим вкладкам замість polling
+push_hub = PushHub(max_queue=app.config['PUSH_QUEUE_SIZE'])
+# Зібраний /api/dashboard на користувача (лічильник непрочитаних у кеш не входить)
+dashboard_cache = TTLCache(ttl=app.config['DASHBOARD_CACHE_SECONDS'], max_entries=4096)
+# Рядки users для load_logged_in_user (скидаються invalidate_user після змін профілю)
+user_cache = TTLCache(ttl=app.config['USER_CACHE_SECONDS'], max_entries=4096)
+file_store = ContentStore(app.config['STORAGE_ROOT'])
+
 
 # --- База даних ---
 
+_db_pools = {}
+_db_pools_lock = threading.Lock()
+
+
+def get_db_pool(readonly=False):
+    key = (DB_PATH, readonly)
+    with _db_pools_lock:
+        pool = _db_pools.get(key)
+        if pool is None:
+            pool = _db_pools[key] = ConnectionPool(DB_PATH, max_idle=app.config['DB_POOL_SIZE'],
+                                                   readonly=readonly)
+        return pool
+
+
 def get_db():
+    """З'єднання для запису (і читання), одне на запит/app context, з пулу процесу."""
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DB_PATH)
-        db.row_factory = sqlite3.Row
+        db = g._database = get_db_pool().acquire()
+    return db
+
+
+def get_read_db():
+    """
+    Read-only з'єднання для GET-ендпоінтів: не бере блокувань на запис, тож не заважає
+    повідомленням чату та розсилці сповіщень. Якщо запит уже писав - читаємо тим самим з'єднанням.
+    """
+    db = getattr(g, '_database', None)
+    if db is not None:
+        return db
+    db = getattr(g, '_read_database', None)
+    if db is None:
+        db = g._read_database = get_db_pool(readonly=True).acquire()
     return db
 
 
 def init_db():
+    """Створює або оновлює схему бази до останньої міграції (див. migrations.py)."""
     with app.app_context():
-        db = get_db()
-        db.execute('''CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        first_name TEXT NOT NULL,
-                        last_name TEXT NOT NULL,
-                        email TEXT UNIQUE NOT NULL,
-                        password TEXT NOT NULL,
-                        group_name TEXT,
-                        subgroup INTEGER DEFAULT 1,
-                        avatar TEXT
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS events (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
-                        group_name TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        type TEXT NOT NULL,
-                        date TEXT NOT NULL,
-                        start_time TEXT NOT NULL,
-                        end_time TEXT,
-                        is_custom INTEGER DEFAULT 1,
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS schedule (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        group_name TEXT NOT NULL,
-                        subgroup INTEGER NOT NULL,
-                        weekday TEXT NOT NULL,
-                        start_time TEXT NOT NULL,
-                        end_time TEXT,
-                        subject TEXT NOT NULL,
-                        subject_type TEXT NOT NULL,
-                        location TEXT,
-                        week_type TEXT NOT NULL,
-                        cached_at TEXT NOT NULL,
-                        UNIQUE(group_name, subgroup, weekday, start_time, week_type)
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS schedule_cache (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        group_name TEXT UNIQUE NOT NULL,
-                        data TEXT NOT NULL,
-                        cached_at TEXT NOT NULL
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS teams (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        creator_id INTEGER NOT NULL,
-                        created_at TEXT NOT NULL,
-                        FOREIGN KEY (creator_id) REFERENCES users(id)
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS team_members (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        team_id INTEGER NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        joined_at TEXT NOT NULL,
-                        UNIQUE(team_id, user_id),
-                        FOREIGN KEY (team_id) REFERENCES teams(id),
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS team_messages (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        team_id INTEGER NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        message TEXT NOT NULL,
-                        created_at TEXT NOT NULL,
-                        FOREIGN KEY (team_id) REFERENCES teams(id),
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS notifications (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        recipient_id INTEGER NOT NULL,
-                        type TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        message TEXT NOT NULL,
-                        related_id INTEGER,
-                        is_read INTEGER DEFAULT 0,
-                        created_at TEXT NOT NULL,
-                        FOREIGN KEY (recipient_id) REFERENCES users(id)
-                    )''')
-        db.execute('''CREATE TABLE IF NOT EXISTS tasks (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        description TEXT,
-                        deadline TEXT,
-                        is_completed INTEGER DEFAULT 0,
-                        creator_id INTEGER NOT NULL,
-                        team_id INTEGER,
-                        assigned_to_ids TEXT,
-                        created_at TEXT NOT NULL,
-                        FOREIGN KEY (creator_id) REFERENCES users(id),
-                        FOREIGN KEY (team_id) REFERENCES teams(id)
-                    )''')
+        migrate(get_db())
 
-        db.commit()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Застосувати міграції схеми бази."""
+    init_db()
+    with app.app_context():
+        click.echo(f"Версія схеми: {schema_version(get_db())}")
+
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """EXPLAIN QUERY PLAN гарячих запитів: код виходу 1, якщо якийсь сканує таблицю без індексу."""
+    init_db()
+    with app.app_context():
+        problems = check_query_plans(get_db())
+    for name in HOT_QUERIES:
+        click.echo(f"{'FULL SCAN' if name in problems else 'ok':>9}  {name}")
+        for step in problems.get(name, []):
+            click.echo(f"           {step}")
+    if problems:
+        raise SystemExit(1)
 
 
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    # З'єднання не закриваються, а повертаються в пул процесу
+    db = g.pop('_database', None)
+    if db is not None:
+        get_db_pool().release(db)
+    db = g.pop('_read_database', None)
     if db is not None:
-        db.close()
+        get_db_pool(readonly=True).release(db)
 
 
 # --- Маршрути ---
@@ -140,17 +214,27 @@ def close_connection(exception):
 def load_logged_in_user():
     user_id = session.get('user_id')
 
-    if user_id is None:
+    # Статичним файлам користувач не потрібен
+    if user_id is None or request.endpoint == 'static':
         g.user = None
-    else:
-        db = get_db()
-        user = db.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        return
 
-        if user:
-            g.user = dict(user)
-        else:
+    # Рядок користувача береться з кешу процесу; база - лише після TTL або invalidate_user()
+    user = user_cache.get(user_id)
+    if user is None:
+        row = get_read_db().execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        if row is None:
             session.clear()
             g.user = None
+            return
+        user = user_cache.put(user_id, dict(row))
+    # Копія: зміни g.user у view не повинні потрапити в кеш
+    g.user = dict(user)
+
+
+def invalidate_user(user_id):
+    """Після зміни рядка users - наступний запит користувача перечитає його з бази."""
+    user_cache.invalidate(user_id)
 
 
 @app.route('/')
@@ -220,20 +304,20 @@ def profile():
         return redirect(url_for('login'))
 
     db = get_db()
-    user = db.execute('SELECT * FROM users WHERE id = ?', (g.user['id'],)).fetchone()
+    user = g.user
 
     if request.method == 'POST':
         group_name = request.form['group_name']
         subgroup = request.form.get('subgroup', '1')
 
-        import re
-        if not re.match(r'^[А-Я]{2}-\d{2}$', group_name):
+        if not GROUP_NAME_RE.match(group_name):
             error = 'Невірний формат групи. Приклад: AB-12'
             return render_template('profile.html', user=user, error=error)
 
         db.execute('UPDATE users SET group_name = ?, subgroup = ? WHERE id = ?',
                    (group_name, int(subgroup), g.user['id']))
         db.commit()
+        invalidate_user(g.user['id'])
         return redirect(url_for('profile'))
 
     return render_template('profile.html', user=user)
@@ -248,14 +332,172 @@ def save_user_subgroup():
     db = get_db()
     db.execute('UPDATE users SET subgroup = ? WHERE id = ?', (int(subgroup), g.user['id']))
     db.commit()
+    invalidate_user(g.user['id'])
     return jsonify({'success': True})
 
 
+# --- Файли (аватарки, вкладення чату) ---
+
+# Що браузер може показати сам; решта віддається як завантаження (щоб HTML/SVG не виконувались у нашому домені)
+INLINE_MIMETYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'application/pdf', 'text/plain'}
+AVATAR_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+STORED_FILE_MAX_AGE = 365 * 24 * 3600
+
+
+def stored_file_url(digest, name):
+    # Без url_for: URL будуються і у фонових потоках, де немає контексту запиту
+    return f"/files/{digest}/{quote(name or 'file')}"
+
+
+# Запас на multipart-обгортку (межі, заголовки частин, коротке поле message)
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def upload_too_large(max_bytes):
+    """
+    413-відповідь, якщо вже Content-Length більший за max_bytes (з запасом на multipart), інакше None.
+    Викликати до першого звернення до request.files / request.form: саме воно читає й розбирає тіло.
+    """
+    if request.content_length and request.content_length > max_bytes + MULTIPART_OVERHEAD:
+        return jsonify({'error': str(FileTooLarge(max_bytes))}), 413
+    return None
+
+
+def save_upload(file, max_bytes):
+    """Потоково зберігає завантажений файл у сховище. FileTooLarge, якщо він більший за max_bytes."""
+    return file_store.save_stream(file.stream, max_bytes)
+
+
+@app.route('/files/<digest>/<path:name>')
+def serve_stored_file(digest, name):
+    """
+    Файл зі сховища. Вміст за хешем незмінний, тож кешується назавжди; Range і 304 - через send_file.
+    Якщо налаштовано, саму передачу байтів робить веб-сервер (X-Sendfile / X-Accel-Redirect), а не воркер.
+    """
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+    try:
+        path = file_store.path_for(digest)
+    except ValueError:
+        return jsonify({'error': 'File not found'}), 404
+    if not os.path.isfile(path):
+        return jsonify({'error': 'File not found'}), 404
+
+    name = os.path.basename(name)
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    inline = mimetype in INLINE_MIMETYPES
+
+    accel_prefix = app.config['STORAGE_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        # nginx сам віддасть файл з internal-location (разом з Range), воркер одразу вільний
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = (
+            accel_prefix.rstrip('/') + '/' + file_store.relative_path(digest).replace(os.sep, '/'))
+        response.headers['Content-Disposition'] = content_disposition('inline' if inline else 'attachment', name)
+        response.set_etag(digest)
+    else:
+        # USE_X_SENDFILE=True - send_file поставить X-Sendfile замість тіла
+        response = send_file(path, mimetype=mimetype, as_attachment=not inline, download_name=name,
+                             conditional=True, etag=digest, max_age=STORED_FILE_MAX_AGE)
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = STORED_FILE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+# --- Мініатюри аватарок ---
+
+def avatar_source_path(avatar_url):
+    """Файл на диску за URL аватарки: сховище (/files/<digest>/...) або старі /static/images/avatars/..."""
+    if not avatar_url:
+        return None
+    parts = avatar_url.split('/')
+    if avatar_url.startswith('/files/') and len(parts) >= 3:
+        try:
+            return file_store.path_for(parts[2])
+        except ValueError:
+            return None
+    if avatar_url.startswith('/static/'):
+        return os.path.join(app.root_path, *parts[1:])
+    return None
+
+
+def build_avatar_thumbnails(user_id, avatar_url):
+    """
+    Робить мініатюри AVATAR_SIZES і записує їх URL у users.avatar_<size>. Виконується в пулі,
+    а не в запиті. Якщо користувач за цей час змінив аватарку, результат відкидається.
+    """
+    source = avatar_source_path(avatar_url)
+    if source is None or not os.path.isfile(source):
+        return False
+    try:
+        variants = store_thumbnails(file_store, source)
+    except Exception as e:
+        print(f"⚠️ Мініатюри аватарки користувача {user_id} не вдалися: {e}")
+        return False
+
+    urls = {f'avatar_{size}': stored_file_url(digest, f'avatar_{size}.{extension}')
+            for size, (digest, extension) in variants.items()}
+    with app.app_context():
+        db = get_db()
+        db.execute('''
+            UPDATE users SET avatar_32 = :avatar_32, avatar_64 = :avatar_64, avatar_128 = :avatar_128
+            WHERE id = :user_id AND avatar = :avatar
+        ''', dict(urls, user_id=user_id, avatar=avatar_url))
+        db.commit()
+    invalidate_user(user_id)
+    return True
+
+
+_thumbnail_pool = None
+_thumbnail_pool_lock = threading.Lock()
+
+
+def get_thumbnail_pool():
+    global _thumbnail_pool
+    with _thumbnail_pool_lock:
+        if _thumbnail_pool is None:
+            _thumbnail_pool = ThreadPoolExecutor(max_workers=app.config['AVATAR_THUMBNAIL_WORKERS'],
+                                                 thread_name_prefix='avatar-thumbnails')
+        return _thumbnail_pool
+
+
+def schedule_avatar_thumbnails(user_id, avatar_url):
+    if not thumbnails_available():
+        return None
+    return get_thumbnail_pool().submit(build_avatar_thumbnails, user_id, avatar_url)
+
+
+@app.cli.command('build-avatar-thumbnails')
+@click.option('--force', is_flag=True, help='Перебудувати навіть наявні мініатюри.')
+def build_avatar_thumbnails_command(force):
+    """Створити мініатюри для вже завантажених аватарок."""
+    if not thumbnails_available():
+        click.echo("Pillow не встановлено - мініатюри не створюються (pip install Pillow).")
+        raise SystemExit(1)
+    init_db()
+    with app.app_context():
+        rows = get_db().execute(f'''
+            SELECT id, avatar FROM users
+            WHERE avatar IS NOT NULL AND avatar != '' {'' if force else 'AND avatar_64 IS NULL'}
+        ''').fetchall()
+    futures = [(row['id'], schedule_avatar_thumbnails(row['id'], row['avatar'])) for row in rows]
+    done = sum(1 for _, future in futures if future.result())
+    click.echo(f"Готово: {done} з {len(futures)} аватарок.")
+
+
 @app.route('/api/user/avatar', methods=['POST'])
 def upload_avatar():
     if not g.user:
         return jsonify({'error': 'Not authenticated'}), 401
 
+    # Завеликий запит відхиляємо за Content-Length, не читаючи тіла
+    too_large = upload_too_large(app.config['AVATAR_MAX_BYTES'])
+    if too_large:
+        return too_large
+
     if 'avatar' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
 
@@ -263,191 +505,219 @@ def upload_avatar():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
 
+    extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else 'png'
+    if extension not in AVATAR_EXTENSIONS:
+        return jsonify({'error': 'Avatar must be an image'}), 400
+
     try:
-        # Save avatar to static/images/avatars/
-        os.makedirs('static/images/avatars', exist_ok=True)
-        filename = f"user_{g.user['id']}.png"
-        filepath = os.path.join('static/images/avatars', filename)
-        file.save(filepath)
+        stored = save_upload(file, app.config['AVATAR_MAX_BYTES'])
+    except FileTooLarge as e:
+        return jsonify({'error': str(e)}), 413
 
+    try:
+        avatar_url = stored_file_url(stored.digest, f'avatar.{extension}')
         db = get_db()
-        # Note: The database schema for 'users' table was missing 'avatar_path' column.
-        # Assuming it should be 'avatar' as in the initial schema definition.
-        db.execute('UPDATE users SET avatar = ? WHERE id = ?',
-                   (f'/static/images/avatars/{filename}', g.user['id']))
+        # Старі мініатюри більше не відповідають аватарці - поки нові не готові, всюди показується оригінал
+        db.execute('''UPDATE users SET avatar = ?, avatar_32 = NULL, avatar_64 = NULL, avatar_128 = NULL
+                      WHERE id = ?''', (avatar_url, g.user['id']))
         db.commit()
+        invalidate_user(g.user['id'])
+        schedule_avatar_thumbnails(g.user['id'], avatar_url)
 
-        return jsonify({'success': True, 'avatar_url': f'/static/images/avatars/{filename}'})
+        return jsonify({'success': True, 'avatar_url': avatar_url})
     except Exception as e:
-        print(f"Error uploading avatar: {e}")  # Added for debugging
+        print(f"Error uploading avatar: {e}")
         return jsonify({'error': str(e)}), 500
 
 
-def detect_subgroup(block_text):
-    """Detect which subgroup a class block belongs to (1 or 2, or 0 if no marker)"""
-    t = block_text.lower()
-    if re.search(r'\b(підгр[^0-9]*1|\b1\s*підгр|\bпідгр\.?\s*1|$$1$$|\b1\/?підгр)\b', t):
-        return 1
-    if re.search(r'\b(підгр[^0-9]*2|\b2\s*підгр|\bпідгр\.?\s*2|$$2$$|\b2\/?підгр)\b', t):
-        return 2
-    if re.search(r'\b(i[\.\s]?\s*підгр|ii[\.\s]?\s*підгр)\b', t):
-        if re.search(r'i[\.\s]?\s*підгр', t) and not re.search(r'ii', t):
-            return 1
-        if re.search(r'ii', t):
-            return 2
-    return 0
-
-
-def detect_week_type(block_text):
-    """Detect week type: 'чисельник', 'знаменник' or None"""
-    t = block_text.lower()
-    if 'чисел' in t or 'чис.' in t:
-        return 'чисельник'
-    if 'знамен' in t or 'знам.' in t:
-        return 'знаменник'
-    return None
+def schedule_state(db, group_name):
+    """
+    (checked_at, version) розкладу групи: коли його востаннє звіряли з LPNU і коли він востаннє змінився.
+    (None, None), якщо розкладу групи в базі ще немає.
+    """
+    row = db.execute('SELECT checked_at, changed_at FROM schedule_groups WHERE group_name = ?',
+                     (group_name,)).fetchone()
+    return (row['checked_at'], row['changed_at']) if row else (None, None)
 
 
-def parse_html_schedule(html_text):
+def checked_is_stale(checked_at, max_age):
+    if not checked_at:
+        return True
+    return (datetime.now() - datetime.fromisoformat(checked_at)).total_seconds() > max_age
+
+
+def schedule_is_stale(db, group_name, max_age):
+    return checked_is_stale(schedule_state(db, group_name)[0], max_age)
+
+
+def refresh_schedule_once(group_name, max_age=None):
     """
-    Надійний парсер для Drupal Views (LPNU), який ігнорує пробіли в HTML.
+    Оновлює розклад групи з LPNU, якщо його немає або він старший за max_age секунд.
+    Паралельні виклики для однієї групи чекають на один спільний запит і отримують його результат.
     """
-    soup = BeautifulSoup(html_text, 'html.parser')
-    schedule = []
-
-    # Час пар (бо в HTML є тільки цифри 1, 2, 3...)
-    lesson_times = {
-        '1': ('08:30', '10:05'),
-        '2': ('10:20', '11:55'),
-        '3': ('12:10', '13:45'),
-        '4': ('14:15', '15:50'),
-        '5': ('16:00', '17:35'),
-        '6': ('17:40', '19:15'),
-        '7': ('19:20', '20:55'),
-        '8': ('21:00', '22:35')
-    }
+    if max_age is None:
+        max_age = app.config['SCHEDULE_TTL_SECONDS']
+    return schedule_flight.do(group_name, _refresh_if_stale, group_name, max_age)
 
-    # Знаходимо головний контейнер
-    view_content = soup.find('div', {'class': 'view-content'})
 
-    if not view_content:
-        print("❌ Контейнер 'view-content' не знайдено.")
-        return []
+def _refresh_if_stale(group_name, max_age):
+    # Поки ми чекали, розклад міг оновити інший потік чи процес - перевіряємо ще раз
+    if not schedule_is_stale(get_db(), group_name, max_age):
+        return True
+    return fetch_and_cache_schedule(group_name)
 
-    # Змінні стану (щоб пам'ятати, де ми знаходимось під час циклу)
-    current_weekday = None
-    current_lesson_num = None
 
-    # Перебираємо ВСІ елементи всередині контейнера по порядку
-    # recursive=False означає, що ми беремо тільки прямих дітей (h3, div, span), а не все дерево
-    for element in view_content.find_all(recursive=False):
+# --- Фонове оновлення розкладів ---
 
-        # 1. Якщо це заголовок дня (Пн, Вт...)
-        if element.name == 'span' and 'view-grouping-header' in element.get('class', []):
-            current_weekday = element.get_text(strip=True)
-            continue
+_schedule_refresher = None
+_schedule_refresher_lock = threading.Lock()
 
-        # 2. Якщо це номер пари (<h3>1</h3>)
-        if element.name == 'h3':
-            current_lesson_num = element.get_text(strip=True)
-            continue
 
-        # 3. Якщо це блок з розкладом
-        if element.name == 'div' and 'stud_schedule' in element.get('class', []):
-            # Якщо ми ще не знаємо дня або номера пари, пропускаємо (захист від збоїв)
-            if not current_weekday or not current_lesson_num:
-                continue
+def background_refresh_max_age():
+    """Фоновий оновлювач бере групи трохи раніше, ніж вони застаріють для запитів."""
+    return max(app.config['SCHEDULE_TTL_SECONDS'] - app.config['SCHEDULE_REFRESH_AHEAD_SECONDS'], 0)
+
+
+def _background_refresh(group_name):
+    with app.app_context():
+        return refresh_schedule_once(group_name, max_age=background_refresh_max_age())
+
+
+def _schedule_has_data(group_name):
+    with app.app_context():
+        return bool(schedule_state(get_db(), group_name)[1])
+
+
+def _groups_due_for_refresh():
+    """
+    Групи користувачів, чий розклад скоро застаріє. Дивиться лише на групи, вже записані в
+    schedule_groups: групу без розкладу в базі вперше завантажує запит її сторінки (enqueue у view)
+    або flask import-schedules, а не цей скан.
+    """
+    threshold = (datetime.now() - timedelta(seconds=background_refresh_max_age())).isoformat()
+    with app.app_context():
+        rows = get_db().execute('''
+            SELECT group_name FROM schedule_groups
+            WHERE group_name IN (SELECT group_name FROM users)
+              AND checked_at < ?
+        ''', (threshold,)).fetchall()
+    return [row['group_name'] for row in rows]
+
+
+def acquire_lease(db, name, ttl):
+    """
+    Бере або продовжує оренду name на ttl секунд (таблиця background_leases). True - цей процес власник.
+    Вільну чи прострочену оренду забирає перший, хто спитав; свою власник продовжує, поки живий.
+    """
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    now = time.time()
+    cursor = db.execute('''
+        INSERT INTO background_leases (name, owner, expires_at) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+        WHERE background_leases.owner = excluded.owner OR background_leases.expires_at < ?
+    ''', (name, owner, now + ttl, now))
+    db.commit()
+    return cursor.rowcount > 0
+
+
+def _is_schedule_scan_leader():
+    """Групи для оновлення шукає один процес на базу; оренда переживає пропущений скан."""
+    ttl = 2 * app.config['SCHEDULE_REFRESH_SCAN_SECONDS'] + 60
+    with app.app_context():
+        return acquire_lease(get_db(), 'schedule-refresh-scan', ttl)
 
-            # Всередині stud_schedule шукаємо конкретні пари (views-row)
-            # Шукаємо div-и, у яких є ID (наприклад id='group_full' або id='sub_1_chys')
-            # Важливо: шукаємо рекурсивно всередині цього блоку
-            lesson_divs = element.find_all('div', id=True)
-
-            for div in lesson_divs:
-                elem_id = div.get('id', '')
-
-                # Знаходимо контент
-                content_div = div.find('div', {'class': 'group_content'})
-                if not content_div:
-                    continue
-
-                # --- Визначення підгрупи та тижня з ID ---
-                subgroup = 0
-                week_type = 'обидва'
-
-                if 'sub_1' in elem_id:
-                    subgroup = 1
-                elif 'sub_2' in elem_id:
-                    subgroup = 2
-
-                if 'chys' in elem_id:
-                    week_type = 'чисельник'
-                elif 'znam' in elem_id:
-                    week_type = 'знаменник'
-
-                # --- Розбір тексту ---
-                # Текст всередині group_content розділений тегами <br>
-                # Ми замінюємо <br> на спецсимвол, щоб потім розбити
-                text_content = str(content_div)
-
-                # Очищаємо HTML теги, залишаючи розділювачі
-                # BeautifulSoup get_text з separator='|' замінить <br> на |
-                clean_text = content_div.get_text(separator='|', strip=True)
-                parts = [p.strip() for p in clean_text.split('|') if p.strip()]
-
-                if not parts:
-                    continue
-
-                # Назва предмету - це завжди перша частина
-                subject = parts[0]
-
-                # Деталі (Викладач, ауд, тип) - це решта
-                details = ", ".join(parts[1:]) if len(parts) > 1 else ""
-
-                # --- Аналіз деталей ---
-                subject_type = 'Інше'
-                location = ''
-
-                details_lower = details.lower()
-                if 'лекц' in details_lower:
-                    subject_type = 'Лекція'
-                elif 'практ' in details_lower:
-                    subject_type = 'Практична'
-                elif 'лаб' in details_lower:
-                    subject_type = 'Лабораторна'
-                elif 'консульт' in details_lower:
-                    subject_type = 'Консультація'
-
-                # Шукаємо локацію (щось схоже на корпус або аудиторію)
-                # Шукаємо частини тексту, що містять цифри
-                loc_parts = details.split(',')
-                for p in loc_parts:
-                    p = p.strip()
-                    # Евристика: якщо є "н.к." або це просто номер аудиторії
-                    if ('н.к.' in p) or (any(c.isdigit() for c in p) and len(p) < 10):
-                        location = p
-                        break
-
-                # Час
-                times = lesson_times.get(current_lesson_num, ('00:00', '00:00'))
-
-                # Додаємо в результат
-                subgroups_to_add = [1, 2] if subgroup == 0 else [subgroup]
-
-                for sub in subgroups_to_add:
-                    schedule.append({
-                        'weekday': current_weekday,
-                        'start_time': times[0],
-                        'end_time': times[1],
-                        'subject': subject,
-                        'subject_type': subject_type,
-                        'location': location,
-                        'subgroup': sub,
-                        'week_type': week_type
-                    })
-
-    print(f"✅ Успішно розпарсено {len(schedule)} пар.")
-    return schedule
+
+def get_schedule_refresher():
+    global _schedule_refresher
+    with _schedule_refresher_lock:
+        if _schedule_refresher is None:
+            _schedule_refresher = ScheduleRefresher(
+                _background_refresh, _groups_due_for_refresh,
+                max_workers=app.config['SCHEDULE_REFRESH_WORKERS'],
+                jitter=app.config['SCHEDULE_REFRESH_JITTER_SECONDS'],
+                scan_interval=app.config['SCHEDULE_REFRESH_SCAN_SECONDS'],
+                failure_backoff=app.config['SCHEDULE_REFRESH_FAILURE_BACKOFF_SECONDS'],
+                scan_leader_fn=_is_schedule_scan_leader,
+                cold_failure_backoff=app.config['SCHEDULE_REFRESH_COLD_BACKOFF_SECONDS'],
+                has_data_fn=_schedule_has_data)
+        return _schedule_refresher
+
+
+@app.before_request
+def start_schedule_refresher():
+    # Скан стартує з першим запитом воркера, а не з першим enqueue(): інакше розклади
+    # не оновлювались би наперед, поки хтось не відкрив застарілий
+    get_schedule_refresher().start()
+
+
+@app.cli.command('import-schedules')
+@click.argument('groups', nargs=-1)
+@click.option('--resume', is_flag=True, help='Продовжити останній незавершений імпорт (невдалі групи - ще раз).')
+@click.option('--force', is_flag=True, help='Імпортувати навіть свіжі розклади.')
+@click.option('--batch-size', type=click.IntRange(min=1), help='Скільки груп записувати однією транзакцією.')
+@click.option('--fetch-workers', type=click.IntRange(min=1),
+              help='Скільки сторінок завантажувати паралельно (не більше ліміту клієнта LPNU).')
+@click.option('--parse-workers', type=click.IntRange(min=0),
+              help='Процесів для розбору HTML (за замовчуванням - ядра, на одному ядрі і з 0 - без пулу).')
+def import_schedules_command(groups, resume, force, batch_size, fetch_workers, parse_workers):
+    """
+    Масово завантажити розклади груп GROUPS (без них - усіх груп користувачів) з LPNU в базу.
+    Перерваний або частково невдалий імпорт продовжується з --resume.
+    """
+    init_db()
+    with app.app_context():
+        db = get_db()
+        if resume:
+            run_id = last_unfinished_run(db)
+            if run_id is None:
+                click.echo("Незавершених імпортів немає.")
+                return
+        else:
+            if not groups:
+                groups = [row['group_name'] for row in db.execute('''
+                    SELECT DISTINCT group_name FROM users WHERE group_name IS NOT NULL AND group_name != ''
+                ''')]
+            groups = sorted({group_name.strip().upper() for group_name in groups if group_name.strip()})
+            if not force:
+                threshold = (datetime.now() - timedelta(seconds=background_refresh_max_age())).isoformat()
+                fresh = {row['group_name'] for row in db.execute(
+                    'SELECT group_name FROM schedule_groups WHERE checked_at >= ?', (threshold,))}
+                if fresh & set(groups):
+                    click.echo(f"Пропущено свіжих розкладів: {len(fresh & set(groups))} (--force, щоб оновити)")
+                groups = [group_name for group_name in groups if group_name not in fresh]
+            run_id = create_run(db, groups)
+
+        pending = remaining_groups(db, run_id)
+        click.echo(f"Імпорт #{run_id}: {len(pending)} груп")
+        client = get_lpnu_client()
+        # Понад ліміт клієнта потоки лише чекали б на слот, а після acquire_timeout падали б з UpstreamUnavailable
+        fetch_workers = fetch_workers or app.config['SCHEDULE_IMPORT_FETCH_WORKERS']
+        if fetch_workers > client.max_concurrency:
+            click.echo(f"--fetch-workers {fetch_workers} більше за ліміт клієнта LPNU, "
+                       f"беремо {client.max_concurrency}")
+            fetch_workers = client.max_concurrency
+        base_url = app.config['LPNU_BASE_URL']
+        import_schedules(db, run_id, pending, lambda group_name: fetch_schedule_page(client, base_url, group_name),
+                         batch_size=batch_size or app.config['SCHEDULE_IMPORT_BATCH_SIZE'],
+                         fetch_workers=fetch_workers, parse_workers=parse_workers, log=click.echo)
+
+        failed = failed_groups(db, run_id)
+        if failed:
+            click.echo(f"Не вдалося ({len(failed)}): " + ', '.join(f"{row['group_name']} ({row['error']})"
+                                                               for row in failed))
+            click.echo("Повторити невдалі: flask import-schedules --resume")
+            raise SystemExit(1)
+        finish_run(db, run_id)
+        click.echo(f"✅ Імпорт #{run_id} завершено.")
+
+
+@app.cli.command('prewarm-schedules')
+@click.option('--workers', type=click.IntRange(min=1), help='Скільки груп завантажувати паралельно.')
+@click.option('--force', is_flag=True, help='Оновити навіть свіжі розклади.')
+@click.pass_context
+def prewarm_schedules_command(ctx, workers, force):
+    """Псевдонім import-schedules для всіх груп користувачів (для старих cron-задач)."""
+    ctx.invoke(import_schedules_command, force=force, fetch_workers=workers)
 
 
 def fetch_and_cache_schedule(group_name):
@@ -455,25 +725,19 @@ def fetch_and_cache_schedule(group_name):
     Запит з детальним дебагом і збереженням HTML файлу.
     """
     try:
-        import urllib.parse
-        encoded_group = urllib.parse.quote(group_name)
+        started_at = datetime.now().isoformat()
 
         # Спробуємо базове посилання без зайвих параметрів тривалості
-        base_url = "https://student.lpnu.ua/students_schedule"
-        full_url = f"{base_url}?studygroup_abbrname={encoded_group}&semestr=1"
-
-        # Використовуємо Session, щоб зберігати куки (іноді це допомагає)
-        session = requests.Session()
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-            'Referer': 'https://student.lpnu.ua/',
-            'Upgrade-Insecure-Requests': '1'
-        }
+        full_url = schedule_page_url(app.config['LPNU_BASE_URL'], group_name)
 
         print(f"🚀 Sending request to: {full_url}")
 
-        response = session.get(full_url, headers=headers, timeout=20)
+        # Спільний клієнт: keep-alive пул, ретраї та circuit breaker (сесія з куками теж спільна)
+        try:
+            response = get_lpnu_client().get(full_url, timeout=(5, 20))
+        except UpstreamUnavailable as e:
+            print(f"⛔ LPNU недоступний: {e}")
+            return False
         response.encoding = 'utf-8'
 
         if response.status_code != 200:
@@ -497,22 +761,30 @@ def fetch_and_cache_schedule(group_name):
                 print("⚠️ На сторінці написано, що розклад не знайдено.")
             return False
 
-        # Зберігаємо
+        # Зберігаємо. BEGIN IMMEDIATE одразу бере блокування на запис, тож два процеси,
+        # що оновлюють ту саму групу, не перемежовують свої зміни
         db = get_db()
-        db.execute('DELETE FROM schedule WHERE group_name = ?', (group_name,))
-
-        now = datetime.now().isoformat()
-        count = 0
-        for row in schedule_rows:
-            db.execute('''INSERT INTO schedule 
-                         (group_name, subgroup, weekday, start_time, end_time, subject, subject_type, location, week_type, cached_at)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                       (group_name, row['subgroup'], row['weekday'], row['start_time'], row['end_time'],
-                        row['subject'], row['subject_type'], row['location'], row['week_type'], now))
-            count += 1
-
-        db.commit()
-        print(f"✅ SUCCESS! Cached {count} classes.")
+        if not db.in_transaction:
+            db.execute('BEGIN IMMEDIATE')
+        try:
+            # Інший процес уже звірив розклад, поки ми ходили на сайт
+            if (schedule_state(db, group_name)[0] or '') > started_at:
+                db.rollback()
+                print(f"⏭️ Розклад {group_name} вже оновлено іншим процесом.")
+                return True
+
+            # Пишемо лише різницю з тим, що вже є в базі
+            diff = write_schedule(db, group_name, schedule_rows, datetime.now().isoformat())
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        if diff.changed:
+            # Старі календарі групи більше не актуальні
+            calendar_cache.invalidate(group_name)
+        print(f"✅ SUCCESS! {group_name}: +{diff.inserted} ~{diff.updated} -{diff.deleted}, "
+              f"без змін {diff.unchanged}.")
         return True
 
     except Exception as e:
@@ -538,17 +810,10 @@ def fetch_lpnu_schedule(group_name, subgroup=1):
     try:
         db = get_db()
 
-        # Check if we have cached data
-        cached = db.execute('SELECT cached_at FROM schedule WHERE group_name = ? LIMIT 1',
-                            (group_name,)).fetchone()
-
-        # If no cache or cache is older than 24 hours, fetch fresh data
-        if not cached:
-            fetch_and_cache_schedule(group_name)
-        else:
-            cached_time = datetime.fromisoformat(cached['cached_at'])
-            if (datetime.now() - cached_time).total_seconds() > 86400:  # 24 hours
-                fetch_and_cache_schedule(group_name)
+        # If no cache or cache is older than 24 hours, refresh it in the background
+        # and serve whatever rows we already have
+        if schedule_is_stale(db, group_name, app.config['SCHEDULE_TTL_SECONDS']):
+            get_schedule_refresher().enqueue(group_name, jitter=0)
 
         # Get schedule for subgroup
         week_type = get_current_week_type()
@@ -593,6 +858,101 @@ def fetch_lpnu_schedule(group_name, subgroup=1):
         return []
 
 
+def build_lpnu_events(schedule_data, req_sub, window_start, window_end, include_raw=False):
+    """
+    Розгортає шаблон групи у події календаря для вікна дат.
+    Повертає (events, filtered_rows).
+    """
+    # Фільтруємо по підгрупі ще до розгортання, щоб не розгортати чужі пари
+    schedule_data = [row for row in schedule_data
+                     if row.get('subgroup', 0) == 0 or row.get('subgroup', 0) == req_sub]
+
+    # Розгортаємо шаблонні дні у конкретні дати лише в межах запитаного вікна.
+    # Парність тижня завжди рахується від початку семестру, а не від початку вікна.
+    compiled = compile_schedule(schedule_data)
+    filtered_rows = []
+    for sem_start, sem_end in iter_semesters(window_start, window_end):
+        filtered_rows.extend(compiled.expand(sem_start, sem_end, window_start, window_end))
+
+    events = []
+    for row in filtered_rows:
+        event_date = row.get('date', '')
+        start_time = row.get('start_time', '08:00')
+        end_time = row.get('end_time', '')
+
+        # Якщо немає часу кінця, додаємо 1 годину 35 хв (стандартна пара + перерва)
+        if not end_time and start_time:
+            try:
+                dt_start = datetime.strptime(start_time, "%H:%M")
+                dt_end = dt_start + timedelta(minutes=95)
+                end_time = dt_end.strftime("%H:%M")
+            except:
+                end_time = "09:35"
+
+        if event_date and start_time:
+            start_iso = f"{event_date}T{start_time}:00"
+            end_iso = f"{event_date}T{end_time}:00"
+
+            event_type = row.get('subject_type', 'Інше').lower()
+            class_name = ['event-other']
+            if 'лекц' in event_type:
+                class_name = ['event-lecture']
+            elif 'практ' in event_type:
+                class_name = ['event-practical']
+            elif 'лаб' in event_type:
+                class_name = ['event-lab']
+
+            extended_props = {
+                'location': row.get('location', ''),
+                'type': row.get('subject_type', 'Інше'),
+                'subgroup': row.get('subgroup', 0)
+            }
+            if include_raw:
+                extended_props['raw'] = row
+
+            events.append({
+                # id стабільний між вікнами: рядок шаблону + дата
+                'id': f"lpnu_{row.get('id', 0)}_{event_date}",
+                'title': row.get('subject', 'Дисципліна'),
+                'start': start_iso,
+                'end': end_iso,
+                'allDay': False,
+                'extendedProps': extended_props,
+                'className': class_name
+            })
+
+    return events, filtered_rows
+
+
+def build_custom_events(custom_events_rows, include_raw=False):
+    custom_events = []
+    for row in custom_events_rows:
+        row_dict = dict(row)
+        if row_dict.get('date') and row_dict.get('start_time'):
+            start_iso = f"{row_dict['date']}T{row_dict['start_time']}:00"
+            end_time = row_dict.get('end_time') or "23:59"
+            end_iso = f"{row_dict['date']}T{end_time}:00"
+
+            extended_props = {
+                'location': '',
+                'type': row_dict.get('type', 'Інше'),
+                'subgroup': 0
+            }
+            if include_raw:
+                extended_props['raw'] = row_dict
+
+            custom_events.append({
+                'id': f"custom_{row_dict['id']}",
+                'title': row_dict['title'],
+                'start': start_iso,
+                'end': end_iso,
+                'allDay': False,
+                'extendedProps': extended_props,
+                'className': [f"event-{row_dict.get('type', 'other')}"]
+            })
+    return custom_events
+
+
 @app.route('/api/schedule/<group_name>')
 def get_schedule(group_name):
     if not g.user:
@@ -604,128 +964,63 @@ def get_schedule(group_name):
     # Отримуємо підгрупу
     req_sub = int(request.args.get('subgroup', '0'))
     if req_sub == 0:
-        db = get_db()
-        user = db.execute('SELECT subgroup FROM users WHERE id = ?', (g.user['id'],)).fetchone()
-        req_sub = user['subgroup'] if user and user['subgroup'] else 1
+        req_sub = g.user['subgroup'] or 1
 
+    # Вікно дат: за замовчуванням - поточний місяць (саме його малює schedule.js)
     try:
-        db = get_db()
+        window_start, window_end = parse_date_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'events': []}), 400
 
-        # === ПОЧАТОК ВИПРАВЛЕННЯ ===
-        # Перевіряємо, чи є взагалі розклад для цієї групи в базі
-        exists = db.execute('SELECT 1 FROM schedule WHERE group_name = ? LIMIT 1', (group_name,)).fetchone()
+    # Сирі рядки (schedule та extendedProps.raw) віддаємо лише на запит: ?raw=1
+    include_raw = request.args.get('raw', '0').lower() in ('1', 'true', 'yes')
 
-        # Якщо в базі пусто - ЙДЕМО НА САЙТ!
-        if not exists:
-            print(f"⚠️ База пуста для групи {group_name}. Завантажую з LPNU...")
-            success = fetch_and_cache_schedule(group_name)
-            if not success:
-                print(f"❌ Не вдалося знайти розклад для {group_name} на сайті.")
-            else:
-                print(f"✅ Розклад завантажено успішно!")
-        # === КІНЕЦЬ ВИПРАВЛЕННЯ ===
-
-        # Тепер, коли дані точно є (або ми спробували їх дістати), читаємо з бази
-        raw_rows = db.execute('''SELECT * FROM schedule WHERE group_name = ?''',
-                              (group_name,)).fetchall()
-
-        # Конвертуємо
-        schedule_data = [dict(row) for row in raw_rows]
-
-        # Дати семестру (Осінь 2025)
-        # Розширив діапазон, щоб точно захопити грудень
-        today = date.today()
-        sem_year = today.year
-        # Якщо зараз кінець року (грудень), семестр почався у вересні цього року
-        if today.month >= 8:
-            sem_start = date(sem_year, 9, 1)
-            sem_end = date(sem_year, 12, 19)
-        else:
-            # Якщо початок року (січень-червень), це 2-й семестр
-            sem_start = date(sem_year, 2, 1)
-            sem_end = date(sem_year, 6, 30)
-
-        # Розгортаємо шаблонні дні у конкретні дати
-        expanded = expand_template_rows_to_dates(schedule_data, sem_start, sem_end)
-
-        # Фільтруємо по підгрупі
-        filtered_rows = [row for row in expanded if row.get('subgroup', 0) == 0 or row.get('subgroup', 0) == req_sub]
-
-        events = []
-        for idx, row in enumerate(filtered_rows):
-            event_date = row.get('date', '')
-            start_time = row.get('start_time', '08:00')
-            end_time = row.get('end_time', '')
-
-            # Якщо немає часу кінця, додаємо 1 годину 35 хв (стандартна пара + перерва)
-            if not end_time and start_time:
-                try:
-                    dt_start = datetime.strptime(start_time, "%H:%M")
-                    dt_end = dt_start + timedelta(minutes=95)
-                    end_time = dt_end.strftime("%H:%M")
-                except:
-                    end_time = "09:35"
-
-            if event_date and start_time:
-                start_iso = f"{event_date}T{start_time}:00"
-                end_iso = f"{event_date}T{end_time}:00"
-
-                event_type = row.get('subject_type', 'Інше').lower()
-                class_name = ['event-other']
-                if 'лекц' in event_type:
-                    class_name = ['event-lecture']
-                elif 'практ' in event_type:
-                    class_name = ['event-practical']
-                elif 'лаб' in event_type:
-                    class_name = ['event-lab']
-
-                events.append({
-                    'id': f"lpnu_{idx}_{row.get('id', idx)}",
-                    'title': row.get('subject', 'Дисципліна'),
-                    'start': start_iso,
-                    'end': end_iso,
-                    'allDay': False,
-                    'extendedProps': {
-                        'location': row.get('location', ''),
-                        'type': row.get('subject_type', 'Інше'),
-                        'subgroup': row.get('subgroup', 0),
-                        'raw': row
-                    },
-                    'className': class_name
-                })
-
-        # Додаємо власні події (Custom Events)
-        custom_events_rows = db.execute('SELECT * FROM events WHERE user_id = ? AND group_name = ?',
-                                        (g.user['id'], group_name)).fetchall()
-
-        custom_events = []
-        for row in custom_events_rows:
-            row_dict = dict(row)
-            if row_dict.get('date') and row_dict.get('start_time'):
-                start_iso = f"{row_dict['date']}T{row_dict['start_time']}:00"
-                end_time = row_dict.get('end_time') or "23:59"
-                end_iso = f"{row_dict['date']}T{end_time}:00"
-
-                custom_events.append({
-                    'id': f"custom_{row_dict['id']}",
-                    'title': row_dict['title'],
-                    'start': start_iso,
-                    'end': end_iso,
-                    'allDay': False,
-                    'extendedProps': {
-                        'location': '',
-                        'type': row_dict.get('type', 'Інше'),
-                        'subgroup': 0,
-                        'raw': row_dict
-                    },
-                    'className': [f"event-{row_dict.get('type', 'other')}"]
-                })
-
-        return jsonify({
-            'events': events + custom_events,
-            'schedule': filtered_rows,
-            'custom_events': custom_events
-        })
+    try:
+        db = get_read_db()
+
+        # Версія розкладу заодно показує, чи є взагалі розклад для цієї групи в базі
+        checked_at, version = schedule_state(db, group_name)
+
+        # Stale-while-revalidate: завжди віддаємо те, що вже є в базі, а на сайт ходимо у фоні.
+        # Якщо в базі пусто - клієнт отримає refreshing=true і перезапитає трохи пізніше.
+        refreshing = False
+        if checked_is_stale(checked_at, app.config['SCHEDULE_TTL_SECONDS']):
+            queued = get_schedule_refresher().enqueue(group_name, jitter=0)
+            if not version:
+                print(f"⚠️ База пуста для групи {group_name}. Завантаження з LPNU заплановано.")
+                refreshing = queued
+
+        # Календар однаковий для всіх студентів групи й підгрупи - беремо готовий JSON з кешу
+        cache_key = (group_name, req_sub, window_start, window_end, include_raw, version)
+        cached = calendar_cache.get(cache_key)
+        if cached is None:
+            raw_rows = db.execute(GROUP_SCHEDULE, (group_name,)).fetchall()
+            events, filtered_rows = build_lpnu_events([dict(row) for row in raw_rows], req_sub,
+                                                      window_start, window_end, include_raw)
+            cached = calendar_cache.put(cache_key, events, filtered_rows if include_raw else None)
+
+        # Власні події (Custom Events) з того ж вікна - персональні, тому не кешуються
+        custom_events_rows = db.execute(CUSTOM_EVENTS_IN_WINDOW,
+                                        (g.user['id'], group_name,
+                                         window_start.isoformat(), window_end.isoformat())).fetchall()
+        custom_json = json_fragment(build_custom_events(custom_events_rows, include_raw))
+
+        # Збираємо відповідь з готових шматків JSON, без повторної серіалізації
+        parts = [b'{"events":[', cached.events_json]
+        if cached.events_json and custom_json:
+            parts.append(b',')
+        parts += [custom_json, b'],"custom_events":[', custom_json,
+                  f'],"start":"{window_start.isoformat()}","end":"{window_end.isoformat()}"'.encode()]
+        if refreshing:
+            parts.append(b',"refreshing":true')
+        if include_raw:
+            parts += [b',"schedule":[', cached.schedule_json, b']']
+        parts.append(b'}')
+
+        response = app.response_class(b''.join(parts), mimetype='application/json')
+        response.set_etag(hashlib.sha1(cached.etag.encode() + custom_json + bytes([refreshing])).hexdigest())
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
 
     except Exception as e:
         print(f"[v0] Error in get_schedule: {e}")
@@ -773,10 +1068,8 @@ def schedule():
     if g.user is None:
         return redirect(url_for('login'))
 
-    db = get_db()
-    user = db.execute('SELECT group_name, subgroup FROM users WHERE id = ?', (g.user['id'],)).fetchone()
-    current_user_group = user['group_name'] if user and user['group_name'] else ''
-    current_user_subgroup = user['subgroup'] if user and user['subgroup'] else 1
+    current_user_group = g.user['group_name'] or ''
+    current_user_subgroup = g.user['subgroup'] or 1
 
     return render_template('schedule.html', current_user_group=current_user_group,
                            current_user_subgroup=current_user_subgroup)
@@ -793,14 +1086,9 @@ def teams():
     if g.user is None:
         return redirect(url_for('login'))
 
-    db = get_db()
+    db = get_read_db()
     # Get all teams where user is a member
-    user_teams = db.execute('''
-        SELECT t.* FROM teams t
-        JOIN team_members tm ON t.id = tm.team_id
-        WHERE tm.user_id = ?
-        ORDER BY t.created_at DESC
-    ''', (g.user['id'],)).fetchall()
+    user_teams = db.execute(USER_TEAMS, (g.user['id'],)).fetchall()
 
     return render_template('teams.html', teams=user_teams)
 
@@ -841,7 +1129,7 @@ def team_chat(team_id):
     if g.user is None:
         return redirect(url_for('login'))
 
-    db = get_db()
+    db = get_read_db()
 
     # Check if user is member of team
     member = db.execute('''
@@ -858,26 +1146,142 @@ def team_chat(team_id):
 
     # Get team members
     members = db.execute('''
-            SELECT u.id, u.first_name, u.last_name, u.avatar 
+            SELECT u.id, u.first_name, u.last_name, COALESCE(u.avatar_64, u.avatar) AS avatar
             FROM team_members tm
             JOIN users u ON tm.user_id = u.id
             WHERE tm.team_id = ?
             ORDER BY u.first_name
         ''', (team_id,)).fetchall()
 
-    # Get messages
-    messages_rows = db.execute('''
-            SELECT m.*, u.first_name, u.last_name, u.avatar  
-            FROM team_messages m
-            JOIN users u ON m.user_id = u.id
-            WHERE m.team_id = ?
-            ORDER BY m.created_at ASC
-        ''', (team_id,)).fetchall()
-
-    messages = [dict(row) for row in messages_rows]
+    # Лише остання сторінка повідомлень - старіші підвантажуються при прокрутці вгору
+    messages, has_more = fetch_team_messages(db, team_id, limit=app.config['CHAT_PAGE_SIZE'])
 
     return render_template('team-chat.html', team=team, is_creator=is_creator,
-                           members=members, messages=messages)
+                           members=members, messages=messages, has_more=has_more)
+
+
+def fetch_team_messages(db, team_id, before=None, limit=50):
+    """
+    Сторінка історії чату: до limit повідомлень з id < before (або найновіші), від старих до нових.
+    Keyset-пагінація по індексу (team_id, id): ціна не залежить від того, як глибоко гортати.
+    Повертає (повідомлення, чи є ще старіші).
+    """
+    if before is None:
+        rows = db.execute(TEAM_CHAT_LATEST, (team_id, limit + 1)).fetchall()
+    else:
+        rows = db.execute(TEAM_CHAT_BEFORE, (team_id, before, limit + 1)).fetchall()
+
+    has_more = len(rows) > limit
+    messages = [dict(row) for row in rows[:limit]]
+    messages.reverse()
+    for msg in messages:
+        msg['file_url'] = stored_file_url(msg['file_digest'], msg['file_name']) if msg['file_digest'] else None
+    return messages, has_more
+
+
+@app.route('/api/team/<int:team_id>/messages', methods=['GET'])
+def get_team_messages(team_id):
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        before = request.args.get('before', type=int)
+        limit = int(request.args.get('limit', app.config['CHAT_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    limit = max(1, min(limit, app.config['CHAT_PAGE_SIZE_MAX']))
+
+    db = get_read_db()
+    member = db.execute('SELECT id FROM team_members WHERE team_id = ? AND user_id = ?',
+                        (team_id, g.user['id'])).fetchone()
+    if not member:
+        return jsonify({'error': 'Not a team member'}), 403
+
+    messages, has_more = fetch_team_messages(db, team_id, before, limit)
+    return jsonify({
+        'messages': messages,
+        'has_more': has_more,
+        # Курсор для наступного запиту: ?before=<id найстарішого повідомлення на сторінці>
+        'next_before': messages[0]['id'] if messages and has_more else None
+    })
+
+
+def _flush_team_message_notifications(team_id, messages):
+    """
+    Пачка повідомлень у команду за вікно NOTIFICATION_FANOUT_WINDOW_SECONDS -> одне сповіщення
+    на учасника (про повідомлення інших), один executemany на всю команду.
+    """
+    with app.app_context():
+        db = get_db()
+        team = db.execute('SELECT name FROM teams WHERE id = ?', (team_id,)).fetchone()
+        if team is None:
+            # Команду розпустили, поки повідомлення чекали на розсилку
+            return
+        member_ids = [row['user_id'] for row in
+                      db.execute('SELECT user_id FROM team_members WHERE team_id = ?', (team_id,)).fetchall()]
+
+        now = datetime.now().isoformat()
+        notifications = []
+        for recipient_id in member_ids:
+            others = [m for m in messages if m['user_id'] != recipient_id]
+            if not others:
+                continue
+            last = others[-1]
+            title = f"Нове повідомлення в '{team['name']}'" if len(others) == 1 else \
+                f"Нові повідомлення в '{team['name']}' ({len(others)})"
+            notifications.append({'recipient_id': recipient_id, 'type': 'team_message', 'title': title,
+                                  'message': f"{last['first_name']} {last['last_name']}: "
+                                             f"{(last['message'] or '📎 ' + (last['file_name'] or ''))[:100]}",
+                                  'related_id': team_id, 'is_read': 0, 'created_at': now})
+        if not notifications:
+            return
+
+        db.executemany('''
+            INSERT INTO notifications (recipient_id, type, title, message, related_id, created_at)
+            VALUES (:recipient_id, :type, :title, :message, :related_id, :created_at)
+        ''', notifications)
+        db.commit()
+
+    # Клієнти догружають нові сповіщення через since_id, тож id у події не потрібен
+    for notif in notifications:
+        push_hub.publish([notif['recipient_id']], 'notification', notif)
+
+
+notification_fanout = FanoutQueue(_flush_team_message_notifications,
+                                  window=app.config['NOTIFICATION_FANOUT_WINDOW_SECONDS'])
+
+
+def post_team_message(db, team_id, message, file_digest=None, file_name=None):
+    """Записує повідомлення (з необов'язковим вкладенням), шле його вкладкам учасників і ставить сповіщення в чергу."""
+    now = datetime.now().isoformat()
+    message_id = db.execute('''INSERT INTO team_messages (team_id, user_id, message, created_at, file_digest, file_name)
+                 VALUES (?, ?, ?, ?, ?, ?)''',
+               (team_id, g.user['id'], message, now, file_digest, file_name)).lastrowid
+    db.commit()
+
+    message_data = {
+        'id': message_id,
+        'team_id': team_id,
+        'user_id': g.user['id'],
+        'first_name': g.user['first_name'],
+        'last_name': g.user['last_name'],
+        'avatar': g.user['avatar_64'] or g.user['avatar'],
+        'message': message,
+        'created_at': now,
+        'file_name': file_name,
+        'file_url': stored_file_url(file_digest, file_name) if file_digest else None,
+    }
+    # Лише після коміту: клієнт, що отримав подію, одразу побачить рядок у базі
+    member_ids = [row['user_id'] for row in
+                  db.execute('SELECT user_id FROM team_members WHERE team_id = ?', (team_id,)).fetchall()]
+    push_hub.publish(member_ids, 'team_message', message_data)
+    # Сповіщення учасникам пишуться пакетом у фоні, серія повідомлень - одне сповіщення
+    notification_fanout.add(team_id, message_data)
+    return message_data
+
+
+def is_team_member(db, team_id, user_id):
+    return db.execute(TEAM_MEMBERSHIP, (team_id, user_id)).fetchone() is not None
 
 
 @app.route('/api/team/<int:team_id>/message', methods=['POST'])
@@ -886,14 +1290,7 @@ def send_team_message(team_id):
         return jsonify({'error': 'Not authenticated'}), 401
 
     db = get_db()
-
-    # Check membership
-    member = db.execute('''
-        SELECT * FROM team_members
-        WHERE team_id = ? AND user_id = ?
-    ''', (team_id, g.user['id'])).fetchone()
-
-    if not member:
+    if not is_team_member(db, team_id, g.user['id']):
         return jsonify({'error': 'Not a member'}), 403
 
     data = request.get_json()
@@ -903,37 +1300,43 @@ def send_team_message(team_id):
         return jsonify({'error': 'Invalid message'}), 400
 
     try:
-        now = datetime.now().isoformat()
-        db.execute('''INSERT INTO team_messages (team_id, user_id, message, created_at)
-                     VALUES (?, ?, ?, ?)''',
-                   (team_id, g.user['id'], message, now))
-
-        team = db.execute('SELECT * FROM teams WHERE id = ?', (team_id,)).fetchone()
-        team_members = db.execute('''
-            SELECT user_id FROM team_members WHERE team_id = ? AND user_id != ?
-        ''', (team_id, g.user['id'])).fetchall()
-
-        for member_row in team_members:
-            recipient_id = member_row['user_id']
-            db.execute('''
-                INSERT INTO notifications (recipient_id, type, title, message, related_id, created_at)
-                VALUES (?, 'team_message', ?, ?, ?, ?)
-            ''', (recipient_id,
-                  f"Нове повідомлення в '{team['name']}'",
-                  f"{g.user['first_name']} {g.user['last_name']}: {message[:100]}",
-                  team_id,
-                  now))
+        return jsonify({'success': True, 'message': post_team_message(db, team_id, message)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        db.commit()
 
-        return jsonify({'success': True, 'message': {
-            'id': db.execute('SELECT last_insert_rowid()').fetchone()[0],
-            'user_id': g.user['id'],
-            'first_name': g.user['first_name'],
-            'last_name': g.user['last_name'],
-            'message': message,
-            'created_at': now
-        }})
+@app.route('/api/team/<int:team_id>/message/upload', methods=['POST'])
+def send_team_message_with_file(team_id):
+    """Повідомлення з файлом (multipart: message, file). Файл пишеться у сховище частинами, без читання в пам'ять."""
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    db = get_db()
+    # Членство перевіряємо до розбору тіла: чужий файл навіть не читаємо
+    if not is_team_member(db, team_id, g.user['id']):
+        return jsonify({'error': 'Not a member'}), 403
+    too_large = upload_too_large(app.config['CHAT_FILE_MAX_BYTES'])
+    if too_large:
+        return too_large
+
+    message = request.form.get('message', '').strip()
+    file = request.files.get('file')
+    if file is not None and not file.filename:
+        file = None
+    if (not message and file is None) or len(message) > 5000:
+        return jsonify({'error': 'Invalid message'}), 400
+
+    file_digest = file_name = None
+    if file is not None:
+        try:
+            file_digest = save_upload(file, app.config['CHAT_FILE_MAX_BYTES']).digest
+        except FileTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        file_name = os.path.basename(file.filename.replace('\\', '/'))[:255] or 'file'
+
+    try:
+        return jsonify({'success': True,
+                        'message': post_team_message(db, team_id, message, file_digest, file_name)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -971,15 +1374,16 @@ def add_team_member(team_id):
         return jsonify({'error': 'User already in team'}), 400
 
     # Send invite notification
-    db.execute('''
+    notif = {'recipient_id': user['id'], 'type': 'team_invite',
+             'title': f"Запрошення до команди '{team['name']}'",
+             'message': f"{g.user['first_name']} {g.user['last_name']} запрошує вас до команди '{team['name']}'",
+             'related_id': team_id, 'is_read': 0, 'created_at': datetime.now().isoformat()}
+    notif['id'] = db.execute('''
         INSERT INTO notifications (recipient_id, type, title, message, related_id, created_at)
         VALUES (?, 'team_invite', ?, ?, ?, ?)
-    ''', (user['id'],
-          f"Запрошення до команди '{team['name']}'",
-          f"{g.user['first_name']} {g.user['last_name']} запрошує вас до команди '{team['name']}'",
-          team_id,
-          datetime.now().isoformat()))
+    ''', (user['id'], notif['title'], notif['message'], team_id, notif['created_at'])).lastrowid
     db.commit()
+    push_hub.publish([user['id']], 'notification', notif)
 
     return jsonify({'status': 'ok', 'message': 'Invite sent'})
 
@@ -1034,7 +1438,7 @@ def get_team_members(team_id):
     if not g.user:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    db = get_db()
+    db = get_read_db()
     # Verify user is member of team
     member = db.execute(
         'SELECT * FROM team_members WHERE team_id = ? AND user_id = ?',
@@ -1045,7 +1449,7 @@ def get_team_members(team_id):
         return jsonify({'error': 'Not a team member'}), 403
 
     members = db.execute('''
-            SELECT u.id, u.first_name, u.last_name, u.avatar 
+            SELECT u.id, u.first_name, u.last_name, COALESCE(u.avatar_64, u.avatar) AS avatar
             FROM users u
             JOIN team_members tm ON u.id = tm.user_id
             WHERE tm.team_id = ?
@@ -1100,45 +1504,102 @@ def disband_team(team_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/stream')
+def push_stream():
+    """
+    Server-Sent Events: одне з'єднання на вкладку. Події: notification, team_message,
+    team_member та resync (клієнт пропустив події і має перезавантажити стан).
+    З'єднання займає обробника на весь час життя вкладки - потрібен gevent-воркер, не sync/gthread.
+    Події публікуються лише в межах процесу; що сюди не дійшло, клієнт догружає повільним опитуванням.
+    """
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    sub = push_hub.subscribe(g.user['id'])
+    response = Response(event_stream(push_hub, sub, app.config['PUSH_HEARTBEAT_SECONDS']),
+                        mimetype='text/event-stream')
+    # finally генератора не виконається, якщо тіло так і не почали читати (HEAD, обрив до першого
+    # байта) - тож відписуємось при закритті відповіді, це WSGI-сервер робить завжди
+    response.call_on_close(lambda: push_hub.unsubscribe(sub))
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx інакше буферизує відповідь і події приходять пачками
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def unread_notifications_count(db, user_id):
+    """Лічильник непрочитаних (notification_counters, тримається тригерами) - без COUNT(*) по сповіщеннях."""
+    row = db.execute(UNREAD_NOTIFICATIONS_COUNT, (user_id,)).fetchone()
+    return row['unread'] if row else 0
+
+
 @app.route('/api/notifications/unread-count', methods=['GET'])
 def get_unread_count():
-    db = get_db()
-    cursor = db.execute(
-        'SELECT COUNT(*) as count FROM notifications WHERE recipient_id = ? AND is_read = 0',
-        (g.user['id'],)
-    )
-    count = cursor.fetchone()['count']
-    return jsonify({'count': count})
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify({'count': unread_notifications_count(get_read_db(), g.user['id'])})
 
 
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
-    db = get_db()
-    cursor = db.execute('''
-        SELECT * FROM notifications 
-        WHERE recipient_id = ? 
-        ORDER BY created_at DESC
-    ''', (g.user['id'],))
-    notifications = cursor.fetchall()
-    return jsonify([dict(n) for n in notifications])
+    """
+    Останні limit сповіщень, новіші першими. З ?since_id=N - лише ті, що з'явились після N,
+    тож клієнт, який уже має список, отримує майже порожню відповідь.
+    """
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        since_id = int(request.args.get('since_id', 0))
+        limit = int(request.args.get('limit', app.config['NOTIFICATIONS_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': 'Invalid since_id or limit'}), 400
+    limit = max(1, min(limit, app.config['NOTIFICATIONS_PAGE_SIZE_MAX']))
+
+    db = get_read_db()
+    rows = db.execute(NOTIFICATIONS_SINCE, (g.user['id'], since_id, limit + 1)).fetchall()
+
+    notifications = [dict(n) for n in rows[:limit]]
+    return jsonify({
+        'notifications': notifications,
+        # Нових більше, ніж limit - клієнту варто перезавантажити список повністю
+        'has_more': len(rows) > limit,
+        'last_id': notifications[0]['id'] if notifications else since_id,
+        'unread_count': unread_notifications_count(db, g.user['id'])
+    })
 
 
 @app.route('/api/notification/<int:notif_id>/read', methods=['POST'])
 def mark_notification_read(notif_id):
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
     db = get_db()
     db.execute('UPDATE notifications SET is_read = 1 WHERE id = ? AND recipient_id = ?',
                (notif_id, g.user['id']))
     db.commit()
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'unread_count': unread_notifications_count(db, g.user['id'])})
+
+
+@app.route('/api/notifications/read-all', methods=['POST'])
+def mark_all_notifications_read():
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+    db = get_db()
+    cursor = db.execute(MARK_ALL_NOTIFICATIONS_READ, (g.user['id'],))
+    db.commit()
+    return jsonify({'status': 'ok', 'updated': cursor.rowcount,
+                    'unread_count': unread_notifications_count(db, g.user['id'])})
 
 
 @app.route('/api/notification/<int:notif_id>/delete', methods=['DELETE'])
 def delete_notification(notif_id):
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
     db = get_db()
     db.execute('DELETE FROM notifications WHERE id = ? AND recipient_id = ?',
                (notif_id, g.user['id']))
     db.commit()
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'unread_count': unread_notifications_count(db, g.user['id'])})
 
 
 @app.route('/api/notification/<int:notif_id>/team-invite/accept', methods=['POST'])
@@ -1167,21 +1628,98 @@ def accept_team_invite(notif_id):
     db.execute('UPDATE notifications SET is_read = 1 WHERE id = ?', (notif_id,))
     db.commit()
 
+    # Учасники команди (і сам новий учасник в інших вкладках) оновлюють склад команди
+    member_ids = [row['user_id'] for row in
+                  db.execute('SELECT user_id FROM team_members WHERE team_id = ?', (team_id,)).fetchall()]
+    push_hub.publish(member_ids, 'team_member', {
+        'team_id': team_id,
+        'user': {'id': g.user['id'], 'first_name': g.user['first_name'],
+                 'last_name': g.user['last_name'], 'avatar': g.user['avatar_64'] or g.user['avatar']}
+    })
+
     return jsonify({'status': 'ok'})
 
 
+def run_notification_retention(chunk_size=500, log=print):
+    """Одне очищення сповіщень за NOTIFICATION_RETENTION_DAYS з розміром таблиць до і після."""
+    with app.app_context():
+        db = get_db()
+        before, size_before = table_rows(db), database_size(db)
+        compacted = compact_notifications(db, datetime.now(), app.config['NOTIFICATION_RETENTION_DAYS'],
+                                          chunk_size=chunk_size)
+        after, size_after = table_rows(db), database_size(db)
+        freed = free_pages(db)
+    for table in before:
+        log(f"🧹 {table}: {before[table]} -> {after[table]} рядків")
+    log(f"🧹 Стиснуто в підсумки: {compacted}; файл бази {size_before // 1024} -> {size_after // 1024} КБ, "
+        f"вільних сторінок у файлі: {freed}")
+    return compacted
+
+
+def _is_notification_retention_leader():
+    """Очищення робить один процес на базу, а не кожен воркер."""
+    ttl = 2 * app.config['NOTIFICATION_RETENTION_INTERVAL_SECONDS'] + 60
+    with app.app_context():
+        return acquire_lease(get_db(), 'notification-retention', ttl)
+
+
+notification_retention_job = RetentionJob(run_notification_retention,
+                                          interval=app.config['NOTIFICATION_RETENTION_INTERVAL_SECONDS'],
+                                          leader_fn=_is_notification_retention_leader)
+
+
+@app.before_request
+def start_notification_retention():
+    notification_retention_job.start()
+
+
+@app.cli.command('compact-notifications')
+@click.option('--chunk-size', default=500, show_default=True, help='Скільки рядків видаляти за одну транзакцію.')
+def compact_notifications_command(chunk_size):
+    """Стиснути старі прочитані сповіщення в підсумки користувачів (для cron замість фонового потоку)."""
+    init_db()
+    run_notification_retention(chunk_size=chunk_size, log=click.echo)
+
+
+def parse_id_list(value, field):
+    """Список id із JSON запиту -> відсортовані унікальні int. ValueError, якщо це не список id."""
+    if not value:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f'{field} must be a list of ids')
+    try:
+        return sorted({int(item) for item in value})
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a list of ids')
+
+
+def set_task_assignees(db, task_id, user_ids):
+    db.execute('DELETE FROM task_assignees WHERE task_id = ?', (task_id,))
+    db.executemany('INSERT INTO task_assignees (task_id, user_id) VALUES (?, ?)',
+                   [(task_id, user_id) for user_id in user_ids])
+
+
+def tasks_with_assignees(db, rows):
+    """Рядки tasks -> dict-и з assigned_to_ids (список id) - одним запитом до task_assignees на всі задачі."""
+    tasks_list = [dict(row) for row in rows]
+    by_id = {}
+    for task in tasks_list:
+        task['assigned_to_ids'] = []
+        by_id[task['id']] = task
+    if by_id:
+        for row in db.execute(task_assignees_query(len(by_id)), list(by_id)):
+            by_id[row['task_id']]['assigned_to_ids'].append(row['user_id'])
+    return tasks_list
+
+
 @app.route('/tasks')
 def tasks():
     if g.user is None:
         return redirect(url_for('login'))
 
-    db = get_db()
+    db = get_read_db()
     # Get personal tasks and team tasks where user is a member
-    personal_tasks = db.execute('''
-        SELECT * FROM tasks 
-        WHERE creator_id = ? AND team_id IS NULL
-        ORDER BY is_completed ASC, deadline ASC
-    ''', (g.user['id'],)).fetchall()
+    personal_tasks = db.execute(PERSONAL_TASKS, (g.user['id'],)).fetchall()
 
     user_teams = db.execute('''
         SELECT t.id, t.name FROM teams t
@@ -1197,14 +1735,10 @@ def get_personal_tasks():
     if not g.user:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    db = get_db()
-    tasks_list = db.execute('''
-        SELECT * FROM tasks 
-        WHERE creator_id = ? AND team_id IS NULL
-        ORDER BY is_completed ASC, deadline ASC
-    ''', (g.user['id'],)).fetchall()
+    db = get_read_db()
+    tasks_list = db.execute(PERSONAL_TASKS, (g.user['id'],)).fetchall()
 
-    return jsonify([dict(row) for row in tasks_list])
+    return jsonify(tasks_with_assignees(db, tasks_list))
 
 
 @app.route('/api/tasks/team/<int:team_id>', methods=['GET'])
@@ -1212,7 +1746,7 @@ def get_team_tasks(team_id):
     if not g.user:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    db = get_db()
+    db = get_read_db()
     # Check if user is member of team
     is_member = db.execute('''
         SELECT id FROM team_members 
@@ -1222,13 +1756,21 @@ def get_team_tasks(team_id):
     if not is_member:
         return jsonify({'error': 'Not a team member'}), 403
 
-    tasks_list = db.execute('''
-        SELECT * FROM tasks 
-        WHERE team_id = ?
-        ORDER BY is_completed ASC, deadline ASC
-    ''', (team_id,)).fetchall()
+    tasks_list = db.execute(TEAM_TASKS, (team_id,)).fetchall()
 
-    return jsonify([dict(row) for row in tasks_list])
+    return jsonify(tasks_with_assignees(db, tasks_list))
+
+
+@app.route('/api/tasks/assigned', methods=['GET'])
+def get_assigned_tasks():
+    """Задачі, призначені поточному користувачу, в усіх його командах - один індексований запит."""
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    db = get_read_db()
+    tasks_list = db.execute(ASSIGNED_TASKS, (g.user['id'],)).fetchall()
+
+    return jsonify(tasks_with_assignees(db, tasks_list))
 
 
 @app.route('/api/tasks', methods=['POST'])
@@ -1240,61 +1782,76 @@ def create_task():
     db = get_db()
 
     try:
-        now = datetime.now().isoformat()
-        assigned_ids = data.get('assigned_to_ids')
-        assigned_ids_json = json.dumps(assigned_ids) if assigned_ids else None
+        assigned_ids = parse_id_list(data.get('assigned_to_ids'), 'assigned_to_ids')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    try:
+        now = datetime.now().isoformat()
         cursor = db.execute('''
-            INSERT INTO tasks (title, description, deadline, creator_id, team_id, assigned_to_ids, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO tasks (title, description, deadline, creator_id, team_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
         ''', (data.get('title'), data.get('description'), data.get('deadline'),
-              g.user['id'], data.get('team_id'), assigned_ids_json, now))
+              g.user['id'], data.get('team_id'), now))
 
         task_id = cursor.lastrowid
+        set_task_assignees(db, task_id, assigned_ids)
         db.commit()
+        dashboard_cache.invalidate(g.user['id'])
         return jsonify({'success': True, 'task_id': task_id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/tasks/<int:task_id>', methods=['PUT'])
+# Поля задачі, які можна змінювати через PATCH/PUT (назви колонок - лише з цього списку, не з запиту)
+TASK_UPDATABLE_COLUMNS = ('title', 'description', 'deadline', 'is_completed')
+
+# Змінювати задачу може її автор або творець команди, до якої вона належить
+TASK_PERMISSION_SQL = '(creator_id = :user_id OR team_id IN (SELECT id FROM teams WHERE creator_id = :user_id))'
+
+
+def _task_access_error(db, task_id):
+    """Чому запит із TASK_PERMISSION_SQL не зачепив задачу: її немає (404) або немає прав (403)."""
+    if db.execute('SELECT 1 FROM tasks WHERE id = ?', (task_id,)).fetchone() is None:
+        return jsonify({'error': 'Task not found'}), 404
+    return jsonify({'error': 'Permission denied'}), 403
+
+
+@app.route('/api/tasks/<int:task_id>', methods=['PUT', 'PATCH'])
 def update_task(task_id):
+    """Оновлює лише передані поля одним UPDATE, у якому ж перевіряються права."""
     if not g.user:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    data = request.get_json()
+    data = request.get_json() or {}
     db = get_db()
 
-    # Check ownership
-    task = db.execute('SELECT creator_id, team_id FROM tasks WHERE id = ?', (task_id,)).fetchone()
-    if not task:
-        return jsonify({'error': 'Task not found'}), 404
-
-    is_creator = task['creator_id'] == g.user['id']
-    is_team_creator = False
-
-    if task['team_id']:
-        team = db.execute('SELECT creator_id FROM teams WHERE id = ?', (task['team_id'],)).fetchone()
-        is_team_creator = team and team['creator_id'] == g.user['id']
+    try:
+        assigned_ids = parse_id_list(data['assigned_to_ids'], 'assigned_to_ids') if 'assigned_to_ids' in data else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    if not (is_creator or is_team_creator):
-        return jsonify({'error': 'Permission denied'}), 403
+    columns = [column for column in TASK_UPDATABLE_COLUMNS if column in data]
+    params = {column: data[column] for column in columns}
+    params.update(task_id=task_id, user_id=g.user['id'])
 
     try:
-        if 'is_completed' in data:
-            db.execute('UPDATE tasks SET is_completed = ? WHERE id = ?', (data['is_completed'], task_id))
-        if 'title' in data:
-            db.execute('UPDATE tasks SET title = ? WHERE id = ?', (data['title'], task_id))
-        if 'description' in data:
-            db.execute('UPDATE tasks SET description = ? WHERE id = ?', (data['description'], task_id))
-        if 'deadline' in data:
-            db.execute('UPDATE tasks SET deadline = ? WHERE id = ?', (data['deadline'], task_id))
-        if 'assigned_to_ids' in data:
-            assigned_ids = data['assigned_to_ids']
-            db.execute('UPDATE tasks SET assigned_to_ids = ? WHERE id = ?',
-                       (json.dumps(assigned_ids) if assigned_ids else None, task_id))
+        if columns:
+            assignments = ', '.join(f'{column} = :{column}' for column in columns)
+            cursor = db.execute(f'UPDATE tasks SET {assignments} WHERE id = :task_id AND {TASK_PERMISSION_SQL}',
+                                params)
+            allowed = cursor.rowcount > 0
+        else:
+            allowed = db.execute(f'SELECT 1 FROM tasks WHERE id = :task_id AND {TASK_PERMISSION_SQL}',
+                                 params).fetchone() is not None
+        if not allowed:
+            return _task_access_error(db, task_id)
+
+        if assigned_ids is not None:
+            set_task_assignees(db, task_id, assigned_ids)
 
         db.commit()
+        dashboard_cache.invalidate(g.user['id'])
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1306,87 +1863,180 @@ def delete_task(task_id):
         return jsonify({'error': 'Not authenticated'}), 401
 
     db = get_db()
-    task = db.execute('SELECT creator_id, team_id FROM tasks WHERE id = ?', (task_id,)).fetchone()
-
-    if not task:
-        return jsonify({'error': 'Task not found'}), 404
-
-    is_creator = task['creator_id'] == g.user['id']
-    is_team_creator = False
-
-    if task['team_id']:
-        team = db.execute('SELECT creator_id FROM teams WHERE id = ?', (task['team_id'],)).fetchone()
-        is_team_creator = team and team['creator_id'] == g.user['id']
-
-    if not (is_creator or is_team_creator):
-        return jsonify({'error': 'Permission denied'}), 403
-
     try:
-        db.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+        cursor = db.execute(f'DELETE FROM tasks WHERE id = :task_id AND {TASK_PERMISSION_SQL}',
+                            {'task_id': task_id, 'user_id': g.user['id']})
+        if not cursor.rowcount:
+            return _task_access_error(db, task_id)
         db.commit()
+        dashboard_cache.invalidate(g.user['id'])
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-def week_parity_for_date(date_obj, sem_start):
+@app.route('/api/tasks/bulk', methods=['POST'])
+def bulk_tasks():
     """
-    Calculate week parity (чисельник/знаменник) for a given date.
-    Swapped the parity calculation - first week is чисельник (odd weeks), знаменник (even weeks)
+    Одна дія над багатьма задачами в одній транзакції:
+    {"action": "complete" | "reopen" | "delete" | "assign", "task_ids": [...], "assigned_to_ids": [...]}.
+    Задачі, яких немає або які користувач не може змінювати, пропускаються і повертаються в skipped.
     """
-    days_since_start = (date_obj - sem_start).days
-    week_num = (days_since_start // 7) + 1
-    return 'знаменник' if week_num % 2 == 1 else 'чисельник'
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
 
+    data = request.get_json() or {}
+    action = data.get('action')
+    if action not in ('complete', 'reopen', 'delete', 'assign'):
+        return jsonify({'error': 'action must be one of complete, reopen, delete, assign'}), 400
 
-def expand_template_rows_to_dates(schedule_data, sem_start, sem_end, first_week='знаменник'):
-    """
-    Expand template schedule rows (with weekday names) to concrete dates.
-    Returns list of events for each date in the semester.
-    """
-    weekday_map = {
-        'Понеділок': 0, 'Пн': 0,
-        'Вівторок': 1, 'Вт': 1,
-        'Середа': 2, 'Ср': 2,
-        'Четвер': 3, 'Чт': 3,
-        "П'ятниця": 4, 'Пт': 4,
-        'Субота': 5, 'Сб': 5,
-        'Неділя': 6, 'Нд': 6
+    try:
+        task_ids = parse_id_list(data.get('task_ids'), 'task_ids')
+        assigned_ids = parse_id_list(data.get('assigned_to_ids'), 'assigned_to_ids') if action == 'assign' else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not task_ids:
+        return jsonify({'error': 'task_ids is required'}), 400
+    if len(task_ids) > app.config['TASKS_BULK_MAX']:
+        return jsonify({'error': f"At most {app.config['TASKS_BULK_MAX']} tasks per request"}), 400
+
+    db = get_db()
+    params = {f'id{i}': task_id for i, task_id in enumerate(task_ids)}
+    params['user_id'] = g.user['id']
+    id_list = ', '.join(f':id{i}' for i in range(len(task_ids)))
+
+    try:
+        db.execute('BEGIN IMMEDIATE')
+        allowed = [row['id'] for row in db.execute(f'''
+            SELECT id FROM tasks WHERE id IN ({id_list}) AND {TASK_PERMISSION_SQL}
+        ''', params)]
+        if allowed:
+            allowed_list = ', '.join('?' * len(allowed))
+            if action == 'delete':
+                db.execute(f'DELETE FROM tasks WHERE id IN ({allowed_list})', allowed)
+            elif action == 'assign':
+                db.execute(f'DELETE FROM task_assignees WHERE task_id IN ({allowed_list})', allowed)
+                db.executemany('INSERT INTO task_assignees (task_id, user_id) VALUES (?, ?)',
+                               [(task_id, user_id) for task_id in allowed for user_id in assigned_ids])
+            else:
+                db.execute(f'UPDATE tasks SET is_completed = ? WHERE id IN ({allowed_list})',
+                           [1 if action == 'complete' else 0, *allowed])
+        db.commit()
+        dashboard_cache.invalidate(g.user['id'])
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    allowed_set = set(allowed)
+    return jsonify({'success': True, 'updated': allowed,
+                    'skipped': [task_id for task_id in task_ids if task_id not in allowed_set]})
+
+
+def dashboard_classes(db, group_name, subgroup, user_id, day):
+    """Пари групи й власні події користувача на один день, відсортовані за початком."""
+    checked_at, version = schedule_state(db, group_name)
+    if checked_is_stale(checked_at, app.config['SCHEDULE_TTL_SECONDS']):
+        get_schedule_refresher().enqueue(group_name, jitter=0)
+
+    # Той самий кеш календарів, що й /api/schedule: день групи рахується один раз на всіх її студентів
+    cache_key = (group_name, subgroup, day, day, False, version)
+    cached = calendar_cache.get(cache_key)
+    if cached is None:
+        raw_rows = db.execute(GROUP_SCHEDULE, (group_name,)).fetchall()
+        events, _ = build_lpnu_events([dict(row) for row in raw_rows], subgroup, day, day)
+        cached = calendar_cache.put(cache_key, events)
+    classes = json.loads(b'[' + cached.events_json + b']')
+
+    custom_rows = db.execute(CUSTOM_EVENTS_IN_WINDOW,
+                             (user_id, group_name, day.isoformat(), day.isoformat())).fetchall()
+    classes.extend(build_custom_events(custom_rows))
+    classes.sort(key=lambda event: event['start'])
+    return classes
+
+
+def build_dashboard(db, user, day):
+    """Усе для головної сторінки користувача, крім лічильника непрочитаних (він завжди свіжий)."""
+    group_name = (user.get('group_name') or '').strip().upper()
+    classes = dashboard_classes(db, group_name, user.get('subgroup') or 1, user['id'], day) if group_name else []
+
+    # Невиконані задачі з дедлайном до horizon (прострочені теж): особисті, команд користувача
+    # і особисті задачі інших, де він виконавець
+    horizon = (datetime.combine(day, datetime.min.time())
+               + timedelta(days=app.config['DASHBOARD_DEADLINE_DAYS'] + 1)).isoformat()
+    deadlines = db.execute(DASHBOARD_DEADLINES, {'user_id': user['id'], 'horizon': horizon,
+                                                 'limit': app.config['DASHBOARD_DEADLINES_LIMIT']}).fetchall()
+
+    # Останнє повідомлення кожної команди користувача - MAX(id) по індексу (team_id, id)
+    activity = db.execute(DASHBOARD_TEAM_ACTIVITY, (user['id'],)).fetchall()
+
+    return {
+        'date': day.isoformat(),
+        'classes': classes,
+        'deadlines': [dict(row) for row in deadlines],
+        'team_activity': [{
+            'team_id': row['team_id'],
+            'team_name': row['team_name'],
+            'last_message': None if row['message_id'] is None else {
+                'id': row['message_id'],
+                'author': f"{row['first_name']} {row['last_name']}",
+                'message': row['message'][:100],
+                'created_at': row['created_at'],
+            },
+        } for row in activity],
     }
 
-    expanded = []
-    current_date = sem_start
 
-    while current_date <= sem_end:
-        weekday_num = current_date.weekday()
-        current_parity = week_parity_for_date(current_date, sem_start)
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """Один запит замість розкладу, задач кожної команди, сповіщень і лічильника окремо."""
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
 
-        for row in schedule_data:
-            template_weekday = row.get('weekday', '').strip()
-            template_parity = row.get('week_type', 'обидва')
+    db = get_read_db()
+    today = date.today()
+    # Запис дійсний лише для того самого дня і тієї самої групи/підгрупи
+    fingerprint = (today, g.user.get('group_name'), g.user.get('subgroup'))
+    cached = dashboard_cache.get(g.user['id'])
+    if cached is None or cached[0] != fingerprint:
+        cached = dashboard_cache.put(g.user['id'], (fingerprint, build_dashboard(db, g.user, today)))
 
-            # Find matching weekday
-            found_weekday = False
-            for uk_name, num in weekday_map.items():
-                if uk_name.lower() in template_weekday.lower():
-                    found_weekday = (num == weekday_num)
-                    break
+    response = jsonify(dict(cached[1], unread_count=unread_notifications_count(db, g.user['id'])))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
-            if not found_weekday:
-                continue
 
-            # Check if parity matches
-            if template_parity != 'обидва' and template_parity != current_parity:
-                continue
+@app.route('/api/search', methods=['GET'])
+def search():
+    """
+    Повнотекстовий пошук: ?q=текст&type=all|messages|tasks|events&limit=&offset=.
+    Лише по тому, що користувач і так бачить: повідомлення його команд, його задачі й події.
+    """
+    if not g.user:
+        return jsonify({'error': 'Not authenticated'}), 401
 
-            # Add expanded event
-            expanded_row = dict(row)
-            expanded_row['date'] = current_date.isoformat()
-            expanded.append(expanded_row)
+    terms = query_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({'error': 'Empty query'}), 400
 
-        current_date += timedelta(days=1)
+    kind = request.args.get('type', 'all')
+    if kind != 'all' and kind not in SEARCHERS:
+        return jsonify({'error': f"type must be one of all, {', '.join(SEARCHERS)}"}), 400
 
-    return expanded
+    try:
+        limit = int(request.args.get('limit', app.config['SEARCH_PAGE_SIZE']))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    limit = max(1, min(limit, app.config['SEARCH_PAGE_SIZE_MAX']))
+    offset = max(0, offset)
+
+    db = get_read_db()
+    results = {}
+    for name, searcher in SEARCHERS.items():
+        if kind in ('all', name):
+            results[name] = searcher(db, g.user['id'], terms, limit, offset,
+                                     window=app.config['SEARCH_RANK_WINDOW'])
+    return jsonify({'query': request.args.get('q', ''), 'limit': limit, 'offset': offset, 'results': results})
 
 
 def login_required(f):
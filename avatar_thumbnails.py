@@ -0,0 +1,58 @@
+# avatar_thumbnails.py — маленькі квадратні копії аватарок (32/64/128 px) для списків і чату
+import io
+
+# Pillow необов'язковий: без нього аватарки віддаються як є, а мініатюри просто не створюються
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+AVATAR_SIZES = (32, 64, 128)
+
+# Завантажене фото більше за це вважаємо зламаним/шкідливим і не розпаковуємо
+MAX_SOURCE_PIXELS = 40_000_000
+
+
+def thumbnails_available():
+    return Image is not None
+
+
+def thumbnail_format():
+    """WebP, якщо Pillow зібрано з ним (у рази менший за PNG), інакше PNG. -> (формат Pillow, розширення)"""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'PNG', 'png'
+
+
+def render_thumbnails(source_path, sizes=AVATAR_SIZES):
+    """
+    Квадратні мініатюри з центру зображення. Повертає {size: (bytes, extension)}.
+    Фото з телефона декодується одразу зменшеним (draft для JPEG) - повний розмір у пам'ять не потрапляє.
+    """
+    image_format, extension = thumbnail_format()
+    largest = max(sizes)
+    with Image.open(source_path) as image:
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise ValueError('image is too large')
+        image.draft('RGB', (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        result = {}
+        for size in sorted(sizes, reverse=True):
+            thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            buf = io.BytesIO()
+            if image_format == 'WEBP':
+                thumb.save(buf, image_format, quality=85, method=4)
+            else:
+                thumb.save(buf, image_format, optimize=True)
+            result[size] = (buf.getvalue(), extension)
+    return result
+
+
+def store_thumbnails(store, source_path, sizes=AVATAR_SIZES):
+    """Мініатюри у сховищі файлів (ContentStore). -> {size: (digest, extension)}"""
+    stored = {}
+    for size, (data, extension) in render_thumbnails(source_path, sizes).items():
+        stored[size] = (store.save_stream(io.BytesIO(data), len(data)).digest, extension)
+    return stored
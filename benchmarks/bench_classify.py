@@ -0,0 +1,127 @@
+# bench_classify.py — класифікація блоків пари: скомпільовані таблиці (schedule_classify) проти старого коду
+# Запуск: python benchmarks/bench_classify.py [кількість блоків]
+# Код виходу 1, якщо нова класифікація хоч для одного блоку дає інший результат, ніж стара.
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_classify import classify_details, classify_elem_id, detect_subgroup  # noqa: E402
+from schedule_parser import build_rows  # noqa: E402
+
+SUBJECTS = ['Фізика', 'Вища математика', 'Програмування | С++', 'Англійська мова', 'Філософія',
+            'Консультація з курсового проєкту', 'Фізичне виховання', 'Хімія & матеріалознавство']
+TEACHERS = ['Петренко П.П.', 'Сидоренко С.С.', 'доц. Гнатюк Р.Р.', 'Мельник О.В., Бондар А.А.', '']
+LOCATIONS = ['301 IV н.к.', '12', 'ауд. 5', 'Спорткомплекс', 'онлайн', '120 ХІ н.к.', 'корпус 2, 415', '']
+TYPES = ['Лекція', 'Практична', 'Лабораторна', 'Консультація', 'Інше', 'лаб. практикум', 'ЛЕКЦ.', '']
+SUBGROUP_MARKERS = ['', '1 підгр.', 'підгрупа 2', 'підгр. 1', 'I підгр', 'II підгр.', '2/підгр', '(1)']
+ELEM_IDS = ['group_full', 'group_chys', 'group_znam', 'sub_1_full', 'sub_2_chys', 'sub_1_znam', '']
+
+
+# --- Як було до schedule_classify (для перевірки однаковості й порівняння) ---
+
+def old_detect_subgroup(block_text):
+    t = block_text.lower()
+    if re.search(r'\b(підгр[^0-9]*1|\b1\s*підгр|\bпідгр\.?\s*1|$$1$$|\b1\/?підгр)\b', t):
+        return 1
+    if re.search(r'\b(підгр[^0-9]*2|\b2\s*підгр|\bпідгр\.?\s*2|$$2$$|\b2\/?підгр)\b', t):
+        return 2
+    if re.search(r'\b(i[\.\s]?\s*підгр|ii[\.\s]?\s*підгр)\b', t):
+        if re.search(r'i[\.\s]?\s*підгр', t) and not re.search(r'ii', t):
+            return 1
+        if re.search(r'ii', t):
+            return 2
+    return 0
+
+
+def old_classify(elem_id, parts):
+    subgroup = 0
+    week_type = 'обидва'
+    if 'sub_1' in elem_id:
+        subgroup = 1
+    elif 'sub_2' in elem_id:
+        subgroup = 2
+    if 'chys' in elem_id:
+        week_type = 'чисельник'
+    elif 'znam' in elem_id:
+        week_type = 'знаменник'
+
+    details = ", ".join(parts[1:]) if len(parts) > 1 else ""
+    subject_type = 'Інше'
+    location = ''
+    details_lower = details.lower()
+    if 'лекц' in details_lower:
+        subject_type = 'Лекція'
+    elif 'практ' in details_lower:
+        subject_type = 'Практична'
+    elif 'лаб' in details_lower:
+        subject_type = 'Лабораторна'
+    elif 'консульт' in details_lower:
+        subject_type = 'Консультація'
+    for p in details.split(','):
+        p = p.strip()
+        if ('н.к.' in p) or (any(c.isdigit() for c in p) and len(p) < 10):
+            location = p
+            break
+    return subgroup, week_type, subject_type, location
+
+
+def new_classify(elem_id, parts):
+    subgroup, week_type = classify_elem_id(elem_id)
+    subject_type, location = classify_details(parts[1:])
+    return subgroup, week_type, subject_type, location
+
+
+def make_blocks(count, rng):
+    blocks = []
+    for _ in range(count):
+        parts = [rng.choice(SUBJECTS)]
+        details = [rng.choice(TEACHERS), rng.choice(LOCATIONS), rng.choice(TYPES), rng.choice(SUBGROUP_MARKERS)]
+        rng.shuffle(details)
+        parts.extend(d for d in details if d)
+        blocks.append((rng.choice(ELEM_IDS), parts))
+    return blocks
+
+
+def check_same(blocks):
+    ok = True
+    for elem_id, parts in blocks:
+        old, new = old_classify(elem_id, parts), new_classify(elem_id, parts)
+        text = ' '.join(parts)
+        if old != new or old_detect_subgroup(text) != detect_subgroup(text):
+            ok = False
+            print(f'❌ {elem_id} {parts}: було {old} / {old_detect_subgroup(text)}, '
+                  f'стало {new} / {detect_subgroup(text)}')
+    return ok
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    blocks = make_blocks(count, rng)
+    if not check_same(blocks):
+        sys.exit(1)
+    print(f'✅ Однаковий результат для {count} блоків')
+
+    number = 3
+    texts = [' '.join(parts) for _, parts in blocks]
+    timings = [
+        ('тип + аудиторія + id', lambda: [old_classify(e, p) for e, p in blocks],
+         lambda: [new_classify(e, p) for e, p in blocks]),
+        ('підгрупа з тексту', lambda: [old_detect_subgroup(t) for t in texts],
+         lambda: [detect_subgroup(t) for t in texts]),
+    ]
+    for name, old, new in timings:
+        old_t = timeit.timeit(old, number=number) / number
+        new_t = timeit.timeit(new, number=number) / number
+        print(f'{name:>22}: було {old_t / count * 1e6:6.2f} µs/блок, стало {new_t / count * 1e6:6.2f} µs/блок '
+              f'(x{old_t / new_t:.1f})')
+    build_t = timeit.timeit(lambda: [build_rows('Пн', '1', e, p) for e, p in blocks], number=number) / number
+    print(f'{"build_rows цілком":>22}: {build_t / count * 1e6:6.2f} µs/блок')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# bench_import.py — масовий імпорт розкладів (schedule_import.py) проти локального стаб-сервера LPNU
+# Запуск: python benchmarks/bench_import.py [кількість груп, за замовчуванням 300] [затримка сервера, мс]
+# Лише час; --resume і рядки в базі перевіряє tests/test_schedule_import.py на тому самому стабі.
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from lpnu_client import UpstreamClient  # noqa: E402
+from lpnu_stub import FixtureLPNU  # noqa: E402
+from migrations import migrate  # noqa: E402
+from schedule_import import create_run, fetch_schedule_page, import_schedules, remaining_groups  # noqa: E402
+
+
+def open_db(path):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.execute('PRAGMA journal_mode=WAL')
+    migrate(db, log=lambda message: None)
+    return db
+
+
+def run_import(db, fixture, groups, fetch_workers, parse_workers, batch_size, run_id=None):
+    # Ретраї вимкнено, а поріг breaker високий - стаб не "падає", вимірюємо сам конвеєр
+    client = UpstreamClient(max_concurrency=fetch_workers, retries=0, failure_threshold=10 ** 6)
+    run_id = run_id or create_run(db, groups)
+    pending = remaining_groups(db, run_id)
+    started = time.perf_counter()
+    done, failed = import_schedules(db, run_id, pending,
+                                    lambda group_name: fetch_schedule_page(client, fixture.base_url, group_name),
+                                    batch_size=batch_size, fetch_workers=fetch_workers,
+                                    parse_workers=parse_workers, log=lambda message: None)
+    return run_id, done, failed, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    groups = [f'ГР-{i:03d}' for i in range(count)]
+    fixture = FixtureLPNU(latency)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print(f'{count} груп, затримка сервера {latency * 1000:.0f} ms, ядер: {os.cpu_count()}')
+        configs = [
+            ('по одній (як лінивий get_schedule)', 1, 0, 1),
+            ('4 потоки, розбір у потоках', 4, 0, 50),
+            # Пул явно: parse_workers=None на одному ядрі розбирає в потоках
+            ('4 потоки + пул процесів', 4, os.cpu_count(), 50),
+            ('8 потоків + пул процесів', 8, os.cpu_count(), 50),
+        ]
+        for i, (name, fetch_workers, parse_workers, batch_size) in enumerate(configs):
+            db = open_db(os.path.join(tmp_dir, f'bench{i}.db'))
+            _, done, failed, elapsed = run_import(db, fixture, groups, fetch_workers, parse_workers, batch_size)
+            db.close()
+            print(f'{name:>36}: {elapsed:6.2f} s, {done / elapsed:6.1f} груп/с' + (f', помилок {failed}' if failed else ''))
+    finally:
+        fixture.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# bench_parser.py — однаковість рядків між бекендами парсера розкладу + пропускна здатність
+# Запуск: python benchmarks/bench_parser.py [кількість повторень сторінки для великого тесту]
+# Код виходу 1, якщо якийсь бекенд дає інші рядки, ніж BeautifulSoup.
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_parser import BACKEND_PREFERENCE, BACKENDS, build_rows  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def parse_rows(backend, html_text):
+    """Те саме, що parse_html_schedule, але без print (щоб не заважати вимірам)."""
+    blocks = BACKENDS[backend](html_text)
+    if blocks is None:
+        return None
+    rows = []
+    for block in blocks:
+        rows.extend(build_rows(*block))
+    return rows
+
+
+def load_corpus():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def make_large_page(pages, repeat):
+    """Велика сторінка: вміст view-content з корпусу, повторений repeat разів (як тиждень з багатьма парами)."""
+    page = pages['full_week.html']
+    start = page.index('<div class="view-content">') + len('<div class="view-content">')
+    # закриваючий </div> самого view-content стоїть перед view-footer
+    end = page.rindex('</div>', start, page.index('<div class="view-footer">'))
+    inner = page[start:end]
+    return page[:start] + inner * repeat + page[end:]
+
+
+def check_equivalence(pages):
+    ok = True
+    for name, html_text in pages.items():
+        expected = parse_rows('bs4', html_text)
+        for backend in BACKENDS:
+            if backend == 'bs4':
+                continue
+            got = parse_rows(backend, html_text)
+            if got != expected:
+                ok = False
+                print(f'❌ {name}: {backend} відрізняється від bs4')
+                for a, b in zip(expected or [], got or []):
+                    if a != b:
+                        print(f'   bs4: {a}\n   {backend}: {b}')
+                        break
+                else:
+                    print(f'   bs4: {len(expected or [])} рядків, {backend}: {len(got or [])} рядків')
+        count = 'немає view-content' if expected is None else f'{len(expected)} рядків'
+        print(f'   {name}: {count}')
+    return ok
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pages = load_corpus()
+    available = [b for b in BACKEND_PREFERENCE if b in BACKENDS]
+    print(f'Бекенди: {", ".join(available)}')
+
+    if not check_equivalence(pages):
+        sys.exit(1)
+    print(f'✅ Однакові рядки для {len(pages)} сторінок корпусу')
+
+    large = make_large_page(pages, repeat)
+    print(f'Велика сторінка: {len(large) // 1024} KiB, {len(parse_rows("bs4", large))} рядків')
+
+    number = 20
+    baseline = None
+    for backend in reversed(available):
+        t = timeit.timeit(lambda: parse_rows(backend, large), number=number) / number
+        baseline = baseline or t
+        mib_s = len(large.encode('utf-8')) / t / (1024 * 1024)
+        print(f'{backend:>10}: {t * 1000:8.2f} ms/page  {mib_s:6.1f} MiB/s  (x{baseline / t:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# bench_schedule_expand.py — старе (день за днем) vs індексоване розгортання розкладу
+# Запуск: python benchmarks/bench_schedule_expand.py
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_calendar import compile_schedule, week_parity_for_date  # noqa: E402
+
+
+def legacy_expand_template_rows_to_dates(schedule_data, sem_start, sem_end):
+    """Попередня реалізація: O(днів × рядків × назв днів)."""
+    weekday_map = {
+        'Понеділок': 0, 'Пн': 0,
+        'Вівторок': 1, 'Вт': 1,
+        'Середа': 2, 'Ср': 2,
+        'Четвер': 3, 'Чт': 3,
+        "П'ятниця": 4, 'Пт': 4,
+        'Субота': 5, 'Сб': 5,
+        'Неділя': 6, 'Нд': 6
+    }
+
+    expanded = []
+    current_date = sem_start
+
+    while current_date <= sem_end:
+        weekday_num = current_date.weekday()
+        current_parity = week_parity_for_date(current_date, sem_start)
+
+        for row in schedule_data:
+            template_weekday = row.get('weekday', '').strip()
+            template_parity = row.get('week_type', 'обидва')
+
+            found_weekday = False
+            for uk_name, num in weekday_map.items():
+                if uk_name.lower() in template_weekday.lower():
+                    found_weekday = (num == weekday_num)
+                    break
+
+            if not found_weekday:
+                continue
+
+            if template_parity != 'обидва' and template_parity != current_parity:
+                continue
+
+            expanded_row = dict(row)
+            expanded_row['date'] = current_date.isoformat()
+            expanded.append(expanded_row)
+
+        current_date += timedelta(days=1)
+
+    return expanded
+
+
+def make_group_rows(count=40):
+    """Синтетична група: 40 пар на 6 днів, змішані підгрупи та парності."""
+    weekdays = ['Понеділок', 'Вівторок', 'Середа', 'Четвер', "П'ятниця", 'Субота', 'Пн', 'Чт']
+    week_types = ['обидва', 'чисельник', 'знаменник']
+    times = ['08:30', '10:20', '12:10', '14:15', '16:00', '17:40']
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': i + 1,
+            'group_name': 'ПП-12',
+            'subgroup': i % 3,
+            'weekday': weekdays[i % len(weekdays)],
+            'start_time': times[i % len(times)],
+            'end_time': '',
+            'subject': f'Дисципліна {i}',
+            'subject_type': 'Лекція',
+            'location': 'н.к. 1',
+            'week_type': week_types[i % len(week_types)],
+            'cached_at': '2025-09-01T00:00:00'
+        })
+    return rows
+
+
+def main():
+    rows = make_group_rows(40)
+    start, end = date(2025, 1, 1), date(2025, 12, 31)
+
+    old = legacy_expand_template_rows_to_dates(rows, start, end)
+    new = compile_schedule(rows).expand(start, end)
+    if old != new:
+        print('❌ Результати відрізняються!')
+        sys.exit(1)
+    # Вікна (як у /api/schedule) мають давати підмножину повного розгортання
+    compiled = compile_schedule(rows)
+    for month in range(1, 13):
+        w_start = date(2025, month, 1)
+        w_end = (w_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        expected = [r for r in old if w_start.isoformat() <= r['date'] <= w_end.isoformat()]
+        if compiled.expand(start, end, w_start, w_end) != expected:
+            print(f'❌ Вікно {w_start}..{w_end} відрізняється!')
+            sys.exit(1)
+    print(f'✅ Однаковий результат: {len(new)} подій за рік для {len(rows)} рядків')
+
+    number = 20
+    t_old = timeit.timeit(lambda: legacy_expand_template_rows_to_dates(rows, start, end), number=number)
+    t_new = timeit.timeit(lambda: compile_schedule(rows).expand(start, end), number=number)
+    print(f'old: {t_old / number * 1000:8.2f} ms/call')
+    print(f'new: {t_new / number * 1000:8.2f} ms/call  (x{t_old / t_new:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# bench_search.py — пошук повідомлень: FTS5 (search.py) проти LIKE '%...%' на великій базі
+# Запуск: python benchmarks/bench_search.py [кількість повідомлень, за замовчуванням 1000000]
+# Код виходу 1, якщо FTS і LIKE знаходять різні повідомлення для слів, де це має збігатися.
+import itertools
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import CONNECTION_PRAGMAS  # noqa: E402
+from migrations import migrate  # noqa: E402
+from search import fts_query, query_terms, search_messages  # noqa: E402
+
+TEAMS = 2000
+USERS = 10000
+USER_TEAMS = 10          # у скількох командах користувач, від імені якого шукаємо
+VOCABULARY = 5000
+SYLLABLES = ['ка', 'ло', 'ми', 'на', 'ре', 'ти', 'ку', 'зо', 'ві', 'дя', 'ше', 'пу', 'го', 'ле', 'бі', 'фа']
+PAGE = 20
+
+
+def make_vocabulary(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda w: rng.random())
+
+
+def build_database(path, messages, rng):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.execute('PRAGMA journal_mode=WAL')
+    for name, value in CONNECTION_PRAGMAS:
+        db.execute(f'PRAGMA {name}={value}')
+    migrate(db, log=lambda message: None)
+
+    db.executemany('INSERT INTO users (id, first_name, last_name, email, password) VALUES (?, ?, ?, ?, ?)',
+                   ((i, 'U', str(i), f'u{i}@example.com', 'x') for i in range(1, USERS + 1)))
+    db.executemany('INSERT INTO teams (id, name, creator_id, created_at) VALUES (?, ?, 1, ?)',
+                   ((i, f'team {i}', '2025-09-01') for i in range(1, TEAMS + 1)))
+    members = {(1, team_id) for team_id in rng.sample(range(1, TEAMS + 1), USER_TEAMS)}
+    while len(members) < TEAMS * 5:
+        members.add((rng.randint(2, USERS), rng.randint(1, TEAMS)))
+    db.executemany('INSERT INTO team_members (user_id, team_id, joined_at) VALUES (?, ?, ?)',
+                   ((u, t, '2025-09-01') for u, t in members))
+    db.commit()
+
+    vocabulary = make_vocabulary(rng)
+    # Частоти слів як у живій мові (Ципф): перші слова словника трапляються в тисячі разів частіше за останні
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    rows = []
+    for _ in range(messages):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(5, 15))
+        rows.append((rng.randint(1, TEAMS), rng.randint(1, USERS), ' '.join(words)))
+
+    # Вимірюємо лише запис (з FTS-тригерами), генерація тексту - поза таймером
+    started = time.perf_counter()
+    for start in range(0, messages, 50000):
+        db.executemany("INSERT INTO team_messages (team_id, user_id, message, created_at) VALUES (?, ?, ?, '2025-09-01')",
+                       rows[start:start + 50000])
+        db.commit()
+    elapsed = time.perf_counter() - started
+    return db, vocabulary, elapsed
+
+
+def like_search(db, user_id, word):
+    """Як шукали б без FTS: підрядок у повідомленнях команд користувача, найновіші першими."""
+    return db.execute('''
+        SELECT m.id FROM team_messages m
+        JOIN team_members tm ON tm.team_id = m.team_id AND tm.user_id = ?
+        WHERE m.message LIKE ?
+        ORDER BY m.id DESC LIMIT ?
+    ''', (user_id, f'%{word}%', PAGE + 1)).fetchall()
+
+
+def like_search_all(db, word):
+    return db.execute('SELECT id FROM team_messages WHERE message LIKE ? ORDER BY id DESC LIMIT ?',
+                      (f'%{word}%', PAGE + 1)).fetchall()
+
+
+def fts_search_all(db, word):
+    return db.execute('''
+        SELECT rowid FROM team_messages_fts WHERE team_messages_fts MATCH ? ORDER BY rank LIMIT ?
+    ''', (fts_query(query_terms(word)), PAGE + 1)).fetchall()
+
+
+def table_size(db, prefix):
+    return db.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE ?", (prefix + '%',)).fetchone()[0] or 0
+
+
+def check_same_matches(db, vocabulary, words):
+    """
+    Для слів, що не є частиною інших слів словника, LIKE і FTS мають знайти ті самі повідомлення
+    (у FTS - як префікс цілого слова, у LIKE - як підрядок).
+    """
+    ok = True
+    for word in words:
+        if any(word in other for other in vocabulary if other != word):
+            continue
+        like_ids = {row[0] for row in db.execute('''
+            SELECT m.id FROM team_messages m JOIN team_members tm ON tm.team_id = m.team_id AND tm.user_id = 1
+            WHERE m.message LIKE ?''', (f'%{word}%',))}
+        found = search_messages(db, 1, query_terms(word), limit=len(like_ids) + 1, window=len(like_ids) + 1)
+        fts_ids = {item['id'] for item in found['results']}
+        if like_ids != fts_ids:
+            ok = False
+            print(f'❌ "{word}": LIKE {len(like_ids)}, FTS {len(fts_ids)} повідомлень')
+    return ok
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        db, vocabulary, build_seconds = build_database(os.path.join(tmp_dir, 'search.db'), messages, rng)
+        print(f'{messages} повідомлень у {TEAMS} командах: запис з FTS-тригерами {build_seconds:.1f} s '
+              f'({messages / build_seconds:,.0f} рядків/с)')
+        print(f'Розмір: team_messages {table_size(db, "team_messages") // 2 ** 20} MiB, '
+              f'FTS-індекс {table_size(db, "team_messages_fts") // 2 ** 20} MiB')
+
+        cases = {
+            'часте слово': vocabulary[0],
+            'середнє слово': vocabulary[100],
+            'рідкісне слово': vocabulary[-1],
+            'префікс': vocabulary[50][:3],
+        }
+        if not check_same_matches(db, vocabulary, [vocabulary[100], vocabulary[-1]]):
+            sys.exit(1)
+
+        number = 5
+        print(f'{"":>16}  {"LIKE, свої команди":>20}  {"FTS, свої команди":>18}  {"LIKE, уся база":>15}  {"FTS, уся база":>14}')
+        for name, word in cases.items():
+            timings = [
+                timeit.timeit(lambda: like_search(db, 1, word), number=number) / number,
+                timeit.timeit(lambda: search_messages(db, 1, query_terms(word), PAGE), number=number) / number,
+                timeit.timeit(lambda: like_search_all(db, word), number=number) / number,
+                timeit.timeit(lambda: fts_search_all(db, word), number=number) / number,
+            ]
+            print(f'{name:>16}  ' + '  '.join(f'{t * 1000:>{w}.2f}' for t, w in zip(timings, (17, 15, 12, 11)))
+                  + '  ms')
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
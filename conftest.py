@@ -0,0 +1,2 @@
+# conftest.py — корінь репозиторію для pytest: модулі застосунку (app.py, migrations.py, ...) лежать поруч
+# і імпортуються тестами з tests/ напряму
@@ -0,0 +1,75 @@
+# db_pool.py — пул з'єднань SQLite на процес: WAL, прагми один раз на з'єднання, окремий read-only шлях
+import os
+import sqlite3
+import threading
+
+# Прагми, що діють лише на з'єднання - застосовуються один раз при його створенні.
+# synchronous=NORMAL у WAL безпечний для цілісності бази (можна втратити лише останні коміти при збої ОС).
+CONNECTION_PRAGMAS = (
+    ('busy_timeout', 5000),           # чекати на блокування до 5 с замість "database is locked"
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),           # ~16 МБ кешу сторінок
+    ('mmap_size', 128 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+)
+
+
+class ConnectionPool:
+    """
+    Пул готових з'єднань до однієї бази. Кожен запит бере з'єднання (acquire) і повертає його
+    в кінці (release), замість того щоб щоразу відкривати файл і налаштовувати прагми.
+
+    readonly=True відкриває базу в режимі mode=ro: такі з'єднання ніколи не беруть блокування на запис.
+    Після fork (gunicorn) успадковані з'єднання не використовуються - дочірній процес відкриває свої.
+    """
+
+    def __init__(self, path, max_idle=8, readonly=False, pragmas=CONNECTION_PRAGMAS):
+        self.path = path
+        self.max_idle = max_idle
+        self.readonly = readonly
+        self.pragmas = pragmas
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+
+    def _connect(self):
+        if self.readonly:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # WAL зберігається у файлі бази: читачі не блокують письменника і навпаки
+            conn.execute('PRAGMA journal_mode=WAL')
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name}={value}')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Ми в дочірньому процесі: з'єднання батька чіпати не можна
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                # Запит не закомітив свої зміни (помилка посеред обробки) - не передаємо їх наступному
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
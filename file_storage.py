@@ -0,0 +1,94 @@
+# file_storage.py — сховище файлів за хешем вмісту: потоковий запис частинами, ліміт розміру, дедуплікація
+import hashlib
+import os
+import re
+import tempfile
+import unicodedata
+from collections import namedtuple
+from urllib.parse import quote
+
+CHUNK_SIZE = 64 * 1024
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+StoredFile = namedtuple('StoredFile', ['digest', 'size', 'created'])
+
+
+class FileTooLarge(Exception):
+    """Файл більший за дозволений ліміт; недописаний тимчасовий файл уже видалено."""
+
+    def __init__(self, max_bytes):
+        super().__init__(f'File is larger than {max_bytes} bytes')
+        self.max_bytes = max_bytes
+
+
+class ContentStore:
+    """
+    Файли лежать у root/ab/cd/<sha256>, де ab і cd - перші символи хешу.
+    Однаковий вміст зберігається один раз, а файл за хешем ніколи не змінюється,
+    тож його можна віддавати з Cache-Control: immutable.
+    """
+
+    def __init__(self, root, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def relative_path(self, digest):
+        if not DIGEST_RE.match(digest):
+            raise ValueError('invalid digest')
+        return os.path.join(digest[:2], digest[2:4], digest)
+
+    def path_for(self, digest):
+        return os.path.join(self.root, self.relative_path(digest))
+
+    def exists(self, digest):
+        return os.path.isfile(self.path_for(digest))
+
+    def save_stream(self, stream, max_bytes):
+        """
+        Читає stream частинами по chunk_size у тимчасовий файл, рахуючи sha256 на льоту, -
+        в пам'яті ніколи не більше однієї частини. Перевищення max_bytes -> FileTooLarge.
+        """
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise FileTooLarge(max_bytes)
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            hex_digest = digest.hexdigest()
+            final_path = self.path_for(hex_digest)
+            if os.path.exists(final_path):
+                # Такий вміст уже є - копію не тримаємо
+                os.remove(tmp_path)
+                return StoredFile(hex_digest, size, False)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            # rename атомарний: паралельне завантаження того самого файлу просто перезапише ідентичний вміст
+            os.replace(tmp_path, final_path)
+            return StoredFile(hex_digest, size, True)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def content_disposition(disposition, filename):
+    """Значення Content-Disposition з ім'ям файлу, яке переживе не-ASCII (RFC 6266, як у werkzeug.send_file)."""
+    # Ім'я приходить з URL: без керівних символів і лапок, що зламали б заголовок
+    filename = ''.join(ch for ch in filename if ch.isprintable() and ch not in '"\\') or 'file'
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii') or 'file'
+        return f"{disposition}; filename=\"{simple}\"; filename*=UTF-8''{quote(filename, safe='')}"
+    return f'{disposition}; filename="{filename}"'
@@ -0,0 +1,185 @@
+# lpnu_client.py — спільний HTTP-клієнт для student.lpnu.ua (пул з'єднань, ретраї, circuit breaker)
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+    'Referer': 'https://student.lpnu.ua/',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+
+class UpstreamUnavailable(Exception):
+    """Хост вважається недоступним (circuit breaker відкритий) або чекати на слот задовго."""
+
+
+class CircuitBreaker:
+    """
+    Після failure_threshold невдач поспіль хост "відкривається" на reset_timeout секунд:
+    запити падають одразу, не чекаючи таймауту. Потім пропускається один пробний запит.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_progress:
+                return False
+            # half-open: пропускаємо один пробний запит
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def rejects(self):
+        """Чи відмовить allow() зараз, без зміни стану (не займає пробний запит)."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            return time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_progress
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+
+class UpstreamClient:
+    """
+    Один requests.Session на процес: keep-alive і пул з'єднань (TLS-рукостискання не повторюється
+    на кожен запит), ретраї з backoff для 5xx та помилок з'єднання, обмеження кількості
+    одночасних запитів і circuit breaker на кожен хост.
+
+    Тайм-аут читання не повторюється: сервер, що вже не відповів за read-тайм-аут, навряд чи
+    відповість з другої спроби, а з ретраями один виклик висів би (retries + 1) * read-тайм-аут.
+    """
+
+    def __init__(self, pool_size=10, max_concurrency=4, retries=2, backoff_factor=0.5,
+                 failure_threshold=5, reset_timeout=30, acquire_timeout=30, headers=None):
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        retry = Retry(total=retries, connect=retries, read=0, status=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(['GET', 'HEAD']),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.acquire_timeout = acquire_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker_for(self, url):
+        host = urlsplit(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def get(self, url, params=None, headers=None, timeout=(5, 20), stream=False):
+        """
+        GET через спільний пул. Кидає UpstreamUnavailable, якщо хост "лежить",
+        та requests.RequestException для мережевих помилок. 5xx теж рахуються як невдача хоста.
+        З stream=True слот тримається, доки викликач не закриє відповідь (response.close() або with).
+        """
+        breaker = self.breaker_for(url)
+        # Швидка відмова без очікування слота, поки хост точно "лежить"
+        if breaker.rejects():
+            raise UpstreamUnavailable(f'{urlsplit(url).netloc} is temporarily unavailable')
+
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise UpstreamUnavailable('too many concurrent upstream requests')
+        release = _SlotRelease(self._slots)
+        try:
+            # allow() - уже зі слотом: пробний запит half-open не може застрягнути в черзі за слотом
+            if not breaker.allow():
+                raise UpstreamUnavailable(f'{urlsplit(url).netloc} is temporarily unavailable')
+            completed = False
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+                completed = True
+            finally:
+                # Будь-який виняток (не лише RequestException) - невдача; це й знімає прапорець пробного запиту
+                if not completed:
+                    breaker.record_failure()
+        except BaseException:
+            release()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if stream:
+            # Тіло читає викликач: з'єднання з LPNU зайняте, поки відповідь не закрито
+            close = response.close
+
+            def close_and_release():
+                try:
+                    close()
+                finally:
+                    release()
+            response.close = close_and_release
+        else:
+            release()
+        return response
+
+
+class _SlotRelease:
+    """Звільняє слот семафора рівно один раз, скільки б разів не викликали (close() буває повторним)."""
+
+    def __init__(self, slots):
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __call__(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._slots.release()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Спільний клієнт процесу (створюється при першому використанні, тобто вже після fork)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = UpstreamClient()
+        return _client
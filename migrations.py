@@ -0,0 +1,375 @@
+# migrations.py — версійовані міграції схеми (версія зберігається в PRAGMA user_version)
+#
+# Нова зміна схеми = новий запис у кінці MIGRATIONS. Уже застосовані міграції не редагуються.
+from queries import HOT_QUERIES
+
+# 1: початкова схема. IF NOT EXISTS, бо бази, створені до міграцій, вже мають ці таблиці (user_version = 0)
+INITIAL_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        group_name TEXT,
+        subgroup INTEGER DEFAULT 1,
+        avatar TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        group_name TEXT NOT NULL,
+        title TEXT NOT NULL,
+        type TEXT NOT NULL,
+        date TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        is_custom INTEGER DEFAULT 1,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS schedule (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_name TEXT NOT NULL,
+        subgroup INTEGER NOT NULL,
+        weekday TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        subject TEXT NOT NULL,
+        subject_type TEXT NOT NULL,
+        location TEXT,
+        week_type TEXT NOT NULL,
+        cached_at TEXT NOT NULL,
+        UNIQUE(group_name, subgroup, weekday, start_time, week_type)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS schedule_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_name TEXT UNIQUE NOT NULL,
+        data TEXT NOT NULL,
+        cached_at TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS teams (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        creator_id INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (creator_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS team_members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        joined_at TEXT NOT NULL,
+        UNIQUE(team_id, user_id),
+        FOREIGN KEY (team_id) REFERENCES teams(id),
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS team_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (team_id) REFERENCES teams(id),
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        title TEXT NOT NULL,
+        message TEXT NOT NULL,
+        related_id INTEGER,
+        is_read INTEGER DEFAULT 0,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (recipient_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        deadline TEXT,
+        is_completed INTEGER DEFAULT 0,
+        creator_id INTEGER NOT NULL,
+        team_id INTEGER,
+        assigned_to_ids TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (creator_id) REFERENCES users(id),
+        FOREIGN KEY (team_id) REFERENCES teams(id)
+    )''',
+]
+
+# 2: коли розклад групи востаннє звіряли з LPNU і коли він востаннє змінився
+SCHEDULE_GROUPS = [
+    '''CREATE TABLE IF NOT EXISTS schedule_groups (
+        group_name TEXT PRIMARY KEY,
+        checked_at TEXT NOT NULL,
+        changed_at TEXT NOT NULL
+    )''',
+    # Бази, створені до schedule_groups: беремо час з самих рядків розкладу
+    '''INSERT OR IGNORE INTO schedule_groups (group_name, checked_at, changed_at)
+       SELECT group_name, MAX(cached_at), MAX(cached_at) FROM schedule GROUP BY group_name''',
+]
+
+# 3: індекси під гарячі запити (див. queries.HOT_QUERIES)
+HOT_QUERY_INDEXES = [
+    # Лічильник непрочитаних: частковий індекс містить лише непрочитані, COUNT не читає таблицю
+    '''CREATE INDEX IF NOT EXISTS idx_notifications_unread
+       ON notifications(recipient_id) WHERE is_read = 0''',
+    # Список сповіщень користувача, новіші першими - без сортування
+    '''CREATE INDEX IF NOT EXISTS idx_notifications_recipient_created
+       ON notifications(recipient_id, created_at)''',
+    '''CREATE INDEX IF NOT EXISTS idx_team_messages_team_created
+       ON team_messages(team_id, created_at)''',
+    # Особисті задачі (team_id IS NULL) та задачі команди, вже впорядковані як у списку
+    '''CREATE INDEX IF NOT EXISTS idx_tasks_creator_personal
+       ON tasks(creator_id, team_id, is_completed, deadline)''',
+    '''CREATE INDEX IF NOT EXISTS idx_tasks_team
+       ON tasks(team_id, is_completed, deadline)''',
+    '''CREATE INDEX IF NOT EXISTS idx_events_user_group_date
+       ON events(user_id, group_name, date)''',
+    # UNIQUE(team_id, user_id) вже покриває пошук за team_id, але не за user_id
+    '''CREATE INDEX IF NOT EXISTS idx_team_members_user
+       ON team_members(user_id, team_id)''',
+    '''CREATE INDEX IF NOT EXISTS idx_users_group_name
+       ON users(group_name)''',
+]
+
+# 4: історія чату гортається за id (keyset-пагінація), а не за created_at
+TEAM_MESSAGES_KEYSET = [
+    'DROP INDEX IF EXISTS idx_team_messages_team_created',
+    '''CREATE INDEX IF NOT EXISTS idx_team_messages_team_id
+       ON team_messages(team_id, id)''',
+]
+
+# 5: лічильник непрочитаних на користувача замість COUNT(*) при кожному опитуванні.
+# Тримається тригерами, тож правильний для будь-якого шляху запису (вставки, прочитання, видалення).
+NOTIFICATION_COUNTERS = [
+    '''CREATE TABLE IF NOT EXISTS notification_counters (
+        user_id INTEGER PRIMARY KEY,
+        unread INTEGER NOT NULL DEFAULT 0
+    )''',
+    '''INSERT OR REPLACE INTO notification_counters (user_id, unread)
+       SELECT recipient_id, SUM(is_read = 0) FROM notifications GROUP BY recipient_id''',
+    '''CREATE TRIGGER IF NOT EXISTS notifications_unread_insert
+       AFTER INSERT ON notifications WHEN NEW.is_read = 0
+       BEGIN
+           INSERT INTO notification_counters (user_id, unread) VALUES (NEW.recipient_id, 1)
+           ON CONFLICT(user_id) DO UPDATE SET unread = unread + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS notifications_unread_delete
+       AFTER DELETE ON notifications WHEN OLD.is_read = 0
+       BEGIN
+           UPDATE notification_counters SET unread = unread - 1 WHERE user_id = OLD.recipient_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS notifications_unread_update
+       AFTER UPDATE OF is_read ON notifications WHEN (OLD.is_read = 0) != (NEW.is_read = 0)
+       BEGIN
+           UPDATE notification_counters
+           SET unread = unread + (CASE WHEN NEW.is_read = 0 THEN 1 ELSE -1 END)
+           WHERE user_id = NEW.recipient_id;
+       END''',
+    # Список і since_id-запити йдуть по id, а не по created_at
+    'DROP INDEX IF EXISTS idx_notifications_recipient_created',
+    '''CREATE INDEX IF NOT EXISTS idx_notifications_recipient_id
+       ON notifications(recipient_id, id)''',
+]
+
+# 6: очищення сповіщень (notification_retention.py). Старі прочитані рядки стискаються
+# в підсумок на користувача і тип; частковий індекс знаходить кандидатів без скану всієї таблиці.
+NOTIFICATION_RETENTION = [
+    '''CREATE TABLE IF NOT EXISTS notification_archive (
+        user_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        archived INTEGER NOT NULL DEFAULT 0,
+        first_created_at TEXT,
+        last_created_at TEXT,
+        PRIMARY KEY (user_id, type)
+    )''',
+    '''CREATE INDEX IF NOT EXISTS idx_notifications_read_type_created
+       ON notifications(type, created_at) WHERE is_read = 1''',
+]
+
+# 7: виконавці задач окремою таблицею замість JSON-рядка tasks.assigned_to_ids, щоб
+# "задачі, призначені мені" шукались індексом. Колонка лишається (DROP COLUMN - лише з SQLite 3.35),
+# зі старими даними, але нові значення пишуться лише в task_assignees.
+TASK_ASSIGNEES = [
+    '''CREATE TABLE IF NOT EXISTS task_assignees (
+        task_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (task_id, user_id),
+        FOREIGN KEY (task_id) REFERENCES tasks(id),
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    ) WITHOUT ROWID''',
+    '''CREATE INDEX IF NOT EXISTS idx_task_assignees_user
+       ON task_assignees(user_id, task_id)''',
+    '''INSERT OR IGNORE INTO task_assignees (task_id, user_id)
+       SELECT t.id, CAST(j.value AS INTEGER) FROM tasks t, json_each(t.assigned_to_ids) j
+       WHERE json_valid(t.assigned_to_ids) AND json_type(t.assigned_to_ids) = 'array'
+         AND CAST(j.value AS INTEGER) > 0''',
+    # foreign_keys у з'єднаннях вимкнено, тож каскад при видаленні задачі - тригером
+    '''CREATE TRIGGER IF NOT EXISTS tasks_delete_assignees
+       AFTER DELETE ON tasks
+       BEGIN
+           DELETE FROM task_assignees WHERE task_id = OLD.id;
+       END''',
+]
+
+# 8: вкладення повідомлень чату - sha256 вмісту у сховищі файлів (file_storage.py) та ім'я, з яким його завантажили
+TEAM_MESSAGE_FILES = [
+    'ALTER TABLE team_messages ADD COLUMN file_digest TEXT',
+    'ALTER TABLE team_messages ADD COLUMN file_name TEXT',
+]
+
+# 9: URL мініатюр аватарки (avatar_thumbnails.py); NULL - ще не готові, показується оригінал
+AVATAR_THUMBNAILS = [
+    'ALTER TABLE users ADD COLUMN avatar_32 TEXT',
+    'ALTER TABLE users ADD COLUMN avatar_64 TEXT',
+    'ALTER TABLE users ADD COLUMN avatar_128 TEXT',
+]
+
+# 10: повнотекстовий пошук (search.py). FTS5 з external content: текст не дублюється, індекс
+# оновлюють тригери. unicode61 без діакритик - регістр і "ї/і"-подібні варіанти не заважають пошуку.
+FULL_TEXT_SEARCH = [
+    # team_id теж у індексі: пошук одразу обмежується командами користувача всередині FTS5,
+    # не перебираючи всі збіги частого слова по базі
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS team_messages_fts USING fts5(
+        message, file_name, team_id, content='team_messages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS team_messages_fts_insert AFTER INSERT ON team_messages BEGIN
+           INSERT INTO team_messages_fts (rowid, message, file_name, team_id)
+           VALUES (NEW.id, NEW.message, NEW.file_name, NEW.team_id);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS team_messages_fts_delete AFTER DELETE ON team_messages BEGIN
+           INSERT INTO team_messages_fts (team_messages_fts, rowid, message, file_name, team_id)
+           VALUES ('delete', OLD.id, OLD.message, OLD.file_name, OLD.team_id);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS team_messages_fts_update
+       AFTER UPDATE OF message, file_name, team_id ON team_messages BEGIN
+           INSERT INTO team_messages_fts (team_messages_fts, rowid, message, file_name, team_id)
+           VALUES ('delete', OLD.id, OLD.message, OLD.file_name, OLD.team_id);
+           INSERT INTO team_messages_fts (rowid, message, file_name, team_id)
+           VALUES (NEW.id, NEW.message, NEW.file_name, NEW.team_id);
+       END''',
+    "INSERT INTO team_messages_fts (team_messages_fts) VALUES ('rebuild')",
+
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+           INSERT INTO tasks_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+           INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+           VALUES ('delete', OLD.id, OLD.title, OLD.description);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+           INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+           VALUES ('delete', OLD.id, OLD.title, OLD.description);
+           INSERT INTO tasks_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+       END''',
+    "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+        title, content='events', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+           INSERT INTO events_fts (rowid, title) VALUES (NEW.id, NEW.title);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+           INSERT INTO events_fts (events_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title ON events BEGIN
+           INSERT INTO events_fts (events_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+           INSERT INTO events_fts (rowid, title) VALUES (NEW.id, NEW.title);
+       END''',
+    "INSERT INTO events_fts (events_fts) VALUES ('rebuild')",
+]
+
+# 11: масовий імпорт розкладів (schedule_import.py). Кожен запуск пам'ятає свої групи і їхній стан,
+# тож перерваний імпорт продовжується з місця зупинки (import-schedules --resume)
+SCHEDULE_IMPORT = [
+    '''CREATE TABLE IF NOT EXISTS schedule_import_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        finished_at TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS schedule_import_groups (
+        run_id INTEGER NOT NULL,
+        group_name TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        error TEXT,
+        updated_at TEXT,
+        PRIMARY KEY (run_id, group_name),
+        FOREIGN KEY (run_id) REFERENCES schedule_import_runs(id)
+    ) WITHOUT ROWID''',
+]
+
+# 12: оренди фонових задач. Задачу, яку досить виконувати одному процесу на всю базу (пошук груп для
+# фонового оновлення розкладів), виконує лише власник неспливлої оренди; решта воркерів пропускають
+BACKGROUND_LEASES = [
+    '''CREATE TABLE IF NOT EXISTS background_leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID''',
+]
+
+MIGRATIONS = [
+    (1, 'initial schema', INITIAL_SCHEMA),
+    (2, 'schedule_groups', SCHEDULE_GROUPS),
+    (3, 'hot query indexes', HOT_QUERY_INDEXES),
+    (4, 'team_messages keyset index', TEAM_MESSAGES_KEYSET),
+    (5, 'notification unread counters', NOTIFICATION_COUNTERS),
+    (6, 'notification retention', NOTIFICATION_RETENTION),
+    (7, 'task assignees', TASK_ASSIGNEES),
+    (8, 'team message files', TEAM_MESSAGE_FILES),
+    (9, 'avatar thumbnails', AVATAR_THUMBNAILS),
+    (10, 'full-text search', FULL_TEXT_SEARCH),
+    (11, 'schedule import runs', SCHEDULE_IMPORT),
+    (12, 'background job leases', BACKGROUND_LEASES),
+]
+
+def schema_version(db):
+    return db.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db, log=print):
+    """Застосовує всі міграції, новіші за user_version бази. Кожна - в окремій транзакції."""
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version <= schema_version(db):
+            continue
+        if db.in_transaction:
+            db.commit()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            # Інший процес міг застосувати цю міграцію, поки ми чекали на блокування
+            if version <= schema_version(db):
+                db.rollback()
+                continue
+            for statement in statements:
+                db.execute(statement)
+            db.execute(f'PRAGMA user_version = {version}')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        log(f"🗄️ Міграція {version} ({name}) застосована.")
+        applied.append(version)
+    return applied
+
+
+def check_query_plans(db, queries=HOT_QUERIES):
+    """
+    EXPLAIN QUERY PLAN для кожного гарячого запиту (queries.HOT_QUERIES). Повертає {назва: рядки плану}
+    лише для запитів, що повністю сканують якусь таблицю (SCAN без індексу).
+    """
+    problems = {}
+    for name, (sql, params, _) in queries.items():
+        plan = [row[3] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        if any(step.startswith('SCAN') and 'INDEX' not in step for step in plan):
+            problems[name] = plan
+    return problems
@@ -0,0 +1,80 @@
+# notification_fanout.py — відкладена пакетна розсилка сповіщень (з об'єднанням повідомлень за вікно)
+import atexit
+import threading
+import time
+
+
+class FanoutQueue:
+    """
+    Накопичує елементи за ключем (напр. team_id) і через window секунд після першого елемента
+    віддає їх усі разом у flush_fn(key, items) у фоновому потоці. Так серія повідомлень у команду
+    за кілька секунд перетворюється на одне сповіщення на учасника, а запит відправника
+    не чекає на запис сповіщень.
+
+    window=0 - без фонового потоку: flush_fn викликається одразу в потоці викликача.
+    Незаписані пачки дописуються при завершенні процесу (atexit), але не переживають його падіння.
+    """
+
+    def __init__(self, flush_fn, window=5):
+        self.flush_fn = flush_fn
+        self.window = window
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = {}      # key -> (due_time, [items])
+        self._thread = None
+        self._stopped = False
+        atexit.register(self.flush_all)
+
+    def add(self, key, item):
+        if not self.window:
+            self._flush(key, [item])
+            return
+        with self._lock:
+            if key in self._pending:
+                self._pending[key][1].append(item)
+                return
+            self._pending[key] = (time.monotonic() + self.window, [item])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='notification-fanout', daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+    def pending_count(self):
+        with self._lock:
+            return sum(len(items) for _, items in self._pending.values())
+
+    def flush_all(self):
+        """Записати все накопичене зараз (завершення процесу, тести, CLI)."""
+        with self._lock:
+            batches, self._pending = self._pending, {}
+        for key, (_, items) in batches.items():
+            self._flush(key, items)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify_all()
+        self.flush_all()
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = [key for key, (due_time, _) in self._pending.items() if due_time <= now]
+                    if due:
+                        break
+                    timeout = min((d for d, _ in self._pending.values()), default=now + 60) - now
+                    self._wakeup.wait(timeout)
+                if self._stopped:
+                    self._thread = None
+                    return
+                batches = [(key, self._pending.pop(key)[1]) for key in due]
+            for key, items in batches:
+                self._flush(key, items)
+
+    def _flush(self, key, items):
+        try:
+            self.flush_fn(key, items)
+        except Exception as e:
+            print(f"🔥 Розсилка сповіщень ({key}) впала: {e}")
@@ -0,0 +1,127 @@
+# notification_retention.py — очищення старих прочитаних сповіщень: підсумки замість рядків, малими порціями
+import threading
+import time
+from datetime import timedelta
+
+from queries import NOTIFICATION_RETENTION_CHUNK
+
+# Скільки днів зберігати прочитані сповіщення кожного типу. Непрочитані не чіпаємо ніколи:
+# їх рахує notification_counters, а team_invite без відповіді ще можна прийняти.
+DEFAULT_RETENTION_DAYS = {
+    'team_message': 14,
+    'team_invite': 90,
+}
+
+TABLES = ('notifications', 'notification_archive')
+
+
+def table_rows(db, tables=TABLES):
+    """{таблиця: рядків}."""
+    return {table: db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in tables}
+
+
+def database_size(db):
+    """
+    Розмір файлу бази в байтах (page_count * page_size) - з заголовка, без обходу сторінок,
+    на відміну від dbstat, що читає весь файл.
+    """
+    page_count = db.execute('PRAGMA page_count').fetchone()[0]
+    return page_count * db.execute('PRAGMA page_size').fetchone()[0]
+
+
+def free_pages(db):
+    """Сторінки, звільнені видаленням: файл не зменшується, але SQLite використає їх для нових записів."""
+    return db.execute('PRAGMA freelist_count').fetchone()[0]
+
+
+def compact_chunk(db, notif_type, cutoff, chunk_size):
+    """
+    Одна коротка транзакція: до chunk_size прочитаних сповіщень типу notif_type, старіших за cutoff,
+    додаються до підсумків користувачів у notification_archive і видаляються. Повертає кількість видалених.
+    """
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        ids = [row[0] for row in db.execute(NOTIFICATION_RETENTION_CHUNK, (notif_type, cutoff, chunk_size))]
+        if ids:
+            db.execute('CREATE TEMP TABLE IF NOT EXISTS retention_chunk (id INTEGER PRIMARY KEY)')
+            db.execute('DELETE FROM retention_chunk')
+            db.executemany('INSERT INTO retention_chunk (id) VALUES (?)', [(i,) for i in ids])
+            db.execute('''
+                INSERT INTO notification_archive (user_id, type, archived, first_created_at, last_created_at)
+                SELECT recipient_id, type, COUNT(*), MIN(created_at), MAX(created_at)
+                FROM notifications WHERE id IN (SELECT id FROM retention_chunk)
+                GROUP BY recipient_id, type
+                ON CONFLICT(user_id, type) DO UPDATE SET
+                    archived = archived + excluded.archived,
+                    first_created_at = MIN(first_created_at, excluded.first_created_at),
+                    last_created_at = MAX(last_created_at, excluded.last_created_at)
+            ''')
+            db.execute('DELETE FROM notifications WHERE id IN (SELECT id FROM retention_chunk)')
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(ids)
+
+
+def compact_notifications(db, now, retention_days=DEFAULT_RETENTION_DAYS, chunk_size=500, pause=0.05):
+    """
+    Прибирає прочитані сповіщення, старіші за термін свого типу. Працює порціями по chunk_size
+    з паузою між ними, щоб блокування на запис тривало мілісекунди і не заважало запитам.
+    Повертає {тип: скільки рядків стиснуто в підсумки}.
+    """
+    if db.in_transaction:
+        db.commit()
+    compacted = {}
+    for notif_type, days in retention_days.items():
+        if days is None:
+            continue
+        cutoff = (now - timedelta(days=days)).isoformat()
+        total = 0
+        while True:
+            removed = compact_chunk(db, notif_type, cutoff, chunk_size)
+            total += removed
+            if removed < chunk_size:
+                break
+            time.sleep(pause)
+        compacted[notif_type] = total
+    return compacted
+
+
+class RetentionJob:
+    """
+    Фоновий потік, що раз на interval секунд викликає run_fn() (очищення сповіщень).
+    Перший запуск - одразу після start(). Помилки логуються, наступний запуск за розкладом.
+    leader_fn() -> bool вирішує, чи цей процес виконує черговий запуск: з кількома воркерами
+    очищення робить лише один. None - виконує завжди.
+    """
+
+    def __init__(self, run_fn, interval=21600, leader_fn=None):
+        self.run_fn = run_fn
+        self.interval = interval
+        self.leader_fn = leader_fn
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started or not self.interval:
+                return
+            self._started = True
+            self._stop_event.clear()
+        threading.Thread(target=self._loop, name='notification-retention', daemon=True).start()
+
+    def stop(self):
+        with self._lock:
+            self._started = False
+        self._stop_event.set()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.leader_fn is None or self.leader_fn():
+                    self.run_fn()
+            except Exception as e:
+                print(f"🔥 Очищення сповіщень впало: {e}")
+            self._stop_event.wait(self.interval)
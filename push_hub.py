@@ -0,0 +1,100 @@
+# push_hub.py — in-process pub/sub для Server-Sent Events (чат і сповіщення без polling)
+import json
+import queue
+import threading
+
+
+class Subscription:
+    """Одна відкрита вкладка (одне SSE-з'єднання) користувача."""
+
+    def __init__(self, user_id, max_queue=100):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        # Якщо клієнт не встигає читати і черга переповнилась - події губляться,
+        # тому наступним надсилаємо 'resync': клієнт сам перезавантажить стан
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Наступна подія (event, data) або None, якщо за timeout секунд нічого не прийшло."""
+        if self.overflowed:
+            self.overflowed = False
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            return 'resync', {}
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class PushHub:
+    """
+    Реєстр підписок user_id -> відкриті вкладки. publish() не блокується: події кладуться
+    в черги підписок, а SSE-генератори кожної вкладки віддають їх клієнту.
+
+    Хаб живе в пам'яті процесу: події бачать лише з'єднання того самого процесу. Кожне SSE-з'єднання
+    весь час тримає свого обробника, тож сервер потрібен асинхронний - gevent
+    (gunicorn -k gevent -w 1 --worker-connections 1000): потоковий воркер (gthread) вичерпає потоки
+    на відкритих вкладках. Подію з іншого процесу вкладка побачить лише з повільного опитування клієнта.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        sub = Subscription(user_id, self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def publish(self, user_ids, event, data):
+        with self._lock:
+            targets = [sub for user_id in user_ids for sub in self._subscribers.get(user_id, ())]
+        for sub in targets:
+            sub.put((event, data))
+        return len(targets)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+def format_sse(event, data):
+    """Одна подія у форматі text/event-stream."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'event: {event}\ndata: {payload}\n\n'
+
+
+def event_stream(hub, sub, heartbeat=25):
+    """
+    Генератор тіла SSE-відповіді. Раз на heartbeat секунд шле коментар-пінг, щоб проксі
+    не закривали тихе з'єднання і щоб ми помітили, що клієнт пішов. Відписується, коли клієнт відключився;
+    якщо генератор не почали ітерувати, відписує response.call_on_close у view (unsubscribe ідемпотентний).
+    """
+    try:
+        # retry: через скільки мс браузер перепідключиться після розриву
+        yield 'retry: 3000\n\n'
+        while True:
+            item = sub.get(timeout=heartbeat)
+            if item is None:
+                yield ': ping\n\n'
+            else:
+                yield format_sse(*item)
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,147 @@
+# queries.py — SQL гарячих запитів (кожне відкриття сторінки чи опитування)
+#
+# Ці самі рядки виконують view в app.py і перевіряють check_query_plans (flask check-query-plans)
+# та tests/test_query_plans.py, тож план перевіряється саме для того запиту, що йде в базу.
+
+UNREAD_NOTIFICATIONS_COUNT = 'SELECT unread FROM notification_counters WHERE user_id = ?'
+
+NOTIFICATIONS_SINCE = '''
+    SELECT * FROM notifications
+    WHERE recipient_id = ? AND id > ?
+    ORDER BY id DESC
+    LIMIT ?
+'''
+
+# Запрошення до команд лишаються непрочитаними: їх треба прийняти або відхилити
+MARK_ALL_NOTIFICATIONS_READ = '''
+    UPDATE notifications SET is_read = 1
+    WHERE recipient_id = ? AND is_read = 0 AND type != 'team_invite'
+'''
+
+NOTIFICATION_RETENTION_CHUNK = '''
+    SELECT id FROM notifications
+    WHERE type = ? AND is_read = 1 AND created_at < ?
+    ORDER BY created_at LIMIT ?
+'''
+
+# Сторінка історії чату: найновіші або старіші за id (keyset-пагінація по (team_id, id))
+_TEAM_CHAT_PAGE = '''
+    SELECT m.*, u.first_name, u.last_name, COALESCE(u.avatar_64, u.avatar) AS avatar
+    FROM team_messages m
+    JOIN users u ON m.user_id = u.id
+    WHERE m.team_id = ? {before_clause}
+    ORDER BY m.id DESC
+    LIMIT ?
+'''
+TEAM_CHAT_LATEST = _TEAM_CHAT_PAGE.format(before_clause='')
+TEAM_CHAT_BEFORE = _TEAM_CHAT_PAGE.format(before_clause='AND m.id < ?')
+
+PERSONAL_TASKS = '''
+    SELECT * FROM tasks
+    WHERE creator_id = ? AND team_id IS NULL
+    ORDER BY is_completed ASC, deadline ASC
+'''
+
+TEAM_TASKS = '''
+    SELECT * FROM tasks
+    WHERE team_id = ?
+    ORDER BY is_completed ASC, deadline ASC
+'''
+
+# Задачі команд, з яких користувач вийшов, не показуємо
+ASSIGNED_TASKS = '''
+    SELECT t.* FROM task_assignees a
+    JOIN tasks t ON t.id = a.task_id
+    WHERE a.user_id = ?
+      AND (t.team_id IS NULL OR EXISTS (
+          SELECT 1 FROM team_members tm WHERE tm.team_id = t.team_id AND tm.user_id = a.user_id))
+    ORDER BY t.is_completed ASC, t.deadline ASC
+'''
+
+
+def task_assignees_query(count):
+    """Виконавці count задач одним запитом (count плейсхолдерів у IN)."""
+    return f'''
+        SELECT task_id, user_id FROM task_assignees
+        WHERE task_id IN ({','.join('?' * count)}) ORDER BY task_id, user_id
+    '''
+
+
+DASHBOARD_DEADLINES = '''
+    SELECT t.id, t.title, t.deadline, t.team_id, tm.name AS team_name
+    FROM tasks t
+    LEFT JOIN teams tm ON tm.id = t.team_id
+    WHERE t.id IN (
+            SELECT id FROM tasks WHERE creator_id = :user_id AND team_id IS NULL
+            UNION
+            SELECT tt.id FROM team_members m JOIN tasks tt ON tt.team_id = m.team_id WHERE m.user_id = :user_id
+            UNION
+            SELECT a.task_id FROM task_assignees a JOIN tasks ta ON ta.id = a.task_id
+            WHERE a.user_id = :user_id AND ta.team_id IS NULL)
+      AND t.is_completed = 0 AND t.deadline IS NOT NULL AND t.deadline < :horizon
+    ORDER BY t.deadline
+    LIMIT :limit
+'''
+
+DASHBOARD_TEAM_ACTIVITY = '''
+    SELECT t.id AS team_id, t.name AS team_name, msg.id AS message_id, msg.message, msg.created_at,
+           u.first_name, u.last_name
+    FROM team_members m
+    JOIN teams t ON t.id = m.team_id
+    LEFT JOIN team_messages msg ON msg.id = (SELECT MAX(id) FROM team_messages WHERE team_id = m.team_id)
+    LEFT JOIN users u ON u.id = msg.user_id
+    WHERE m.user_id = ?
+    ORDER BY msg.id IS NULL, msg.id DESC
+'''
+
+CUSTOM_EVENTS_IN_WINDOW = '''
+    SELECT * FROM events
+    WHERE user_id = ? AND group_name = ? AND date BETWEEN ? AND ?
+'''
+
+USER_TEAMS = '''
+    SELECT t.* FROM teams t
+    JOIN team_members tm ON t.id = tm.team_id
+    WHERE tm.user_id = ?
+    ORDER BY t.created_at DESC
+'''
+
+TEAM_MEMBERSHIP = 'SELECT 1 FROM team_members WHERE team_id = ? AND user_id = ?'
+
+GROUP_SCHEDULE = 'SELECT * FROM schedule WHERE group_name = ?'
+
+# назва -> (запит, приклад параметрів, індекс, яким запит має шукати)
+HOT_QUERIES = {
+    'unread notifications count':
+        (UNREAD_NOTIFICATIONS_COUNT, (1,), 'INTEGER PRIMARY KEY'),
+    'new notifications since id':
+        (NOTIFICATIONS_SINCE, (1, 0, 51), 'idx_notifications_recipient_id'),
+    'mark all notifications read':
+        (MARK_ALL_NOTIFICATIONS_READ, (1,), 'idx_notifications_unread'),
+    'notification retention chunk':
+        (NOTIFICATION_RETENTION_CHUNK, ('team_message', '2025-09-01', 500), 'idx_notifications_read_type_created'),
+    'team chat page':
+        (TEAM_CHAT_LATEST, (1, 51), 'idx_team_messages_team_id'),
+    'team chat older page':
+        (TEAM_CHAT_BEFORE, (1, 1000, 51), 'idx_team_messages_team_id'),
+    'personal tasks':
+        (PERSONAL_TASKS, (1,), 'idx_tasks_creator_personal'),
+    'team tasks':
+        (TEAM_TASKS, (1,), 'idx_tasks_team'),
+    'tasks assigned to user':
+        (ASSIGNED_TASKS, (1,), 'idx_task_assignees_user'),
+    'task assignees':
+        (task_assignees_query(2), (1, 2), 'PRIMARY KEY'),
+    'dashboard deadlines':
+        (DASHBOARD_DEADLINES, {'user_id': 1, 'horizon': '2025-09-08', 'limit': 10}, 'idx_tasks_creator_personal'),
+    'dashboard team activity':
+        (DASHBOARD_TEAM_ACTIVITY, (1,), 'idx_team_members_user'),
+    'custom events in window':
+        (CUSTOM_EVENTS_IN_WINDOW, (1, 'ПП-12', '2025-09-01', '2025-09-30'), 'idx_events_user_group_date'),
+    'user teams':
+        (USER_TEAMS, (1,), 'idx_team_members_user'),
+    'team membership':
+        (TEAM_MEMBERSHIP, (1, 1), 'sqlite_autoindex_team_members_1'),
+    'group schedule':
+        (GROUP_SCHEDULE, ('ПП-12',), 'sqlite_autoindex_schedule_1'),
+}
@@ -0,0 +1,205 @@
+# schedule_calendar.py — розгортання шаблонного розкладу (день тижня + парність) у конкретні дати
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+from operator import itemgetter
+
+MAX_SCHEDULE_WINDOW_DAYS = 366
+
+BOTH_WEEKS = 'обидва'
+NUMERATOR = 'чисельник'
+DENOMINATOR = 'знаменник'
+WEEK_TYPES = (BOTH_WEEKS, NUMERATOR, DENOMINATOR)
+
+# Порядок важливий: перша назва, що входить у рядок шаблону, і визначає день
+WEEKDAY_NAMES = (
+    ('понеділок', 0), ('пн', 0),
+    ('вівторок', 1), ('вт', 1),
+    ('середа', 2), ('ср', 2),
+    ('четвер', 3), ('чт', 3),
+    ("п'ятниця", 4), ('пт', 4),
+    ('субота', 5), ('сб', 5),
+    ('неділя', 6), ('нд', 6),
+)
+
+
+def week_parity_for_date(date_obj, sem_start):
+    """
+    Calculate week parity (чисельник/знаменник) for a given date.
+    Swapped the parity calculation - first week is чисельник (odd weeks), знаменник (even weeks)
+    """
+    days_since_start = (date_obj - sem_start).days
+    week_num = (days_since_start // 7) + 1
+    return DENOMINATOR if week_num % 2 == 1 else NUMERATOR
+
+
+def semester_bounds(day):
+    """Return (sem_start, sem_end) of the semester the given date belongs to."""
+    if day.month >= 8:
+        # Осінній семестр
+        return date(day.year, 9, 1), date(day.year, 12, 19)
+    # Весняний семестр
+    return date(day.year, 2, 1), date(day.year, 6, 30)
+
+
+def iter_semesters(start, end):
+    """Yield (sem_start, sem_end) for every semester overlapping [start, end]."""
+    sem_start, sem_end = semester_bounds(start)
+    while sem_start <= end:
+        yield sem_start, sem_end
+        if sem_start.month == 9:
+            sem_start, sem_end = semester_bounds(date(sem_start.year + 1, 2, 1))
+        else:
+            sem_start, sem_end = semester_bounds(date(sem_start.year, 9, 1))
+
+
+def parse_date_window(start_arg, end_arg, today=None):
+    """
+    Розбирає ?start=YYYY-MM-DD&end=YYYY-MM-DD (ISO datetime теж приймається).
+    Без параметрів повертає поточний місяць.
+    """
+    today = today or date.today()
+    start = date.fromisoformat(start_arg[:10]) if start_arg else today.replace(day=1)
+    if end_arg:
+        end = date.fromisoformat(end_arg[:10])
+    else:
+        # Без кінця - до останнього дня місяця, з якого починається вікно
+        end = (start.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    if end < start:
+        raise ValueError('end must not be before start')
+    if (end - start).days >= MAX_SCHEDULE_WINDOW_DAYS:
+        raise ValueError(f'date window is limited to {MAX_SCHEDULE_WINDOW_DAYS} days')
+    return start, end
+
+
+@lru_cache(maxsize=256)
+def normalize_weekday(template_weekday):
+    """Номер дня тижня (0 = понеділок) для назви з шаблону, або None якщо не розпізнано."""
+    lowered = template_weekday.strip().lower()
+    for name, num in WEEKDAY_NAMES:
+        if name in lowered:
+            return num
+    return None
+
+
+class CompiledSchedule:
+    """
+    Шаблонні рядки, один раз розкладені за ключем (день тижня, парність).
+    Дати генеруються арифметично: крок 7 днів для 'обидва', 14 - для чисельника/знаменника.
+    """
+
+    __slots__ = ('buckets',)
+
+    def __init__(self, schedule_data):
+        buckets = {}
+        for idx, row in enumerate(schedule_data):
+            weekday = normalize_weekday(row.get('weekday') or '')
+            parity = row.get('week_type', BOTH_WEEKS)
+            # Рядки з невідомим днем або парністю ніколи не потрапляють у календар
+            if weekday is None or parity not in WEEK_TYPES:
+                continue
+            buckets.setdefault((weekday, parity), []).append((idx, row))
+        self.buckets = buckets
+
+    def expand(self, sem_start, sem_end, window_start=None, window_end=None):
+        """Same output as the day-by-day walk: ordered by date, then by template row order."""
+        first = max(sem_start, window_start) if window_start else sem_start
+        last = min(sem_end, window_end) if window_end else sem_end
+        if first > last:
+            return []
+
+        last_ordinal = last.toordinal()
+        hits = []
+        for (weekday, parity), rows in self.buckets.items():
+            current = first + timedelta(days=(weekday - first.weekday()) % 7)
+            if parity == BOTH_WEEKS:
+                step = 7
+            else:
+                step = 14
+                if week_parity_for_date(current, sem_start) != parity:
+                    current += timedelta(days=7)
+
+            ordinal = current.toordinal()
+            while ordinal <= last_ordinal:
+                iso = date.fromordinal(ordinal).isoformat()
+                for idx, row in rows:
+                    hits.append((ordinal, idx, iso, row))
+                ordinal += step
+
+        hits.sort(key=itemgetter(0, 1))
+
+        expanded = []
+        for _, _, iso, row in hits:
+            expanded_row = dict(row)
+            expanded_row['date'] = iso
+            expanded.append(expanded_row)
+        return expanded
+
+
+def compile_schedule(schedule_data):
+    return CompiledSchedule(schedule_data)
+
+
+def expand_template_rows_to_dates(schedule_data, sem_start, sem_end, first_week=DENOMINATOR,
+                                  window_start=None, window_end=None):
+    """
+    Expand template schedule rows (with weekday names) to concrete dates.
+    Returns list of events for each date in the semester, clipped to
+    [window_start, window_end] when a window is given.
+    """
+    return CompiledSchedule(schedule_data).expand(sem_start, sem_end, window_start, window_end)
+
+
+def json_fragment(items):
+    """Серіалізує список у JSON без зовнішніх дужок: b'{...},{...}'."""
+    return json.dumps(items, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')[1:-1]
+
+
+CachedCalendar = namedtuple('CachedCalendar', ['etag', 'events_json', 'schedule_json'])
+
+
+class CalendarCache:
+    """
+    Потокобезпечний LRU готових (серіалізованих) календарів.
+    Ключ: (group_name, subgroup, window_start, window_end, include_raw, version), де version -
+    cached_at останнього перезапису розкладу групи, тож новий розклад ніколи не влучає в старий запис.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, events, schedule_rows=None):
+        entry = CachedCalendar(
+            etag=hashlib.sha1(repr(key).encode('utf-8')).hexdigest(),
+            events_json=json_fragment(events),
+            schedule_json=json_fragment(schedule_rows) if schedule_rows is not None else b''
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, group_name):
+        """Видаляє всі календарі групи (після перезапису її рядків у schedule)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == group_name]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,180 @@
+# schedule_import.py — масовий імпорт розкладів груп з LPNU (напр. у ніч перед початком семестру)
+#
+# Завантаження - у пулі потоків (мережа), розбір HTML - у пулі процесів, якщо ядер більше одного
+# (не тримає GIL потоків завантаження), запис - в одному потоці пачками: одна транзакція на batch_size груп.
+# Стан кожної групи запуску лежить у schedule_import_groups і пишеться в тій самій транзакції,
+# що й розклад, тож після обриву імпорт продовжується рівно з незаписаних груп.
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import quote
+
+import requests
+
+from lpnu_client import UpstreamUnavailable
+from schedule_parser import parse_schedule_rows
+from schedule_store import write_schedule
+
+# Результат однієї групи: rows - рядки розкладу або None, якщо error
+GroupResult = namedtuple('GroupResult', 'group_name fetched_at rows error')
+
+
+class ImportFailed(Exception):
+    """Розклад групи не вдалося отримати чи розібрати; текст іде в schedule_import_groups.error."""
+
+
+def schedule_page_url(base_url, group_name):
+    return f"{base_url}?studygroup_abbrname={quote(group_name)}&semestr=1"
+
+
+def fetch_schedule_page(client, base_url, group_name, timeout=(5, 20)):
+    """HTML сторінки розкладу групи через спільний клієнт LPNU. Будь-яка невдача -> ImportFailed."""
+    try:
+        response = client.get(schedule_page_url(base_url, group_name), timeout=timeout)
+    except (UpstreamUnavailable, requests.RequestException) as e:
+        raise ImportFailed(f'fetch failed: {e}') from e
+    if response.status_code != 200:
+        raise ImportFailed(f'HTTP {response.status_code}')
+    response.encoding = 'utf-8'
+    return response.text
+
+
+def parse_page(html_text):
+    """Сторінка -> рядки розкладу (виконується в пулі процесів). Порожній розклад - теж ImportFailed."""
+    rows = parse_schedule_rows(html_text)
+    if not rows:
+        if 'не знайдено' in html_text.lower():
+            raise ImportFailed('schedule not found')
+        raise ImportFailed("no 'view-content' container" if rows is None else 'parsed 0 rows')
+    return rows
+
+
+# --- Стан запусків ---
+
+def create_run(db, groups):
+    """Новий запуск з групами groups у стані pending. Повертає id запуску."""
+    run_id = db.execute('INSERT INTO schedule_import_runs (started_at) VALUES (?)',
+                        (datetime.now().isoformat(),)).lastrowid
+    db.executemany('INSERT OR IGNORE INTO schedule_import_groups (run_id, group_name) VALUES (?, ?)',
+                   [(run_id, group_name) for group_name in groups])
+    db.commit()
+    return run_id
+
+
+def last_unfinished_run(db):
+    row = db.execute('SELECT id FROM schedule_import_runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1').fetchone()
+    return row[0] if row else None
+
+
+def remaining_groups(db, run_id):
+    """Групи запуску, які ще не записані: pending і failed (невдалі пробуються знову)."""
+    return [row[0] for row in db.execute('''
+        SELECT group_name FROM schedule_import_groups WHERE run_id = ? AND status != 'done' ORDER BY group_name
+    ''', (run_id,))]
+
+
+def failed_groups(db, run_id):
+    return db.execute('''
+        SELECT group_name, error FROM schedule_import_groups WHERE run_id = ? AND status = 'failed' ORDER BY group_name
+    ''', (run_id,)).fetchall()
+
+
+def finish_run(db, run_id):
+    db.execute('UPDATE schedule_import_runs SET finished_at = ? WHERE id = ?', (datetime.now().isoformat(), run_id))
+    db.commit()
+
+
+# --- Імпорт ---
+
+def write_batch(db, run_id, results):
+    """
+    Одна транзакція на пачку: розклади успішних груп (диффом, write_schedule) і стан усіх груп пачки.
+    Група, яку інший процес звірив уже після нашого завантаження, не перезаписується.
+    Повертає [inserted, updated, deleted].
+    """
+    now = datetime.now().isoformat()
+    totals = [0, 0, 0]
+    statuses = []
+    if not db.in_transaction:
+        db.execute('BEGIN IMMEDIATE')
+    try:
+        for result in results:
+            if result.error is not None:
+                statuses.append(('failed', str(result.error) or type(result.error).__name__, now,
+                                 run_id, result.group_name))
+                continue
+            checked = db.execute('SELECT checked_at FROM schedule_groups WHERE group_name = ?',
+                                 (result.group_name,)).fetchone()
+            if checked is None or (checked[0] or '') <= result.fetched_at:
+                diff = write_schedule(db, result.group_name, result.rows, now)
+                totals[0] += diff.inserted
+                totals[1] += diff.updated
+                totals[2] += diff.deleted
+            statuses.append(('done', None, now, run_id, result.group_name))
+        db.executemany('''UPDATE schedule_import_groups SET status = ?, error = ?, updated_at = ?
+                          WHERE run_id = ? AND group_name = ?''', statuses)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return totals
+
+
+def import_schedules(db, run_id, groups, fetch_page, batch_size=50, fetch_workers=4, parse_workers=None,
+                     log=print):
+    """
+    Імпортує groups у запуск run_id. fetch_page(group_name) -> HTML викликається з fetch_workers потоків;
+    parse_workers процесів розбирають сторінки (0 - розбір у потоках завантаження).
+    None - пул за кількістю ядер, а на одному ядрі - розбір у потоках: потік завантаження однаково
+    чекає на свою сторінку, тож пул лише додає передачу HTML і рядків між процесами
+    (benchmarks/bench_import.py на 1 CPU: 4.94 s з пулом проти 4.53 s без нього).
+    Повертає (кількість записаних груп, кількість невдалих).
+    """
+    if parse_workers is None and (os.cpu_count() or 1) == 1:
+        parse_workers = 0
+    parse_pool = None
+    if parse_workers != 0:
+        # spawn, а не fork: у процесі вже працюють потоки (пул з'єднань LPNU), fork з ними ненадійний
+        parse_pool = ProcessPoolExecutor(parse_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def fetch_and_parse(group_name):
+        fetched_at = datetime.now().isoformat()
+        try:
+            html_text = fetch_page(group_name)
+            # Потік чекає на розбір своєї сторінки: у пам'яті не більше fetch_workers сторінок одночасно
+            rows = parse_pool.submit(parse_page, html_text).result() if parse_pool else parse_page(html_text)
+            return GroupResult(group_name, fetched_at, rows, None)
+        except Exception as e:
+            return GroupResult(group_name, fetched_at, None, e)
+
+    started = time.monotonic()
+    done = failed = 0
+    totals = [0, 0, 0]
+    batch = []
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='schedule-import')
+    try:
+        futures = [fetch_pool.submit(fetch_and_parse, group_name) for group_name in groups]
+        for future in as_completed(futures):
+            batch.append(future.result())
+            if len(batch) < batch_size and done + failed + len(batch) < len(groups):
+                continue
+            written = write_batch(db, run_id, batch)
+            totals = [a + b for a, b in zip(totals, written)]
+            batch_failed = [result for result in batch if result.error is not None]
+            done += len(batch) - len(batch_failed)
+            failed += len(batch_failed)
+            for result in batch_failed:
+                log(f"❌ {result.group_name}: {result.error}")
+            elapsed = time.monotonic() - started
+            log(f"📦 [{done + failed}/{len(groups)}] ok {done}, помилок {failed}, "
+                f"рядків +{totals[0]} ~{totals[1]} -{totals[2]}, {(done + failed) / elapsed:.1f} груп/с")
+            batch = []
+    finally:
+        # Ctrl+C: записане лишається в базі, незавантажене скасовується і чекає на --resume
+        fetch_pool.shutdown(wait=True, cancel_futures=True)
+        if parse_pool:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+    return done, failed
@@ -0,0 +1,261 @@
+# schedule_parser.py — розбір сторінки розкладу LPNU (Drupal Views) з кількома бекендами
+import os
+
+from bs4 import BeautifulSoup
+
+# detect_subgroup/detect_week_type жили тут - реекспорт, щоб старі імпорти працювали
+from schedule_classify import classify_details, classify_elem_id, detect_subgroup, detect_week_type  # noqa: F401
+
+# Швидкі C-бекенди необов'язкові: якщо їх не встановлено, працюємо через BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    SelectolaxHTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Час пар (бо в HTML є тільки цифри 1, 2, 3...)
+LESSON_TIMES = {
+    '1': ('08:30', '10:05'),
+    '2': ('10:20', '11:55'),
+    '3': ('12:10', '13:45'),
+    '4': ('14:15', '15:50'),
+    '5': ('16:00', '17:35'),
+    '6': ('17:40', '19:15'),
+    '7': ('19:20', '20:55'),
+    '8': ('21:00', '22:35')
+}
+
+
+def split_parts(text_nodes):
+    """
+    Текст group_content розділений тегами <br>: кожен текстовий вузол - окрема частина.
+    Те саме, що get_text(separator='|', strip=True).split('|') у BeautifulSoup.
+    """
+    return [p.strip() for node in text_nodes for p in node.strip().split('|') if p.strip()]
+
+
+def build_rows(weekday, lesson_num, elem_id, parts):
+    """Один блок пари (день, номер пари, id блоку, частини тексту) -> рядки розкладу."""
+    if not parts:
+        return []
+
+    subgroup, week_type = classify_elem_id(elem_id)
+
+    # Назва предмету - це завжди перша частина, решта - деталі (викладач, ауд, тип)
+    subject = parts[0]
+    subject_type, location = classify_details(parts[1:])
+
+    # Час
+    times = LESSON_TIMES.get(lesson_num, ('00:00', '00:00'))
+
+    # Додаємо в результат
+    subgroups_to_add = [1, 2] if subgroup == 0 else [subgroup]
+
+    return [{
+        'weekday': weekday,
+        'start_time': times[0],
+        'end_time': times[1],
+        'subject': subject,
+        'subject_type': subject_type,
+        'location': location,
+        'subgroup': sub,
+        'week_type': week_type
+    } for sub in subgroups_to_add]
+
+
+# --- Бекенди ---
+# Кожен бекенд лише витягує блоки (weekday, lesson_num, elem_id, parts) з прямих дітей
+# div.view-content; класифікація спільна (build_rows), тож результат не залежить від бекенду.
+# Повертає None, якщо контейнер 'view-content' не знайдено.
+
+def extract_blocks_bs4(html_text):
+    """Надійний парсер для Drupal Views (LPNU), який ігнорує пробіли в HTML."""
+    soup = BeautifulSoup(html_text, 'html.parser')
+
+    # Знаходимо головний контейнер
+    view_content = soup.find('div', {'class': 'view-content'})
+    if not view_content:
+        return None
+
+    blocks = []
+    # Змінні стану (щоб пам'ятати, де ми знаходимось під час циклу)
+    current_weekday = None
+    current_lesson_num = None
+
+    # recursive=False означає, що ми беремо тільки прямих дітей (h3, div, span), а не все дерево
+    for element in view_content.find_all(recursive=False):
+
+        # 1. Якщо це заголовок дня (Пн, Вт...)
+        if element.name == 'span' and 'view-grouping-header' in element.get('class', []):
+            current_weekday = element.get_text(strip=True)
+            continue
+
+        # 2. Якщо це номер пари (<h3>1</h3>)
+        if element.name == 'h3':
+            current_lesson_num = element.get_text(strip=True)
+            continue
+
+        # 3. Якщо це блок з розкладом
+        if element.name == 'div' and 'stud_schedule' in element.get('class', []):
+            # Якщо ми ще не знаємо дня або номера пари, пропускаємо (захист від збоїв)
+            if not current_weekday or not current_lesson_num:
+                continue
+
+            # Шукаємо div-и, у яких є ID (наприклад id='group_full' або id='sub_1_chys')
+            for div in element.find_all('div', id=True):
+                content_div = div.find('div', {'class': 'group_content'})
+                if not content_div:
+                    continue
+                # get_text з separator='|' замінить <br> на |
+                clean_text = content_div.get_text(separator='|', strip=True)
+                parts = [p.strip() for p in clean_text.split('|') if p.strip()]
+                blocks.append((current_weekday, current_lesson_num, div.get('id', ''), parts))
+
+    return blocks
+
+
+# Як і get_text у BeautifulSoup, ігноруємо коментарі та вміст <script>/<style>
+NON_TEXT_TAGS = ('script', 'style')
+LXML_CLASS_XPATH = './/div[contains(concat(" ", normalize-space(@class), " "), " {} ")]'
+
+
+def _lxml_strings(element):
+    return element.xpath('.//text()[not(parent::script) and not(parent::style)]')
+
+
+def extract_blocks_lxml(html_text):
+    if not html_text.strip():
+        return None
+    root = lxml_html.fromstring(html_text)
+    found = root.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " view-content ")]')
+    if not found:
+        return None
+
+    blocks = []
+    current_weekday = None
+    current_lesson_num = None
+
+    for element in found[0]:
+        if not isinstance(element.tag, str):
+            # коментарі та processing instructions
+            continue
+        classes = (element.get('class') or '').split()
+
+        if element.tag == 'span' and 'view-grouping-header' in classes:
+            current_weekday = ''.join(t.strip() for t in _lxml_strings(element))
+            continue
+
+        if element.tag == 'h3':
+            current_lesson_num = ''.join(t.strip() for t in _lxml_strings(element))
+            continue
+
+        if element.tag == 'div' and 'stud_schedule' in classes:
+            if not current_weekday or not current_lesson_num:
+                continue
+            for div in element.iterdescendants('div'):
+                elem_id = div.get('id')
+                if elem_id is None:
+                    continue
+                content = div.xpath(LXML_CLASS_XPATH.format('group_content'))
+                if not content:
+                    continue
+                parts = split_parts(_lxml_strings(content[0]))
+                blocks.append((current_weekday, current_lesson_num, elem_id, parts))
+
+    return blocks
+
+
+def _selectolax_strings(node):
+    return [n.text(deep=False) for n in node.traverse(include_text=True)
+            if n.tag == '-text' and n.parent.tag not in NON_TEXT_TAGS]
+
+
+def extract_blocks_selectolax(html_text):
+    tree = SelectolaxHTMLParser(html_text)
+    view_content = tree.css_first('div.view-content')
+    if view_content is None:
+        return None
+
+    blocks = []
+    current_weekday = None
+    current_lesson_num = None
+
+    for element in view_content.iter(include_text=False):
+        tag = element.tag
+        if tag not in ('span', 'h3', 'div'):
+            continue
+        classes = (element.attributes.get('class') or '').split()
+
+        if tag == 'span' and 'view-grouping-header' in classes:
+            current_weekday = ''.join(t.strip() for t in _selectolax_strings(element))
+            continue
+
+        if tag == 'h3':
+            current_lesson_num = ''.join(t.strip() for t in _selectolax_strings(element))
+            continue
+
+        if tag == 'div' and 'stud_schedule' in classes:
+            if not current_weekday or not current_lesson_num:
+                continue
+            for div in element.css('div[id]'):
+                # css() включає і сам вузол, а find_all у bs4 - лише нащадків
+                if div.mem_id == element.mem_id:
+                    continue
+                content = div.css_first('div.group_content')
+                if content is None:
+                    continue
+                parts = split_parts(_selectolax_strings(content))
+                blocks.append((current_weekday, current_lesson_num, div.attributes.get('id') or '', parts))
+
+    return blocks
+
+
+BACKENDS = {'bs4': extract_blocks_bs4}
+if lxml_html is not None:
+    BACKENDS['lxml'] = extract_blocks_lxml
+if SelectolaxHTMLParser is not None:
+    BACKENDS['selectolax'] = extract_blocks_selectolax
+
+# Від найшвидшого до запасного
+BACKEND_PREFERENCE = ('selectolax', 'lxml', 'bs4')
+
+
+def default_backend():
+    """Бекенд з SCHEDULE_PARSER_BACKEND, інакше найшвидший з встановлених."""
+    requested = os.environ.get('SCHEDULE_PARSER_BACKEND')
+    if requested in BACKENDS:
+        return requested
+    return next(name for name in BACKEND_PREFERENCE if name in BACKENDS)
+
+
+def parse_schedule_rows(html_text, backend=None):
+    """
+    Рядки розкладу сторінки або None, якщо контейнер 'view-content' не знайдено. Без print -
+    так його зручно викликати масово, напр. у пулі процесів (schedule_import.py).
+    """
+    blocks = BACKENDS[backend or default_backend()](html_text)
+    if blocks is None:
+        return None
+    schedule = []
+    for block in blocks:
+        schedule.extend(build_rows(*block))
+    return schedule
+
+
+def parse_html_schedule(html_text, backend=None):
+    """
+    Надійний парсер для Drupal Views (LPNU), який ігнорує пробіли в HTML.
+    backend: 'selectolax', 'lxml' або 'bs4' (за замовчуванням - найшвидший доступний).
+    """
+    schedule = parse_schedule_rows(html_text, backend)
+
+    if schedule is None:
+        print("❌ Контейнер 'view-content' не знайдено.")
+        return []
+
+    print(f"✅ Успішно розпарсено {len(schedule)} пар.")
+    return schedule
@@ -0,0 +1,147 @@
+# schedule_refresher.py — фонове оновлення розкладів груп до того, як кеш застаріє
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ScheduleRefresher:
+    """
+    Фоновий оновлювач розкладів.
+
+    - refresh_fn(group_name) -> bool виконує сам запит до LPNU і запис у базу;
+    - due_groups_fn() -> iterable повертає групи, які скоро застаріють;
+    - не більше max_workers одночасних запитів до LPNU;
+    - кожне оновлення зсувається на випадкову затримку до jitter секунд, щоб не бити сайт пачкою;
+    - після невдачі група не оновлюється ще failure_backoff секунд, якщо has_data_fn(group_name) каже,
+      що їй є що показати. Група без даних інакше годину віддавала б порожній розклад, тож для неї
+      пауза коротка й росте з кожною невдачею поспіль: cold_failure_backoff, x2, x4... до failure_backoff.
+      has_data_fn=None - у всіх груп є дані;
+    - scan_leader_fn() -> bool вирішує, чи цей процес зараз шукає групи (due_groups_fn): з кількома
+      воркерами сканує лише один. None - сканує завжди. Черга enqueue() працює в кожному процесі.
+    """
+
+    def __init__(self, refresh_fn, due_groups_fn, max_workers=2, jitter=60,
+                 scan_interval=600, failure_backoff=3600, scan_leader_fn=None,
+                 cold_failure_backoff=30, has_data_fn=None):
+        self.refresh_fn = refresh_fn
+        self.due_groups_fn = due_groups_fn
+        self.scan_leader_fn = scan_leader_fn
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.scan_interval = scan_interval
+        self.failure_backoff = failure_backoff
+        self.cold_failure_backoff = cold_failure_backoff
+        self.has_data_fn = has_data_fn
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue = []          # heap з (due_time, group_name)
+        self._pending = set()     # заплановані або ті, що виконуються
+        self._failed_until = {}
+        self._failures = {}       # невдач поспіль у груп без даних
+        self._executor = None
+        self._stopped = False
+        self._stop_event = threading.Event()
+        self._started = False
+
+    # --- Життєвий цикл ---
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stopped = False
+            self._stop_event.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='schedule-refresh')
+        threading.Thread(target=self._dispatch_loop, name='schedule-refresh-dispatch', daemon=True).start()
+        if self.scan_interval:
+            threading.Thread(target=self._scan_loop, name='schedule-refresh-scan', daemon=True).start()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._started = False
+            self._wakeup.notify_all()
+        self._stop_event.set()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    # --- Черга ---
+
+    def enqueue(self, group_name, jitter=None):
+        """
+        Запланувати оновлення групи. Повертає True, якщо оновлення заплановане
+        (або вже в черзі), False - якщо група зараз у паузі після невдачі.
+        """
+        self.start()
+        delay = random.uniform(0, self.jitter if jitter is None else jitter)
+        with self._lock:
+            if group_name in self._pending:
+                return True
+            if self._failed_until.get(group_name, 0) > time.monotonic():
+                return False
+            self._pending.add(group_name)
+            heapq.heappush(self._queue, (time.monotonic() + delay, group_name))
+            self._wakeup.notify()
+        return True
+
+    def is_pending(self, group_name):
+        with self._lock:
+            return group_name in self._pending
+
+    def _dispatch_loop(self):
+        while True:
+            with self._lock:
+                while not self._stopped and (not self._queue or self._queue[0][0] > time.monotonic()):
+                    timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                    self._wakeup.wait(timeout)
+                if self._stopped:
+                    return
+                _, group_name = heapq.heappop(self._queue)
+            self._executor.submit(self._run, group_name)
+
+    def _run(self, group_name):
+        ok = False
+        try:
+            ok = self.refresh_fn(group_name)
+        except Exception as e:
+            print(f"🔥 Фонове оновлення {group_name} впало: {e}")
+        finally:
+            has_data = ok or self._has_data(group_name)
+            with self._lock:
+                self._pending.discard(group_name)
+                if ok:
+                    self._failed_until.pop(group_name, None)
+                    self._failures.pop(group_name, None)
+                elif has_data:
+                    self._failures.pop(group_name, None)
+                    self._failed_until[group_name] = time.monotonic() + self.failure_backoff
+                else:
+                    failures = self._failures.get(group_name, 0)
+                    self._failures[group_name] = failures + 1
+                    backoff = min(self.cold_failure_backoff * 2 ** failures, self.failure_backoff)
+                    self._failed_until[group_name] = time.monotonic() + backoff
+
+    def _has_data(self, group_name):
+        if self.has_data_fn is None:
+            return True
+        try:
+            return self.has_data_fn(group_name)
+        except Exception as e:
+            print(f"🔥 Не вдалося перевірити дані групи {group_name}: {e}")
+            return True
+
+    def _scan_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                # Не лідер - пробуємо знову через scan_interval: лідер міг завершитись
+                if self.scan_leader_fn is None or self.scan_leader_fn():
+                    for group_name in self.due_groups_fn():
+                        self.enqueue(group_name)
+            except Exception as e:
+                print(f"🔥 Помилка пошуку груп для оновлення: {e}")
+            self._stop_event.wait(self.scan_interval)
@@ -0,0 +1,85 @@
+# schedule_store.py — запис розкладу групи в базу диффом: змінюються лише рядки, які справді змінились
+from collections import namedtuple
+
+# Ключ рядка - той самий, що UNIQUE(group_name, subgroup, weekday, start_time, week_type) у таблиці schedule
+KEY_COLUMNS = ('subgroup', 'weekday', 'start_time', 'week_type')
+VALUE_COLUMNS = ('end_time', 'subject', 'subject_type', 'location')
+
+
+class ScheduleDiff(namedtuple('ScheduleDiff', 'inserted updated deleted unchanged')):
+    """Скільки рядків розкладу групи додано, змінено, видалено і залишено як є."""
+
+    @property
+    def changed(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+
+def row_key(row):
+    return tuple(row[c] for c in KEY_COLUMNS)
+
+
+def row_values(row):
+    return tuple(row[c] for c in VALUE_COLUMNS)
+
+
+def diff_schedule_rows(existing_rows, parsed_rows):
+    """
+    existing_rows - рядки з бази (з id), parsed_rows - рядки з парсера.
+    Повертає (нові рядки, [(значення, id)] для UPDATE, [id] для DELETE, кількість незмінених).
+    Якщо парсер видав кілька рядків з одним ключем, береться останній.
+    """
+    wanted = {row_key(row): row for row in parsed_rows}
+
+    to_update = []
+    to_delete = []
+    unchanged = 0
+    for row in existing_rows:
+        new_row = wanted.pop(row_key(row), None)
+        if new_row is None:
+            to_delete.append(row['id'])
+        elif row_values(new_row) != row_values(row):
+            to_update.append((row_values(new_row), row['id']))
+        else:
+            unchanged += 1
+
+    # Те, що лишилось у wanted, в базі ще немає
+    return list(wanted.values()), to_update, to_delete, unchanged
+
+
+def write_schedule(db, group_name, parsed_rows, now):
+    """
+    Приводить рядки групи в таблиці schedule до parsed_rows пакетними executemany
+    і відмічає в schedule_groups, що розклад звірено з LPNU (checked_at) та чи він змінився (changed_at).
+    Транзакцією керує викликач. Повертає ScheduleDiff.
+    """
+    existing = db.execute(f'''SELECT id, {", ".join(KEY_COLUMNS + VALUE_COLUMNS)} FROM schedule
+                              WHERE group_name = ?''', (group_name,)).fetchall()
+    to_insert, to_update, to_delete, unchanged = diff_schedule_rows(existing, parsed_rows)
+
+    if to_delete:
+        db.executemany('DELETE FROM schedule WHERE id = ?', [(row_id,) for row_id in to_delete])
+    if to_update:
+        db.executemany('''UPDATE schedule SET end_time = ?, subject = ?, subject_type = ?, location = ?, cached_at = ?
+                          WHERE id = ?''',
+                       [values + (now, row_id) for values, row_id in to_update])
+    if to_insert:
+        db.executemany('''INSERT INTO schedule
+                          (group_name, subgroup, weekday, start_time, end_time, subject, subject_type, location, week_type, cached_at)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                       [(group_name, row['subgroup'], row['weekday'], row['start_time'], row['end_time'],
+                         row['subject'], row['subject_type'], row['location'], row['week_type'], now)
+                        for row in to_insert])
+
+    diff = ScheduleDiff(len(to_insert), len(to_update), len(to_delete), unchanged)
+
+    # changed_at - версія розкладу для кешів календарів: рухається лише коли щось справді змінилось
+    if diff.changed:
+        db.execute('''INSERT INTO schedule_groups (group_name, checked_at, changed_at) VALUES (?, ?, ?)
+                      ON CONFLICT(group_name) DO UPDATE SET checked_at = excluded.checked_at,
+                                                            changed_at = excluded.changed_at''',
+                   (group_name, now, now))
+    else:
+        db.execute('''INSERT INTO schedule_groups (group_name, checked_at, changed_at) VALUES (?, ?, ?)
+                      ON CONFLICT(group_name) DO UPDATE SET checked_at = excluded.checked_at''',
+                   (group_name, now, now))
+    return diff
@@ -0,0 +1,178 @@
+# search.py — повнотекстовий пошук (FTS5) по повідомленнях команд, задачах і подіях користувача
+import html
+import re
+import unicodedata
+
+SNIPPET_TOKENS = 12
+
+MAX_QUERY_TERMS = 8
+# Як у unicode61: слово - літери й цифри, підкреслення розділяє слова
+_TERM_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# Скільки найновіших збігів ранжувати за bm25. Часте слово збігається з десятками тисяч повідомлень -
+# сортувати їх усі на кожен запит дорого, а далі перших сторінок однаково ніхто не гортає.
+RANK_WINDOW = 1000
+
+
+def query_terms(text):
+    """Слова з поля пошуку (у нижньому регістрі, не більше MAX_QUERY_TERMS). Порожній список - шукати нічого."""
+    return _TERM_RE.findall((text or '').lower())[:MAX_QUERY_TERMS]
+
+
+def fts_query(terms):
+    """
+    Слова -> вираз FTS5 MATCH. Кожне слово береться в лапки (синтаксис FTS5 з запиту не виконується)
+    і шукається як префікс, щоб "лекц" знаходило "лекція", "лекції" тощо. Усі слова мають бути в документі (AND).
+    """
+    return ' '.join(f'"{term}"*' if len(term) >= 2 else f'"{term}"' for term in terms)
+
+
+def _fold(word):
+    # Як токенізатор unicode61 remove_diacritics: без регістру й діакритики
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', word.casefold()) if not unicodedata.combining(ch))
+
+
+def _matches(word, folded_terms):
+    word = _fold(word)
+    return any(word.startswith(term) if len(term) >= 2 else word == term for term in folded_terms)
+
+
+def _has_match(text, folded_terms):
+    return any(_matches(word, folded_terms) for word in _TERM_RE.findall(text or ''))
+
+
+def snippet_html(text, terms, tokens=SNIPPET_TOKENS):
+    """
+    Уривок тексту навколо першого збігу з <mark> на знайдених словах; текст екранований, безпечний для DOM.
+    Рахується в Python, а не через snippet() FTS5: той для кожного рядка заново розгортає префікс
+    по всьому індексу, і для частого слова сторінка результатів коштувала б сотні мілісекунд.
+    """
+    text = text or ''
+    words = list(_TERM_RE.finditer(text))
+    if not words:
+        return html.escape(text)
+    folded_terms = [_fold(term) for term in terms]
+    hits = [i for i, word in enumerate(words) if _matches(word.group(), folded_terms)]
+    last = min(len(words), max(0, (hits[0] if hits else 0) - tokens // 4) + tokens)
+    first = max(0, last - tokens)
+
+    start = 0 if first == 0 else words[first].start()
+    end = len(text) if last == len(words) else words[last - 1].end()
+    parts = ['…'] if start > 0 else []
+    position = start
+    for i in hits:
+        if first <= i < last:
+            word = words[i]
+            parts.append(html.escape(text[position:word.start()]))
+            parts.append(f'<mark>{html.escape(word.group())}</mark>')
+            position = word.end()
+    parts.append(html.escape(text[position:end]))
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def _page(rows, limit, terms, columns, hidden=()):
+    """
+    Запит бере limit + 1 рядок: зайвий лише показує, що є наступна сторінка.
+    Уривок - з першої з columns, де є збіг; hidden - колонки лише для уривку, у відповідь не йдуть.
+    """
+    folded_terms = [_fold(term) for term in terms]
+    results = []
+    for row in rows[:limit]:
+        item = dict(row)
+        texts = [item[column] for column in columns]
+        text = next((text for text in texts if _has_match(text, folded_terms)), texts[0])
+        item['snippet_html'] = snippet_html(text, terms)
+        for column in hidden:
+            del item[column]
+        results.append(item)
+    return {'results': results, 'has_more': len(rows) > limit}
+
+
+def search_messages(db, user_id, terms, limit=20, offset=0, window=RANK_WINDOW):
+    """
+    Повідомлення лише з команд, де користувач зараз учасник. Серед window найновіших збігів
+    найрелевантніші (bm25) першими.
+    """
+    team_ids = [row[0] for row in db.execute('SELECT team_id FROM team_members WHERE user_id = ?', (user_id,))]
+    if not team_ids:
+        return {'results': [], 'has_more': False}
+    # Фільтр за командами - частина виразу MATCH (колонка team_id), тож FTS5 перетинає списки документів
+    # сам, а bm25 рахується лише для повідомлень цих команд
+    teams = ' OR '.join(str(team_id) for team_id in team_ids)
+    query = f'{{team_id}}: ({teams}) AND {{message file_name}}: ({fts_query(terms)})'
+    rows = db.execute('''
+        WITH candidates AS (
+            SELECT rowid AS id, bm25(team_messages_fts, 1.0, 1.0, 0.0) AS score
+            FROM team_messages_fts
+            WHERE team_messages_fts MATCH :query
+            ORDER BY rowid DESC
+            LIMIT :window
+        )
+        SELECT m.id, m.team_id, t.name AS team_name, m.user_id, u.first_name, u.last_name,
+               m.created_at, m.file_name, m.message
+        FROM candidates c
+        JOIN team_messages m ON m.id = c.id
+        JOIN teams t ON t.id = m.team_id
+        JOIN users u ON u.id = m.user_id
+        ORDER BY c.score, c.id DESC
+        LIMIT :limit OFFSET :offset
+    ''', {'query': query, 'window': window, 'limit': limit + 1, 'offset': offset}).fetchall()
+    return _page(rows, limit, terms, ('message', 'file_name'), hidden=('message',))
+
+
+def search_tasks(db, user_id, terms, limit=20, offset=0, window=RANK_WINDOW):
+    """Особисті задачі (свої або де користувач виконавець) і задачі його команд. Збіг у назві важить більше."""
+    rows = db.execute('''
+        WITH candidates AS (
+            SELECT tasks_fts.rowid AS id, bm25(tasks_fts, 10.0, 1.0) AS score
+            FROM tasks_fts
+            JOIN tasks t ON t.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH :query
+              AND (
+                  (t.team_id IS NULL AND (t.creator_id = :user_id OR EXISTS (
+                      SELECT 1 FROM task_assignees a WHERE a.task_id = t.id AND a.user_id = :user_id)))
+                  OR EXISTS (
+                      SELECT 1 FROM team_members m WHERE m.team_id = t.team_id AND m.user_id = :user_id)
+              )
+            ORDER BY tasks_fts.rowid DESC
+            LIMIT :window
+        )
+        SELECT t.id, t.title, t.deadline, t.is_completed, t.team_id, tm.name AS team_name, t.description
+        FROM candidates c
+        JOIN tasks t ON t.id = c.id
+        LEFT JOIN teams tm ON tm.id = t.team_id
+        ORDER BY c.score, c.id DESC
+        LIMIT :limit OFFSET :offset
+    ''', {'user_id': user_id, 'query': fts_query(terms), 'window': window, 'limit': limit + 1,
+          'offset': offset}).fetchall()
+    return _page(rows, limit, terms, ('description', 'title'), hidden=('description',))
+
+
+def search_events(db, user_id, terms, limit=20, offset=0, window=RANK_WINDOW):
+    """Власні події користувача в календарі."""
+    rows = db.execute('''
+        WITH candidates AS (
+            SELECT events_fts.rowid AS id, bm25(events_fts) AS score
+            FROM events_fts
+            JOIN events e ON e.id = events_fts.rowid
+            WHERE events_fts MATCH :query AND e.user_id = :user_id
+            ORDER BY events_fts.rowid DESC
+            LIMIT :window
+        )
+        SELECT e.id, e.title, e.type, e.date, e.start_time, e.end_time, e.group_name
+        FROM candidates c
+        JOIN events e ON e.id = c.id
+        ORDER BY c.score, e.date DESC
+        LIMIT :limit OFFSET :offset
+    ''', {'user_id': user_id, 'query': fts_query(terms), 'window': window, 'limit': limit + 1,
+          'offset': offset}).fetchall()
+    return _page(rows, limit, terms, ('title',))
+
+
+SEARCHERS = {
+    'messages': search_messages,
+    'tasks': search_tasks,
+    'events': search_events,
+}
@@ -46,35 +46,36 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- 2. Логіка сповіщень ---
 
+    // Скільки останніх сповіщень тримаємо у списку
+    const NOTIFICATIONS_LIMIT = 50;
+    let notifications = [];
+
     async function fetchNotifications(isAutoCheck = false) {
         try {
-            const response = await fetch('/api/notifications');
+            // Авто-перевірка (push-подія чи запасне опитування) догружає лише сповіщення,
+            // новіші за lastNotificationId, і додає їх на початок уже завантаженого списку
+            const incremental = isAutoCheck && lastNotificationId > 0;
+            const url = incremental
+                ? `/api/notifications?since_id=${lastNotificationId}&limit=${NOTIFICATIONS_LIMIT}`
+                : `/api/notifications?limit=${NOTIFICATIONS_LIMIT}`;
+            const response = await fetch(url);
             if (!response.ok) return;
-            const notifications = await response.json();
-
-            updateCounter(notifications);
+            const data = await response.json();
 
-            // Якщо це перше завантаження сторінки - просто запам'ятовуємо останній ID
-            if (lastNotificationId === 0 && notifications.length > 0) {
-                lastNotificationId = notifications[0].id;
-            }
-            // Якщо це авто-перевірка (polling)
-            else if (isAutoCheck && notifications.length > 0) {
-                // Знаходимо ВСІ нові сповіщення, яких ми ще не бачили
-                // (фільтруємо ті, що мають ID більше за попередній збережений)
-                const newNotifs = notifications.filter(n => n.id > lastNotificationId && !n.is_read);
+            updateCounter(data.unread_count);
 
+            if (incremental) {
                 // Показуємо сповіщення для КОЖНОГО нового повідомлення
                 // (але не більше 3 за раз, щоб не заспамити екран)
-                newNotifs.slice(0, 3).forEach(n => {
+                data.notifications.filter(n => !n.is_read).slice(0, 3).forEach(n => {
                     showBrowserNotification(n.title, n.message);
                 });
-
-                // Оновлюємо ID на найновіший
-                if (newNotifs.length > 0) {
-                    lastNotificationId = notifications[0].id;
-                }
             }
+            // Нових більше, ніж NOTIFICATIONS_LIMIT (has_more) - відповідь і є повним новим списком
+            notifications = incremental && !data.has_more
+                ? data.notifications.concat(notifications).slice(0, NOTIFICATIONS_LIMIT)
+                : data.notifications;
+            lastNotificationId = Math.max(lastNotificationId, data.last_id || 0);
 
             // Рендеримо список, тільки якщо меню відкрите
             // (або якщо ми клікнули вручну !isAutoCheck)
@@ -86,8 +87,7 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     }
 
-    function updateCounter(notifications) {
-        const unreadCount = notifications.filter(n => !n.is_read).length;
+    function updateCounter(unreadCount) {
         if (unreadCount > 0 && notifCounter) {
             notifCounter.style.display = "flex";
             notifCounter.textContent = unreadCount > 99 ? "99+" : unreadCount;
@@ -255,10 +255,14 @@ document.addEventListener("DOMContentLoaded", () => {
     // ВИКЛИКАЄМО ВІДРАЗУ при завантаженні сторінки, щоб з'явилася цифра
     fetchNotifications(false);
 
-    // Встановлюємо інтервал перевірки (наприклад, кожні 10 секунд)
-    setInterval(() => {
+    // Нові сповіщення приходять через push-канал (див. openPushChannel у teams.js),
+    // а "push:poll" - повільне запасне опитування на випадок, коли подія до вкладки не дійшла
+    document.addEventListener("push:notification", () => {
         fetchNotifications(true);
-    }, 10000);
+    });
+    document.addEventListener("push:poll", () => {
+        fetchNotifications(true);
+    });
 
     // Пошук
     const searchBtn = document.getElementById("search-user-btn");
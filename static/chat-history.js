@@ -0,0 +1,116 @@
+// Історія чату команди: сторінка рендерить лише останні повідомлення,
+// старіші підвантажуються з /api/team/<id>/messages?before=<id> при прокрутці вгору
+document.addEventListener("DOMContentLoaded", () => {
+    const container = document.getElementById("messages-container");
+    if (!container) return;
+
+    const teamId = container.dataset.teamId;
+    const loadingEl = document.getElementById("messages-loading");
+    // Підвантажуємо заздалегідь, коли до верху лишилось менше ніж стільки пікселів
+    const LOAD_THRESHOLD_PX = 150;
+
+    let hasMore = container.dataset.hasMore === "true";
+    let loading = false;
+
+    const oldestMessageId = () => {
+        const first = container.querySelector(".message[data-message-id]");
+        return first ? first.dataset.messageId : null;
+    };
+
+    // Та сама розмітка, що й у team-chat.html (текст - лише через textContent)
+    const renderMessage = (msg) => {
+        const el = document.createElement("div");
+        el.className = "message";
+        el.dataset.messageId = msg.id;
+
+        const header = document.createElement("div");
+        header.className = "message-header";
+
+        let avatar;
+        if (msg.avatar) {
+            avatar = document.createElement("img");
+            avatar.src = msg.avatar;
+            avatar.alt = "Avatar";
+            avatar.style.objectFit = "cover";
+        } else {
+            avatar = document.createElement("div");
+            avatar.style.background = "linear-gradient(135deg, #1f71e8, #5294e2)";
+            avatar.textContent = `${(msg.first_name || "")[0] || ""}${(msg.last_name || "")[0] || ""}`;
+        }
+        avatar.classList.add("message-avatar");
+
+        const info = document.createElement("div");
+        info.className = "message-info";
+        const author = document.createElement("div");
+        author.className = "message-author";
+        author.textContent = `${msg.first_name} ${msg.last_name}`;
+        const time = document.createElement("div");
+        time.className = "message-time";
+        time.textContent = (msg.created_at || "").slice(0, 19);
+        info.append(author, time);
+        header.append(avatar, info);
+
+        const text = document.createElement("div");
+        text.className = "message-text";
+        text.textContent = msg.message;
+        el.append(header, text);
+
+        if (msg.file_url) {
+            const attachment = document.createElement("div");
+            attachment.className = "message-attachment";
+            const link = document.createElement("a");
+            link.href = msg.file_url;
+            link.target = "_blank";
+            link.textContent = `📎 ${msg.file_name || "Файл"}`;
+            attachment.append(link);
+            el.append(attachment);
+        }
+        return el;
+    };
+
+    const loadOlder = async () => {
+        if (loading || !hasMore) return;
+        const before = oldestMessageId();
+        if (!before) return;
+
+        loading = true;
+        loadingEl?.classList.remove("hidden");
+        try {
+            const res = await fetch(`/api/team/${teamId}/messages?before=${before}`);
+            if (!res.ok) return;
+            const data = await res.json();
+
+            // Зберігаємо позицію: нові елементи зверху не повинні зсувати те, що користувач читає
+            const prevHeight = container.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach(msg => fragment.append(renderMessage(msg)));
+            if (loadingEl) loadingEl.after(fragment);
+            else container.prepend(fragment);
+            container.scrollTop += container.scrollHeight - prevHeight;
+
+            hasMore = data.has_more;
+        } catch (err) {
+            console.error("Error loading older messages:", err);
+        } finally {
+            loading = false;
+            loadingEl?.classList.add("hidden");
+        }
+    };
+
+    // Нові повідомлення з push-каналу (teams.js) - одразу в кінець чату
+    document.addEventListener("push:team_message", (e) => {
+        const msg = e.detail;
+        if (String(msg.team_id) !== String(teamId)) return;
+        if (container.querySelector(`.message[data-message-id="${msg.id}"]`)) return;
+
+        const nearBottom = container.scrollHeight - container.scrollTop - container.clientHeight < LOAD_THRESHOLD_PX;
+        container.append(renderMessage(msg));
+        if (nearBottom) container.scrollTop = container.scrollHeight;
+    });
+
+    container.addEventListener("scroll", () => {
+        if (container.scrollTop < LOAD_THRESHOLD_PX) loadOlder();
+    });
+
+    container.scrollTop = container.scrollHeight;
+});
@@ -28,15 +28,43 @@ document.addEventListener('DOMContentLoaded', () => {
     const MAX_EVENTS_VISIBLE = 3;
 
     // --- API ---
+    let fetchSeq = 0; // щоб відповідь для старого місяця не перезаписала новий
+    let refreshRetries = 0;
+    const MAX_REFRESH_RETRIES = 10;
+
+    // YYYY-MM-DD у локальному часі (toISOString зсуває дату через часовий пояс)
+    const formatDate = (d) => {
+        const month = String(d.getMonth() + 1).padStart(2, '0');
+        const day = String(d.getDate()).padStart(2, '0');
+        return `${d.getFullYear()}-${month}-${day}`;
+    };
+
     const fetchSchedule = async () => {
         try {
             const group = window.CURRENT_USER_GROUP;
             if (!group) return;
-            const response = await fetch(`/api/schedule/${group}?subgroup=${currentSubgroup}`);
+            const seq = ++fetchSeq;
+
+            // Запитуємо лише видимий місяць
+            const year = currentDate.getFullYear();
+            const month = currentDate.getMonth();
+            const start = formatDate(new Date(year, month, 1));
+            const end = formatDate(new Date(year, month + 1, 0));
+
+            const response = await fetch(`/api/schedule/${group}?subgroup=${currentSubgroup}&start=${start}&end=${end}`);
             if (!response.ok) throw new Error('Network response was not ok');
             const data = await response.json();
+            if (seq !== fetchSeq) return;
             allEvents = data.events || [];
             renderCalendar();
+
+            // Розклад групи ще вантажиться з сайту у фоні - перепитуємо трохи згодом
+            if (data.refreshing && refreshRetries < MAX_REFRESH_RETRIES) {
+                refreshRetries++;
+                setTimeout(fetchSchedule, 3000);
+            } else {
+                refreshRetries = 0;
+            }
         } catch (error) {
             console.error("Error fetching schedule:", error);
         }
@@ -356,9 +384,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- Listeners Setup ---
     const setupEventListeners = () => {
-        prevMonthBtn.addEventListener('click', () => { currentDate.setMonth(currentDate.getMonth() - 1); renderCalendar(); });
-        nextMonthBtn.addEventListener('click', () => { currentDate.setMonth(currentDate.getMonth() + 1); renderCalendar(); });
-        todayBtn.addEventListener('click', () => { currentDate = new Date(); renderCalendar(); });
+        // Кожен місяць підвантажується окремо, тож після перемикання йдемо на сервер
+        prevMonthBtn.addEventListener('click', () => { currentDate.setDate(1); currentDate.setMonth(currentDate.getMonth() - 1); renderCalendar(); fetchSchedule(); });
+        nextMonthBtn.addEventListener('click', () => { currentDate.setDate(1); currentDate.setMonth(currentDate.getMonth() + 1); renderCalendar(); fetchSchedule(); });
+        todayBtn.addEventListener('click', () => { currentDate = new Date(); renderCalendar(); fetchSchedule(); });
 
         subgroup1Btn.addEventListener('click', () => switchSubgroup(1));
         subgroup2Btn.addEventListener('click', () => switchSubgroup(2));
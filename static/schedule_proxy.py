@@ -1,10 +1,199 @@
 # schedule_proxy.py — невеликий проксі для fetching remote schedule
-from flask import Blueprint, request, Response
-import urllib.parse
-import urllib.request
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Blueprint, request, Response, current_app
+from werkzeug.wsgi import wrap_file
+import requests
+
+from lpnu_client import UpstreamUnavailable, get_client
+
+LPNU_SCHEDULE_URL = 'https://student.lpnu.ua/students_schedule'
+
+# Скільки секунд відповідь вважається свіжою без звернення до LPNU
+PROXY_TTL_SECONDS = 3600
+# Обмеження пам'яті: загальний розмір LRU і максимальний розмір одного запису в пам'яті
+PROXY_MEMORY_LIMIT = 32 * 1024 * 1024
+PROXY_MEMORY_ENTRY_LIMIT = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
 
 bp = Blueprint('schedule_proxy', __name__)
 
+
+class ProxyCache:
+    """
+    Двоярусний кеш відповідей LPNU: LRU у пам'яті (обмежений за байтами) + файли на диску.
+    Запис - це тіло та метадані (etag, last_modified, stored_at), ключ - (group, semestr, semestrduration).
+    """
+
+    def __init__(self, cache_dir, memory_limit=PROXY_MEMORY_LIMIT, entry_limit=PROXY_MEMORY_ENTRY_LIMIT):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.entry_limit = entry_limit
+        self._memory = OrderedDict()   # name -> (meta, body)
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def name_for(key):
+        return hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _paths(self, name):
+        base = os.path.join(self.cache_dir, name)
+        return base + '.html', base + '.json'
+
+    def lookup(self, name):
+        """Повертає (meta, body або None, якщо тіло лише на диску) чи None."""
+        with self._lock:
+            entry = self._memory.get(name)
+            if entry is not None:
+                self._memory.move_to_end(name)
+                return entry
+        body_path, meta_path = self._paths(name)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        if meta.get('size', 0) <= self.entry_limit:
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            self._remember(name, meta, body)
+            return meta, body
+        return meta, None
+
+    def touch(self, name, meta):
+        """Відповідь 304 від LPNU: тіло те саме, оновлюємо лише час перевірки."""
+        meta = dict(meta, stored_at=time.time())
+        self._write_meta(name, meta)
+        with self._lock:
+            entry = self._memory.get(name)
+            if entry is not None:
+                self._memory[name] = (meta, entry[1])
+        return meta
+
+    def open_body(self, name):
+        """Відкритий файл тіла запису або None, якщо його вже немає."""
+        body_path, _ = self._paths(name)
+        try:
+            return open(body_path, 'rb')
+        except OSError:
+            return None
+
+    def store_stream(self, name, meta, chunks):
+        """
+        Пропускає чанки далі (клієнту) і паралельно пише їх у тимчасовий файл.
+        Запис у кеші з'являється лише якщо тіло дочитане до кінця: тіло й метадані спершу повністю
+        пишуться в тимчасові файли, і лише потім обидва підміняються через os.replace.
+        """
+        body_path, meta_path = self._paths(name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        size = 0
+        buffered = []
+        completed = False
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in chunks:
+                    tmp.write(chunk)
+                    size += len(chunk)
+                    if buffered is not None:
+                        buffered.append(chunk)
+                        if size > self.entry_limit:
+                            buffered = None
+                    yield chunk
+            completed = True
+        finally:
+            if completed:
+                meta = dict(meta, size=size, stored_at=time.time())
+                meta_tmp_path = self._write_temp_meta(meta)
+                os.replace(tmp_path, body_path)
+                os.replace(meta_tmp_path, meta_path)
+                if buffered is not None:
+                    self._remember(name, meta, b''.join(buffered))
+                else:
+                    self._forget(name)
+            else:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _write_temp_meta(self, meta):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return tmp_path
+
+    def _write_meta(self, name, meta):
+        _, meta_path = self._paths(name)
+        os.replace(self._write_temp_meta(meta), meta_path)
+
+    def _remember(self, name, meta, body):
+        if len(body) > self.entry_limit:
+            return
+        with self._lock:
+            old = self._memory.pop(name, None)
+            if old is not None:
+                self._memory_size -= len(old[1])
+            self._memory[name] = (meta, body)
+            self._memory_size += len(body)
+            while self._memory_size > self.memory_limit and self._memory:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def _forget(self, name):
+        with self._lock:
+            old = self._memory.pop(name, None)
+            if old is not None:
+                self._memory_size -= len(old[1])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_proxy_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            cache_dir = current_app.config.get('SCHEDULE_PROXY_CACHE_DIR') or \
+                os.path.join(current_app.instance_path, 'schedule_proxy_cache')
+            _cache = ProxyCache(cache_dir,
+                                memory_limit=current_app.config.get('SCHEDULE_PROXY_MEMORY_LIMIT', PROXY_MEMORY_LIMIT))
+        return _cache
+
+
+def _cached_response(cache, name, meta, body):
+    if body is not None:
+        r = Response(body, mimetype='text/html')
+    else:
+        # Великі тіла не тримаємо в пам'яті - віддаємо з диска частинами. Довжина - з уже відкритого
+        # файлу, а не з meta: запис могли підмінити між читанням метаданих і відкриттям тіла
+        f = cache.open_body(name)
+        if f is None:
+            return {'error': 'cached schedule disappeared, retry'}, 503
+        size = os.fstat(f.fileno()).st_size
+        r = Response(wrap_file(request.environ, f, CHUNK_SIZE), mimetype='text/html', direct_passthrough=True)
+        r.headers['Content-Length'] = str(size)
+
+    r.headers['Access-Control-Allow-Origin'] = '*'
+    if meta.get('etag'):
+        r.headers['ETag'] = meta['etag']
+    elif body is not None:
+        r.set_etag(hashlib.sha1(body).hexdigest())
+    if meta.get('last_modified'):
+        r.headers['Last-Modified'] = meta['last_modified']
+    return r.make_conditional(request)
+
+
 @bp.route('/api/schedule')
 def schedule_proxy():
     group = request.args.get('studygroup_abbrname') or request.args.get('group')
@@ -12,13 +201,54 @@ def schedule_proxy():
     semd = request.args.get('semestrduration','1')
     if not group:
         return {'error':'no group provided'}, 400
-    q = urllib.parse.urlencode({'studygroup_abbrname': group, 'semestr': sem, 'semestrduration': semd})
-    url = 'https://student.lpnu.ua/students_schedule?' + q
+    params = {'studygroup_abbrname': group, 'semestr': sem, 'semestrduration': semd}
+
+    cache = get_proxy_cache()
+    name = cache.name_for([group, sem, semd])
+    entry = cache.lookup(name)
+    ttl = current_app.config.get('SCHEDULE_PROXY_TTL', PROXY_TTL_SECONDS)
+
+    if entry is not None and time.time() - entry[0].get('stored_at', 0) < ttl:
+        return _cached_response(cache, name, *entry)
+
+    # TTL вийшов - просимо LPNU підтвердити, що сторінка не змінилась (304), замість повного тіла
+    headers = {}
+    if entry is not None:
+        if entry[0].get('etag'):
+            headers['If-None-Match'] = entry[0]['etag']
+        if entry[0].get('last_modified'):
+            headers['If-Modified-Since'] = entry[0]['last_modified']
+
     try:
-        with urllib.request.urlopen(url, timeout=10) as resp:
-            content = resp.read()
-            r = Response(content, mimetype='text/html')
-            r.headers['Access-Control-Allow-Origin'] = '*'
-            return r
-    except Exception as e:
+        # Спільний пул з'єднань з app.py: без нового TLS-рукостискання на кожен запит
+        resp = get_client().get(LPNU_SCHEDULE_URL, params=params, headers=headers, timeout=(5, 10), stream=True)
+    except (UpstreamUnavailable, requests.RequestException) as e:
+        if entry is not None:
+            # Краще застарілий розклад, ніж жодного
+            return _cached_response(cache, name, *entry)
         return {'error': str(e)}, 502
+
+    if resp.status_code == 304 and entry is not None:
+        resp.close()
+        meta = cache.touch(name, entry[0])
+        return _cached_response(cache, name, meta, entry[1])
+
+    if resp.status_code != 200:
+        resp.close()
+        if entry is not None:
+            return _cached_response(cache, name, *entry)
+        return {'error': f'HTTP Error {resp.status_code}: {resp.reason}'}, 502
+
+    meta = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+
+    # Тіло не буферизуємо: чанки йдуть клієнту одразу, паралельно записуючись у кеш.
+    # Відповідь LPNU закривається разом з нашою, навіть якщо тіло так і не читали (HEAD, клієнт пішов) -
+    # інакше слот спільного клієнта LPNU лишився б зайнятим назавжди
+    r = Response(cache.store_stream(name, meta, resp.iter_content(CHUNK_SIZE)), mimetype='text/html')
+    r.call_on_close(resp.close)
+    r.headers['Access-Control-Allow-Origin'] = '*'
+    if meta['etag']:
+        r.headers['ETag'] = meta['etag']
+    if meta['last_modified']:
+        r.headers['Last-Modified'] = meta['last_modified']
+    return r
@@ -219,7 +219,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const toggleTaskComplete = async (task) => {
         try {
             await fetch(`/api/tasks/${task.id}`, {
-                method: 'PUT',
+                method: 'PATCH',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ is_completed: !task.is_completed ? 1 : 0 })
             });
@@ -1,27 +1,88 @@
-let notificationsUpdateInterval
-
 // 1. Запитуємо дозвіл на браузерні сповіщення при старті
 document.addEventListener("DOMContentLoaded", () => {
     if ("Notification" in window && Notification.permission !== "granted" && Notification.permission !== "denied") {
         Notification.requestPermission();
     }
 
-    // Запускаємо оновлення, якщо є кнопка дзвіночка
+    // Завантажуємо сповіщення один раз, далі оновлюємо лише за подіями з push-каналу
     if (document.querySelector(".nav-notifications-btn")) {
       loadNotifications()
-      notificationsUpdateInterval = setInterval(loadNotifications, 3000)
+      openPushChannel()
     }
 });
 
+// --- PUSH-КАНАЛ (Server-Sent Events) ---
+// Одне з'єднання на вкладку замість опитування /api/notifications кожні кілька секунд.
+// Інші скрипти сторінки слухають події на document: "push:notification", "push:team_message", "push:team_member"
+const PUSH_EVENTS = ["notification", "team_message", "team_member"]
+// Запасний варіант для браузерів без EventSource
+const FALLBACK_POLL_MS = 30000
+// Повільне опитування поряд із SSE: хаб подій живе в пам'яті одного процесу сервера, тож подія з іншого
+// воркера сюди не дійде - її підхопить це опитування. Слухачі - на "push:poll".
+const SLOW_POLL_MS = 60000
+
+function startPolling(intervalMs) {
+  return setInterval(() => document.dispatchEvent(new CustomEvent("push:poll")), intervalMs)
+}
+
+function openPushChannel() {
+  if (window.pushChannel) return
+  document.addEventListener("push:poll", () => loadNotifications(true))
+  if (!("EventSource" in window)) {
+    window.pushChannel = startPolling(FALLBACK_POLL_MS)
+    return
+  }
+  startPolling(SLOW_POLL_MS)
+
+  const source = new EventSource("/api/stream")
+  window.pushChannel = source
+  let connectedBefore = false
+
+  source.addEventListener("open", () => {
+    // Після розриву (EventSource перепідключається сам) могли пропустити події
+    if (connectedBefore) loadNotifications()
+    connectedBefore = true
+  })
+  source.addEventListener("resync", () => {
+    loadNotifications()
+    document.dispatchEvent(new CustomEvent("push:resync"))
+  })
+  PUSH_EVENTS.forEach((name) => {
+    source.addEventListener(name, (e) => {
+      document.dispatchEvent(new CustomEvent(`push:${name}`, { detail: JSON.parse(e.data) }))
+    })
+  })
+  // Нове сповіщення - догружаємо лише те, що новіше за останнє відоме (since_id)
+  document.addEventListener("push:notification", () => loadNotifications(true))
+}
+
 document.getElementById("notifications-btn")?.addEventListener("click", toggleNotificationsModal)
 document.querySelector(".notifications-modal-overlay")?.addEventListener("click", closeNotificationsModal)
 document.querySelector(".notifications-modal-close")?.addEventListener("click", closeNotificationsModal)
+document.getElementById("notifications-read-all")?.addEventListener("click", markAllNotificationsRead)
+
+// Скільки останніх сповіщень тримаємо у списку
+const NOTIFICATIONS_LIMIT = 50
+let notifications = []
+let lastNotificationId = 0
 
 // --- ГОЛОВНА ФУНКЦІЯ ---
-async function loadNotifications() {
+// incremental=true: запитуємо лише сповіщення, новіші за lastNotificationId, і додаємо їх на початок списку
+async function loadNotifications(incremental = false) {
   try {
-    const response = await fetch("/api/notifications")
-    const notifications = await response.json()
+    const url = incremental && lastNotificationId
+      ? `/api/notifications?since_id=${lastNotificationId}&limit=${NOTIFICATIONS_LIMIT}`
+      : `/api/notifications?limit=${NOTIFICATIONS_LIMIT}`
+    const response = await fetch(url)
+    if (!response.ok) return
+    const data = await response.json()
+
+    if (incremental && lastNotificationId && !data.has_more) {
+      notifications = data.notifications.concat(notifications).slice(0, NOTIFICATIONS_LIMIT)
+    } else {
+      notifications = data.notifications
+    }
+    lastNotificationId = Math.max(lastNotificationId, data.last_id || 0)
 
     // 1. ЛОГІКА БРАУЗЕРНИХ СПОВІЩЕНЬ (Desktop Notifications)
     // Фільтруємо лише непрочитані
@@ -50,8 +111,8 @@ async function loadNotifications() {
         }
     }
 
-    // 2. ОНОВЛЕННЯ ІНТЕРФЕЙСУ (Червоний лічильник)
-    const unreadCount = unreadNotifications.length
+    // 2. ОНОВЛЕННЯ ІНТЕРФЕЙСУ (Червоний лічильник) - з серверного лічильника, а не зі списку
+    const unreadCount = data.unread_count
     const counter = document.getElementById("notif-counter")
     if (counter) {
         if (unreadCount > 0) {
@@ -187,6 +248,13 @@ async function markNotificationRead(notifId) {
   } catch (error) { console.error("Error:", error) }
 }
 
+async function markAllNotificationsRead() {
+  try {
+    await fetch("/api/notifications/read-all", { method: "POST" })
+    loadNotifications()
+  } catch (error) { console.error("Error:", error) }
+}
+
 async function deleteNotification(notifId) {
   try {
     await fetch(`/api/notification/${notifId}/delete`, { method: "DELETE" })
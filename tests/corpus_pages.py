@@ -0,0 +1,12 @@
+# Сторінки розкладу LPNU з benchmarks/corpus для тестів
+import glob
+import os
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'corpus')
+
+CORPUS_PAGES = sorted(os.path.basename(path) for path in glob.glob(os.path.join(CORPUS_DIR, '*.html')))
+
+
+def read_corpus(name):
+    with open(os.path.join(CORPUS_DIR, name), encoding='utf-8') as f:
+        return f.read()
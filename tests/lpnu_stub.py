@@ -0,0 +1,45 @@
+# Локальний стаб student.lpnu.ua для тестів і benchmarks/bench_import.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from corpus_pages import read_corpus
+
+
+class FixtureLPNU:
+    """
+    Стаб student.lpnu.ua: на ?studygroup_abbrname=... віддає full_week.html через latency секунд.
+    Групи з broken отримують сторінку "розклад не знайдено" - поки broken не очистити.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.broken = set()
+        self.requests = 0
+        self.page = read_corpus('full_week.html').encode('utf-8')
+        self.not_found = read_corpus('not_found.html').encode('utf-8')
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                group_name = parse_qs(urlsplit(self.path).query).get('studygroup_abbrname', [''])[0]
+                fixture.requests += 1
+                time.sleep(fixture.latency)
+                body = fixture.not_found if group_name in fixture.broken else fixture.page
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/students_schedule'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,101 @@
+# Класифікація блоків пари (schedule_classify) дає те саме, що старий код з app.py,
+# на блоках сторінок корпусу та на згенерованих комбінаціях деталей
+import itertools
+import re
+
+import pytest
+
+from corpus_pages import CORPUS_PAGES, read_corpus
+from schedule_classify import classify_details, classify_elem_id, detect_subgroup, detect_week_type
+from schedule_parser import extract_blocks_bs4
+
+
+# --- Як було до schedule_classify ---
+
+def old_detect_subgroup(block_text):
+    t = block_text.lower()
+    if re.search(r'\b(підгр[^0-9]*1|\b1\s*підгр|\bпідгр\.?\s*1|$$1$$|\b1\/?підгр)\b', t):
+        return 1
+    if re.search(r'\b(підгр[^0-9]*2|\b2\s*підгр|\bпідгр\.?\s*2|$$2$$|\b2\/?підгр)\b', t):
+        return 2
+    if re.search(r'\b(i[\.\s]?\s*підгр|ii[\.\s]?\s*підгр)\b', t):
+        if re.search(r'i[\.\s]?\s*підгр', t) and not re.search(r'ii', t):
+            return 1
+        if re.search(r'ii', t):
+            return 2
+    return 0
+
+
+def old_detect_week_type(block_text):
+    t = block_text.lower()
+    if 'чисел' in t or 'чис.' in t:
+        return 'чисельник'
+    if 'знамен' in t or 'знам.' in t:
+        return 'знаменник'
+    return None
+
+
+def old_classify(elem_id, parts):
+    subgroup = 0
+    week_type = 'обидва'
+    if 'sub_1' in elem_id:
+        subgroup = 1
+    elif 'sub_2' in elem_id:
+        subgroup = 2
+    if 'chys' in elem_id:
+        week_type = 'чисельник'
+    elif 'znam' in elem_id:
+        week_type = 'знаменник'
+
+    details = ", ".join(parts[1:]) if len(parts) > 1 else ""
+    subject_type = 'Інше'
+    location = ''
+    details_lower = details.lower()
+    if 'лекц' in details_lower:
+        subject_type = 'Лекція'
+    elif 'практ' in details_lower:
+        subject_type = 'Практична'
+    elif 'лаб' in details_lower:
+        subject_type = 'Лабораторна'
+    elif 'консульт' in details_lower:
+        subject_type = 'Консультація'
+    for p in details.split(','):
+        p = p.strip()
+        if ('н.к.' in p) or (any(c.isdigit() for c in p) and len(p) < 10):
+            location = p
+            break
+    return subgroup, week_type, subject_type, location
+
+
+def new_classify(elem_id, parts):
+    subgroup, week_type = classify_elem_id(elem_id)
+    subject_type, location = classify_details(parts[1:])
+    return subgroup, week_type, subject_type, location
+
+
+def assert_same(elem_id, parts):
+    assert new_classify(elem_id, parts) == old_classify(elem_id, parts)
+    text = ' '.join(parts)
+    assert detect_subgroup(text) == old_detect_subgroup(text)
+    assert detect_week_type(text) == old_detect_week_type(text)
+
+
+@pytest.mark.parametrize('page', CORPUS_PAGES)
+def test_corpus_blocks_classified_as_before(page):
+    for _weekday, _lesson_num, elem_id, parts in extract_blocks_bs4(read_corpus(page)) or []:
+        assert_same(elem_id, parts)
+
+
+ELEM_IDS = ['group_full', 'group_chys', 'group_znam', 'sub_1_full', 'sub_2_chys', 'sub_1_znam', '']
+TEACHERS = ['Петренко П.П.', 'доц. Гнатюк Р.Р.', 'Мельник О.В., Бондар А.А.', '']
+LOCATIONS = ['301 IV н.к.', '12', 'ауд. 5', 'онлайн', 'корпус 2, 415', '']
+TYPES = ['Лекція', 'Практична', 'лаб. практикум', 'Консультація', 'ЛЕКЦ.', 'Інше', '']
+MARKERS = ['', '1 підгр.', 'підгрупа 2', 'I підгр', 'II підгр.', '2/підгр', '(1)', 'чисельник', 'знам.']
+
+
+@pytest.mark.parametrize('elem_id', ELEM_IDS)
+def test_generated_blocks_classified_as_before(elem_id):
+    for details in itertools.product(TEACHERS, LOCATIONS, TYPES, MARKERS):
+        # Порядок деталей важливий: аудиторія - перший підхожий фрагмент, тип - за пріоритетом
+        for ordered in (details, details[::-1]):
+            assert_same(elem_id, ['Вища математика', *(d for d in ordered if d)])
@@ -0,0 +1,30 @@
+# Плани гарячих запитів (queries.HOT_QUERIES) на схемі після всіх міграцій: кожен шукає своїм індексом
+import sqlite3
+
+import pytest
+
+from migrations import check_query_plans, migrate
+from queries import HOT_QUERIES
+
+
+@pytest.fixture(scope='module')
+def db():
+    db = sqlite3.connect(':memory:')
+    migrate(db, log=lambda message: None)
+    yield db
+    db.close()
+
+
+def query_plan(db, sql, params):
+    return [row[3] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+@pytest.mark.parametrize('name', list(HOT_QUERIES))
+def test_hot_query_uses_expected_index(db, name):
+    sql, params, index = HOT_QUERIES[name]
+    plan = query_plan(db, sql, params)
+    assert any(step.startswith('SEARCH') and index in step for step in plan), plan
+
+
+def test_no_hot_query_scans_a_table(db):
+    assert check_query_plans(db) == {}
@@ -0,0 +1,75 @@
+# Масовий імпорт (schedule_import.py) проти локального стаба LPNU: --resume і рядки в базі
+import sqlite3
+
+import pytest
+
+import schedule_import
+from lpnu_client import UpstreamClient
+from lpnu_stub import FixtureLPNU
+from migrations import migrate
+from schedule_import import create_run, failed_groups, fetch_schedule_page, import_schedules, remaining_groups
+from schedule_parser import parse_schedule_rows
+from schedule_store import row_key
+
+GROUPS = [f'ГР-{i:03d}' for i in range(40)]
+
+
+@pytest.fixture
+def lpnu():
+    fixture = FixtureLPNU()
+    yield fixture
+    fixture.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = sqlite3.connect(tmp_path / 'import.db')
+    db.row_factory = sqlite3.Row
+    db.execute('PRAGMA journal_mode=WAL')
+    migrate(db, log=lambda message: None)
+    yield db
+    db.close()
+
+
+def run_import(db, lpnu, run_id, parse_workers=0):
+    # Ретраї вимкнено, а поріг breaker високий: "не знайдено" має лишитись невдачею саме цієї групи
+    client = UpstreamClient(max_concurrency=4, retries=0, failure_threshold=10 ** 6)
+    return import_schedules(db, run_id, remaining_groups(db, run_id),
+                            lambda group_name: fetch_schedule_page(client, lpnu.base_url, group_name),
+                            batch_size=7, fetch_workers=4, parse_workers=parse_workers, log=lambda message: None)
+
+
+def assert_rows_match_parser(db, lpnu):
+    expected = len({row_key(row) for row in parse_schedule_rows(lpnu.page.decode('utf-8'))})
+    counts = dict(db.execute('SELECT group_name, COUNT(*) FROM schedule GROUP BY group_name').fetchall())
+    assert counts == {group_name: expected for group_name in GROUPS}
+
+
+def test_resume_fetches_only_failed_groups(db, lpnu):
+    lpnu.broken = set(GROUPS[::10])
+    run_id = create_run(db, GROUPS)
+    assert run_import(db, lpnu, run_id) == (len(GROUPS) - len(lpnu.broken), len(lpnu.broken))
+    assert set(remaining_groups(db, run_id)) == lpnu.broken
+    assert {row['group_name'] for row in failed_groups(db, run_id)} == lpnu.broken
+
+    lpnu.broken = set()
+    before = lpnu.requests
+    assert run_import(db, lpnu, run_id) == (len(GROUPS[::10]), 0)
+    assert lpnu.requests - before == len(GROUPS[::10])
+    assert remaining_groups(db, run_id) == []
+    assert_rows_match_parser(db, lpnu)
+
+
+def test_parse_pool_writes_same_rows(db, lpnu):
+    assert run_import(db, lpnu, create_run(db, GROUPS), parse_workers=2) == (len(GROUPS), 0)
+    assert_rows_match_parser(db, lpnu)
+
+
+def test_single_cpu_parses_in_fetch_threads(db, lpnu, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('пул процесів на одному ядрі')
+
+    monkeypatch.setattr(schedule_import.os, 'cpu_count', lambda: 1)
+    monkeypatch.setattr(schedule_import, 'ProcessPoolExecutor', no_pool)
+    assert run_import(db, lpnu, create_run(db, GROUPS), parse_workers=None) == (len(GROUPS), 0)
+    assert_rows_match_parser(db, lpnu)
@@ -0,0 +1,19 @@
+# Бекенди парсера (selectolax, lxml, bs4) дають однакові рядки на сторінках корпусу
+import pytest
+
+from corpus_pages import CORPUS_PAGES, read_corpus
+from schedule_parser import BACKENDS, parse_schedule_rows
+
+OTHER_BACKENDS = [backend for backend in BACKENDS if backend != 'bs4']
+
+
+def test_full_week_page_has_rows():
+    assert parse_schedule_rows(read_corpus('full_week.html'), 'bs4')
+
+
+@pytest.mark.skipif(not OTHER_BACKENDS, reason='встановлено лише BeautifulSoup')
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+@pytest.mark.parametrize('page', CORPUS_PAGES)
+def test_backend_matches_bs4(page, backend):
+    html_text = read_corpus(page)
+    assert parse_schedule_rows(html_text, backend) == parse_schedule_rows(html_text, 'bs4')
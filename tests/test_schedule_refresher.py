@@ -0,0 +1,55 @@
+# Пауза ScheduleRefresher після невдалого оновлення: коротка й зростає для групи без даних
+import time
+
+import pytest
+
+from schedule_refresher import ScheduleRefresher
+
+GROUP = 'ПП-12'
+
+
+@pytest.fixture
+def make_refresher():
+    refreshers = []
+
+    def make(results, has_data):
+        refresher = ScheduleRefresher(lambda group_name: results.pop(0), lambda: [], max_workers=1, jitter=0,
+                                      scan_interval=0, failure_backoff=3600, cold_failure_backoff=30,
+                                      has_data_fn=lambda group_name: has_data)
+        refreshers.append(refresher)
+        return refresher
+
+    yield make
+    for refresher in refreshers:
+        refresher.stop()
+
+
+def refresh(refresher):
+    """Одне оновлення GROUP; пауза після невдачі (секунди, округлено) або None."""
+    assert refresher.enqueue(GROUP, jitter=0)
+    deadline = time.monotonic() + 5
+    while refresher.is_pending(GROUP):
+        assert time.monotonic() < deadline, 'оновлення не завершилось'
+        time.sleep(0.01)
+    until = refresher._failed_until.get(GROUP)
+    if until is None:
+        return None
+    assert not refresher.enqueue(GROUP)
+    # Чекати паузу в тесті довго - просто знімаємо її
+    refresher._failed_until[GROUP] = 0
+    return round(until - time.monotonic())
+
+
+def test_group_with_data_waits_full_backoff(make_refresher):
+    refresher = make_refresher([False, False], has_data=True)
+    assert [refresh(refresher), refresh(refresher)] == [3600, 3600]
+
+
+def test_group_without_data_backoff_grows_up_to_full(make_refresher):
+    refresher = make_refresher([False] * 9, has_data=False)
+    assert [refresh(refresher) for _ in range(9)] == [30, 60, 120, 240, 480, 960, 1920, 3600, 3600]
+
+
+def test_success_resets_growing_backoff(make_refresher):
+    refresher = make_refresher([False, False, True, False], has_data=False)
+    assert [refresh(refresher) for _ in range(4)] == [30, 60, None, 30]
@@ -0,0 +1,46 @@
+# ttl_cache.py — невеликий потокобезпечний кеш із терміном життя записів (напр. дашборд користувача)
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    LRU на max_entries записів, кожен живе ttl секунд. Прострочений запис поводиться як відсутній.
+    Кеш живе в пам'яті процесу - після змін даних запис варто явно скинути через invalidate().
+    """
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        if self.ttl <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()